@@ -2,6 +2,8 @@ import requests
 import csv
 import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 #Assemble the URL for the API call 
 api_url = ""
@@ -20,6 +22,15 @@ HEADERS = {
 
 METADATA_BASE_URL = "https://cad.onshape.com/api/v10/metadata"
 
+# Versioned metadata never changes, so names are cached on disk across runs
+METADATA_CACHE_FILE = "version_name_cache.json"
+MAX_METADATA_WORKERS = 8
+
+# Results that mean the lookup failed; these are never cached
+FAILED_NAMES = {"Unknown", "Error"}
+
+_thread_local = threading.local()
+
 def build_bom_api_url_from_version_link(version_link):
     try:
         parts = version_link.strip().split('/')
@@ -44,22 +55,33 @@ def build_bom_api_url_from_version_link(version_link):
 
 # --- Functions ---
 def fetch_bom():
-    response = requests.get(api_url, auth=AUTH, headers=HEADERS)
+    response = get_session().get(api_url, auth=AUTH, headers=HEADERS)
     if response.status_code == 200:
         return response.json()
     else:
         raise Exception(f"Failed to retrieve BOM. Status code: {response.status_code}")
 
 
-def get_metadata_name(view_href):
-    """Convert a viewHref URL to a metadata API call and return the 'value' of the 'Name' property."""
+def get_session():
+    """Return this thread's requests session (connections are reused per thread)."""
+    if not hasattr(_thread_local, "session"):
+        _thread_local.session = requests.Session()
+    return _thread_local.session
+
+
+def parse_document_version(view_href):
+    """Extract (doc_id, version_id) from a viewHref URL, or None if it has none."""
     try:
-        # Extract doc ID and version ID from viewHref
         parts = view_href.split('/')
         doc_index = parts.index('documents')
-        doc_id = parts[doc_index + 1]
-        version_id = parts[doc_index + 3]
+        return parts[doc_index + 1], parts[doc_index + 3]
+    except (ValueError, IndexError):
+        return None
+
 
+def fetch_version_name(doc_id, version_id):
+    """Call the metadata API for one document version and return the 'value' of the 'Name' property."""
+    try:
         metadata_url = f"{METADATA_BASE_URL}/d/{doc_id}/v/{version_id}"
         params = {
             "inferMetadataOwner": "false",
@@ -69,7 +91,7 @@ def get_metadata_name(view_href):
             "thumbnail": "false"
         }
 
-        response = requests.get(metadata_url, auth=AUTH, headers=HEADERS, params=params)
+        response = get_session().get(metadata_url, auth=AUTH, headers=HEADERS, params=params)
         if response.status_code != 200:
             print(f"Failed metadata call for {doc_id}. Status code: {response.status_code}")
             return "Unknown"
@@ -88,14 +110,91 @@ def get_metadata_name(view_href):
         return "Error"
 
 
-def extract_part_and_metadata(json_data):
+def get_metadata_name(view_href):
+    """Convert a viewHref URL to a metadata API call and return the 'value' of the 'Name' property."""
+    doc_version = parse_document_version(view_href)
+    if not doc_version:
+        print(f"Metadata fetch error: could not parse viewHref '{view_href}'")
+        return "Error"
+    return fetch_version_name(*doc_version)
+
+
+def load_metadata_cache(cache_path=METADATA_CACHE_FILE):
+    """Load the persistent (doc_id/version_id -> name) cache."""
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable metadata cache '{cache_path}': {e}")
+        return {}
+
+
+def save_metadata_cache(cache, cache_path=METADATA_CACHE_FILE):
+    """Write the cache atomically so an interrupted run can't corrupt it."""
+    if not cache_path:
+        return
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, cache_path)
+
+
+def fetch_version_names(doc_versions, cache_path=METADATA_CACHE_FILE, max_workers=MAX_METADATA_WORKERS):
+    """
+    Resolve version names for unique (doc_id, version_id) pairs.
+
+    Pairs already in the persistent cache are not fetched; the rest are
+    fetched concurrently with at most max_workers requests in flight.
+    Successful results are added to the cache.
+
+    Returns:
+        dict mapping (doc_id, version_id) -> version name
+    """
+    cache = load_metadata_cache(cache_path)
+    names = {}
+    missing = []
+    for doc_version in doc_versions:
+        key = "/".join(doc_version)
+        if key in cache:
+            names[doc_version] = cache[key]
+        else:
+            missing.append(doc_version)
+
+    print(f"Version names: {len(doc_versions)} unique, {len(doc_versions) - len(missing)} cached, {len(missing)} to fetch")
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for doc_version, name in zip(missing, executor.map(lambda dv: fetch_version_name(*dv), missing)):
+                names[doc_version] = name
+                if name not in FAILED_NAMES:
+                    cache["/".join(doc_version)] = name
+        save_metadata_cache(cache, cache_path)
+
+    return names
+
+
+def extract_part_and_metadata(json_data, cache_path=METADATA_CACHE_FILE, max_workers=MAX_METADATA_WORKERS):
+    rows = json_data.get("rows", [])
+
+    # One metadata call per unique document version, not per row
+    # (itemSource can be null, e.g. for rows without a source document)
+    view_hrefs = [(row.get("itemSource") or {}).get("viewHref") or "" for row in rows]
+    row_doc_versions = [parse_document_version(view_href) for view_href in view_hrefs]
+    unique_doc_versions = list(dict.fromkeys(dv for dv in row_doc_versions if dv))
+    names = fetch_version_names(unique_doc_versions, cache_path, max_workers)
+
     parts = []
-    for row in json_data.get("rows", []):
+    for index, (row, view_href, doc_version) in enumerate(zip(rows, view_hrefs, row_doc_versions)):
         header = row.get("headerIdToValue", {})
-        view_href = row.get("itemSource", {}).get("viewHref", "")
 
         part_number = header.get("57f3fb8efa3416c06701d60f", "N/A")
-        version_name = get_metadata_name(view_href)
+        if doc_version:
+            version_name = names[doc_version]
+        else:
+            print(f"Metadata fetch error: could not parse viewHref '{view_href}' (row {index}, part {part_number})")
+            version_name = "Error"
 
         parts.append({
             "Part Number": part_number,
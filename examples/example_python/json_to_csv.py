@@ -5,16 +5,71 @@ JSON to CSV Converter for OnShape BOM Data
 This script converts JSON files with a headers/rows structure to CSV.
 It dynamically reads the headers array to determine column mappings,
 handling varying header configurations across different JSON files.
+
+With --format parquet/arrow the same rows are written as a typed columnar
+file instead: column types come from each header's valueType, and repeated
+strings (materials, vendors, ...) are dictionary encoded. Requires pyarrow.
+
+With --format xlsx rows are streamed into an Excel workbook in openpyxl's
+write-only mode, with cells typed the same way, so part numbers stay text
+and memory does not grow with the number of rows. Requires openpyxl.
+
+--columns keeps only the named columns and --where keeps only rows whose
+display value matches (Column=value, Column^=prefix, Column~=regex). Both
+are applied while converting, so skipped cells are never formatted.
+
+If the input is a directory or a glob pattern, every matching JSON file is
+converted across a process pool into the output directory, optionally
+followed by one merged CSV over the union of all columns.
 """
 
 import json
 import csv
 import argparse
+import glob
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Optional
+
+try:
+    import orjson
+except ImportError:  # Optional: faster JSON parsing, stdlib json otherwise
+    orjson = None
+
+# Column handling and the typed writers live in project_tools/bom_table.py,
+# shared with thumbnail_extractor.py
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'project_tools'))
+from bom_table import (
+    DEFAULT_BATCH_SIZE,
+    ColumnarWriter,
+    RowFilter,
+    XLSXWriter,
+    extract_cell_value,
+    find_column,
+    format_value,
+    get_column_kinds,
+    get_ordered_columns,
+    lookup_cell_value,
+    openpyxl,
+    pa,
+    stringify_value,
+    unique_column_names,
+)
+
+
+# File pattern used when the input is a directory
+DEFAULT_DIRECTORY_PATTERN = '**/bom_data.json'
 
 
 def load_json(filepath: str) -> dict:
-    """Load and parse JSON file."""
+    """Load and parse JSON file, with orjson when it is installed."""
+    if orjson is not None:
+        with open(filepath, 'rb') as f:
+            return orjson.loads(f.read())
     with open(filepath, 'r', encoding='utf-8') as f:
         return json.load(f)
 
@@ -64,116 +119,16 @@ def extract_header_mapping(headers: list, use_visible_only: bool = False) -> dic
     return mapping
 
 
-def get_ordered_columns(headers: list, use_visible_only: bool = False) -> list:
-    """
-    Get ordered list of columns based on headers array order.
-    
-    Returns list of tuples: (header_id, display_name, property_name)
-    """
-    columns = []
-    seen = set()
-    
-    for header in headers:
-        if use_visible_only and not header.get('visible', True):
-            continue
-        
-        header_id = header.get('id') or header.get('propertyName')
-        property_name = header.get('propertyName')
-        display_name = header.get('name', property_name)
-        
-        if header_id not in seen:
-            columns.append((header_id, display_name, property_name))
-            seen.add(header_id)
-    
-    return columns
-
-
-def extract_cell_value(row: dict, header_id: str, property_name: str) -> str:
+def collect_bom_rows(json_data, include_metadata: bool = False) -> tuple[list, list]:
     """
-    Extract cell value from a row, checking multiple possible locations.
-    
-    Row data might be stored under the header ID, property name, or in a 
-    nested 'values' or 'properties' structure.
-    """
-    # Direct lookup by header_id
-    if header_id in row:
-        return format_value(row[header_id])
-    
-    # Direct lookup by property_name
-    if property_name and property_name in row:
-        return format_value(row[property_name])
-    
-    # Check nested 'values' structure
-    if 'values' in row and isinstance(row['values'], dict):
-        if header_id in row['values']:
-            return format_value(row['values'][header_id])
-        if property_name and property_name in row['values']:
-            return format_value(row['values'][property_name])
-    
-    # Check nested 'properties' structure
-    if 'properties' in row and isinstance(row['properties'], dict):
-        if header_id in row['properties']:
-            return format_value(row['properties'][header_id])
-        if property_name and property_name in row['properties']:
-            return format_value(row['properties'][property_name])
-    
-    # Check for headerIdToValue mapping (common in OnShape API)
-    if 'headerIdToValue' in row and isinstance(row['headerIdToValue'], dict):
-        if header_id in row['headerIdToValue']:
-            return format_value(row['headerIdToValue'][header_id])
-    
-    return ''
-
-
-def format_value(value) -> str:
-    """Format a value for CSV output, handling commas and newlines appropriately."""
-    if value is None:
-        return ''
-    if isinstance(value, bool):
-        return str(value).lower()
-    if isinstance(value, dict):
-        # Handle objects like Material which might have nested structure
-        if 'displayName' in value:
-            formatted = str(value['displayName'])
-        elif 'value' in value:
-            formatted = str(value['value'])
-        elif 'name' in value:
-            formatted = str(value['name'])
-        else:
-            formatted = json.dumps(value)
-    elif isinstance(value, list):
-        formatted = '; '.join(format_value(v) for v in value)
-    else:
-        formatted = str(value)
-    
-    # Replace problematic characters with underscores to avoid CSV issues
-    # First replace comma-space with just space to avoid "_ " patterns
-    formatted = formatted.replace(', ', ' ')
-    # Then replace any remaining commas with underscores
-    formatted = formatted.replace(',', '_')
-    # Replace newlines and carriage returns with underscores
-    formatted = formatted.replace('\n', '_')
-    formatted = formatted.replace('\r', '_')
-    return formatted
-
-
-def convert_json_to_csv(
-    json_data: dict,
-    output_path: str,
-    visible_only: bool = False,
-    include_metadata: bool = False
-) -> int:
-    """
-    Convert JSON BOM data to CSV.
+    Flatten any supported JSON layout into one header list and one row list.
     
     Args:
         json_data: Parsed JSON data
-        output_path: Path for output CSV file
-        visible_only: Only include visible columns
-        include_metadata: Include source/assembly metadata as columns
+        include_metadata: Stamp source/assembly metadata onto each row
     
     Returns:
-        Number of rows written
+        tuple: (merged_headers, rows)
     """
     # Determine the list of documents/assemblies
     if isinstance(json_data, list):
@@ -219,19 +174,81 @@ def convert_json_to_csv(
         
         all_rows.extend(rows)
     
-    headers = all_headers
-    rows = all_rows
-    
-    # Get ordered columns
+    return all_headers, all_rows
+
+
+def get_output_columns(headers: list, visible_only: bool = False, include_metadata: bool = False) -> list:
+    """Get ordered output columns, with metadata columns first if requested."""
     columns = get_ordered_columns(headers, visible_only)
     
-    # Add metadata columns if requested
     if include_metadata:
         columns = [
             ('_documentName', 'Document Name', '_documentName'),
             ('_assemblyName', 'Assembly Name', '_assemblyName')
         ] + columns
     
+    return columns
+
+
+# =============================================================================
+# Column projection and row filters
+# =============================================================================
+
+def prepare_output(
+    headers: list,
+    visible_only: bool = False,
+    include_metadata: bool = False,
+    column_names: Optional[list] = None,
+    where: Optional[list] = None
+) -> tuple[list, list]:
+    """
+    Resolve output columns and row filters.
+    
+    Args:
+        column_names: Columns to keep, in output order (default: all columns,
+            honoring visible_only)
+        where: Filter expressions, all of which must match
+    
+    Returns:
+        tuple: (columns, filters)
+    """
+    all_columns = get_output_columns(headers, False, include_metadata)
+    
+    if column_names:
+        columns = [find_column(name, all_columns) for name in column_names]
+    else:
+        columns = get_output_columns(headers, visible_only, include_metadata)
+    
+    filters = [RowFilter(expression, all_columns) for expression in (where or [])]
+    return columns, filters
+
+
+def convert_json_to_csv(
+    json_data: dict,
+    output_path: str,
+    visible_only: bool = False,
+    include_metadata: bool = False,
+    column_names: Optional[list] = None,
+    where: Optional[list] = None
+) -> int:
+    """
+    Convert JSON BOM data to CSV.
+    
+    Args:
+        json_data: Parsed JSON data
+        output_path: Path for output CSV file
+        visible_only: Only include visible columns
+        include_metadata: Include source/assembly metadata as columns
+        column_names: Only output these columns (see prepare_output)
+        where: Only output rows matching all filter expressions
+    
+    Returns:
+        Number of rows written
+    """
+    headers, rows = collect_bom_rows(json_data, include_metadata)
+    columns, filters = prepare_output(headers, visible_only, include_metadata, column_names, where)
+    written = 0
+    
     # Write CSV
     with open(output_path, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
@@ -239,15 +256,301 @@ def convert_json_to_csv(
         # Write header row
         writer.writerow([col[1] for col in columns])
         
-        # Write data rows
+        # Write data rows (filters run before any output cell is formatted)
         for row in rows:
+            if filters and not all(row_filter.matches(row) for row_filter in filters):
+                continue
             csv_row = [
                 extract_cell_value(row, col[0], col[2])
                 for col in columns
             ]
             writer.writerow(csv_row)
+            written += 1
+    
+    return written
+
+
+# =============================================================================
+# Typed columnar output (Parquet / Arrow)
+# =============================================================================
+
+def convert_json_to_columnar(
+    json_data: dict,
+    output_path: str,
+    fmt: str = 'parquet',
+    visible_only: bool = False,
+    include_metadata: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    column_names: Optional[list] = None,
+    where: Optional[list] = None
+) -> int:
+    """
+    Convert JSON BOM data to a typed Parquet or Arrow IPC file.
+    
+    Args:
+        json_data: Parsed JSON data
+        output_path: Path for output file
+        fmt: 'parquet' or 'arrow'
+        visible_only: Only include visible columns
+        include_metadata: Include source/assembly metadata as columns
+        batch_size: Rows per record batch
+        column_names: Only output these columns (see prepare_output)
+        where: Only output rows matching all filter expressions
     
-    return len(rows)
+    Returns:
+        Number of rows written
+    """
+    headers, rows = collect_bom_rows(json_data, include_metadata)
+    columns, filters = prepare_output(headers, visible_only, include_metadata, column_names, where)
+    
+    writer = ColumnarWriter(
+        output_path,
+        unique_column_names(columns),
+        get_column_kinds(headers, columns),
+        fmt=fmt,
+        batch_size=batch_size
+    )
+    for row in rows:
+        if filters and not all(row_filter.matches(row) for row_filter in filters):
+            continue
+        writer.append([
+            lookup_cell_value(row, col[0], col[2])
+            for col in columns
+        ])
+    writer.close()
+    
+    if writer.coerced_nulls:
+        print(f"Warning: {writer.coerced_nulls} values did not match their column type and were written as null")
+    
+    return writer.rows_written
+
+
+# =============================================================================
+# Excel output
+# =============================================================================
+
+def convert_json_to_xlsx(
+    json_data: dict,
+    output_path: str,
+    visible_only: bool = False,
+    include_metadata: bool = False,
+    column_names: Optional[list] = None,
+    where: Optional[list] = None
+) -> int:
+    """
+    Convert JSON BOM data to an Excel workbook with typed cells.
+    
+    Args:
+        json_data: Parsed JSON data
+        output_path: Path for output .xlsx file
+        visible_only: Only include visible columns
+        include_metadata: Include source/assembly metadata as columns
+        column_names: Only output these columns (see prepare_output)
+        where: Only output rows matching all filter expressions
+    
+    Returns:
+        Number of rows written
+    """
+    headers, rows = collect_bom_rows(json_data, include_metadata)
+    columns, filters = prepare_output(headers, visible_only, include_metadata, column_names, where)
+    
+    writer = XLSXWriter(
+        output_path,
+        [str(col[1] or col[2] or col[0]) for col in columns],
+        get_column_kinds(headers, columns)
+    )
+    for row in rows:
+        if filters and not all(row_filter.matches(row) for row_filter in filters):
+            continue
+        writer.append([
+            lookup_cell_value(row, col[0], col[2])
+            for col in columns
+        ])
+    writer.close()
+    
+    return writer.rows_written
+
+
+# =============================================================================
+# Directory / glob mode
+# =============================================================================
+
+def expand_inputs(input_spec: str, pattern: str = DEFAULT_DIRECTORY_PATTERN) -> tuple[Path, list]:
+    """
+    Resolve a directory or glob pattern into the JSON files to convert.
+    
+    Returns:
+        tuple: (base_directory, sorted_input_paths) - outputs mirror each
+        input's path relative to base_directory
+    """
+    input_path = Path(input_spec)
+    if input_path.is_dir():
+        return input_path, sorted(p for p in input_path.glob(pattern) if p.is_file())
+    
+    # Glob: the base is the longest leading part without wildcards
+    base_parts = []
+    for part in input_path.parts:
+        if glob.has_magic(part):
+            break
+        base_parts.append(part)
+    base = Path(*base_parts) if base_parts else Path('.')
+    matches = sorted(Path(p) for p in glob.glob(input_spec, recursive=True))
+    return base, [p for p in matches if p.is_file()]
+
+
+def convert_file(task: tuple) -> dict:
+    """
+    Convert one JSON file; runs inside a worker process.
+    
+    Args:
+        task: (input_path, output_path, fmt, visible_only, include_metadata,
+               batch_size, column_names, where)
+    
+    Returns:
+        dict with input, output, rows and error (None on success)
+    """
+    input_path, output_path, fmt, visible_only, include_metadata, batch_size, column_names, where = task
+    result = {'input': input_path, 'output': output_path, 'rows': 0, 'error': None}
+    
+    try:
+        json_data = load_json(input_path)
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        if fmt == 'csv':
+            result['rows'] = convert_json_to_csv(
+                json_data, output_path, visible_only, include_metadata, column_names, where
+            )
+        elif fmt == 'xlsx':
+            result['rows'] = convert_json_to_xlsx(
+                json_data, output_path, visible_only, include_metadata, column_names, where
+            )
+        else:
+            result['rows'] = convert_json_to_columnar(
+                json_data, output_path, fmt, visible_only, include_metadata, batch_size,
+                column_names, where
+            )
+    except Exception as e:
+        result['error'] = str(e)
+    
+    return result
+
+
+def merge_csv_files(csv_paths: list, output_path: str, source_names: list) -> int:
+    """
+    Merge per-file CSVs into one CSV over the union of their columns.
+    
+    Columns keep first-seen order; a column repeated within one file is kept
+    apart as "Name (2)", "Name (3)", ... A leading 'Source File' column
+    records which input each row came from.
+    
+    Returns:
+        Number of rows written
+    """
+    def column_keys(header_row: list) -> list:
+        counts = {}
+        keys = []
+        for name in header_row:
+            counts[name] = counts.get(name, 0) + 1
+            keys.append(name if counts[name] == 1 else f"{name} ({counts[name]})")
+        return keys
+    
+    # Pass 1: header union (only the first line of each file)
+    union = {}
+    file_keys = []
+    for path in csv_paths:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            keys = column_keys(next(csv.reader(f), []))
+        file_keys.append(keys)
+        for key in keys:
+            union.setdefault(key, len(union))
+    
+    # Pass 2: stream rows into their union positions
+    row_count = 0
+    with open(output_path, 'w', newline='', encoding='utf-8') as out:
+        writer = csv.writer(out)
+        writer.writerow(['Source File'] + list(union))
+        
+        for path, keys, source in zip(csv_paths, file_keys, source_names):
+            positions = [union[key] for key in keys]
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                for row in reader:
+                    merged = [''] * len(union)
+                    for position, value in zip(positions, row):
+                        merged[position] = value
+                    writer.writerow([source] + merged)
+                    row_count += 1
+    
+    return row_count
+
+
+def convert_directory(
+    input_spec: str,
+    output_dir: str,
+    fmt: str = 'csv',
+    visible_only: bool = False,
+    include_metadata: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    jobs: Optional[int] = None,
+    pattern: str = DEFAULT_DIRECTORY_PATTERN,
+    merged_path: Optional[str] = None,
+    column_names: Optional[list] = None,
+    where: Optional[list] = None
+) -> dict:
+    """
+    Convert every JSON file matched by a directory or glob across a process pool.
+    
+    Each input is written to output_dir under its path relative to the input
+    base, with the extension for fmt. Parsing and formatting are CPU-bound,
+    so files are spread over `jobs` worker processes (default: CPU count).
+    
+    Returns:
+        Stats dict: files, failed, rows, seconds, files_per_sec, rows_per_sec
+    """
+    base, inputs = expand_inputs(input_spec, pattern)
+    extension = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow', 'xlsx': '.xlsx'}[fmt]
+    
+    tasks = []
+    for input_path in inputs:
+        relative = input_path.relative_to(base) if input_path.is_relative_to(base) else Path(input_path.name)
+        output_path = Path(output_dir) / relative.with_suffix(extension)
+        tasks.append((
+            str(input_path), str(output_path), fmt, visible_only, include_metadata,
+            batch_size, column_names, where
+        ))
+    
+    start = time.perf_counter()
+    results = []
+    if tasks:
+        workers = min(jobs or os.cpu_count() or 1, len(tasks))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for i, result in enumerate(executor.map(convert_file, tasks), 1):
+                if result['error']:
+                    print(f"[{i}/{len(tasks)}] ERROR {result['input']}: {result['error']}")
+                else:
+                    print(f"[{i}/{len(tasks)}] {result['input']} -> {result['output']} ({result['rows']} rows)")
+                results.append(result)
+    
+    succeeded = [r for r in results if not r['error']]
+    if merged_path and succeeded:
+        print(f"Merging {len(succeeded)} CSVs into: {merged_path}")
+        merge_csv_files(
+            [r['output'] for r in succeeded],
+            merged_path,
+            [str(Path(r['input']).relative_to(base)) if Path(r['input']).is_relative_to(base) else r['input']
+             for r in succeeded]
+        )
+    
+    elapsed = time.perf_counter() - start
+    total_rows = sum(r['rows'] for r in succeeded)
+    return {
+        'files': len(succeeded),
+        'failed': len(results) - len(succeeded),
+        'rows': total_rows,
+        'seconds': elapsed,
+        'files_per_sec': len(succeeded) / elapsed if elapsed else 0.0,
+        'rows_per_sec': total_rows / elapsed if elapsed else 0.0,
+    }
 
 
 def main():
@@ -259,10 +562,15 @@ Examples:
   python json_to_csv.py input.json output.csv
   python json_to_csv.py input.json output.csv --visible-only
   python json_to_csv.py input.json output.csv --include-metadata
+  python json_to_csv.py input.json output.parquet --format parquet
+  python json_to_csv.py input.json output.xlsx --format xlsx
+  python json_to_csv.py thumbnail_extraction/ csv_out/ --merged all_boms.csv
+  python json_to_csv.py "thumbnail_extraction/*/bom_data.json" csv_out/ --jobs 8
+  python json_to_csv.py input.json out.csv --columns "Part number,Name,Quantity" --where "Part number~=^(PRT|ASM)"
         '''
     )
-    parser.add_argument('input', help='Input JSON file path')
-    parser.add_argument('output', help='Output CSV file path')
+    parser.add_argument('input', help='Input JSON file path, directory, or glob pattern')
+    parser.add_argument('output', help='Output file path (output directory for directory/glob input)')
     parser.add_argument(
         '--visible-only', '-v',
         action='store_true',
@@ -273,21 +581,128 @@ Examples:
         action='store_true',
         help='Include document/assembly metadata as columns'
     )
+    parser.add_argument(
+        '--format', '-f',
+        choices=['csv', 'parquet', 'arrow', 'xlsx'],
+        default='csv',
+        help='Output format; parquet/arrow write typed columns (requires pyarrow), '
+             'xlsx writes typed cells (requires openpyxl)'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f'Rows per record batch for parquet/arrow output (default: {DEFAULT_BATCH_SIZE})'
+    )
+    parser.add_argument(
+        '--columns', '-c',
+        action='append',
+        metavar='NAMES',
+        help='Comma-separated columns to output, by name, propertyName or header ID (repeatable)'
+    )
+    parser.add_argument(
+        '--where', '-w',
+        action='append',
+        metavar='EXPR',
+        help='Keep rows where Column=value, Column^=prefix or Column~=regex (repeatable, all must match)'
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=None,
+        help='Worker processes for directory/glob input (default: CPU count)'
+    )
+    parser.add_argument(
+        '--pattern',
+        default=DEFAULT_DIRECTORY_PATTERN,
+        help=f'File pattern when input is a directory (default: {DEFAULT_DIRECTORY_PATTERN})'
+    )
+    parser.add_argument(
+        '--merged',
+        metavar='PATH',
+        help='Also write one CSV merging all converted files (directory/glob input, csv format)'
+    )
     
     args = parser.parse_args()
     
+    column_names = None
+    if args.columns:
+        column_names = [name.strip() for value in args.columns for name in value.split(',') if name.strip()]
+    
+    if args.format == 'xlsx' and openpyxl is None:
+        print("Error: --format xlsx requires openpyxl (pip install openpyxl)")
+        return
+    
+    if args.format in ('parquet', 'arrow') and pa is None:
+        print(f"Error: --format {args.format} requires pyarrow (pip install pyarrow)")
+        return
+    
+    if Path(args.input).is_dir() or glob.has_magic(args.input):
+        if args.merged and args.format != 'csv':
+            print("Error: --merged is only supported with --format csv")
+            return
+        
+        print(f"Converting files from: {args.input}")
+        stats = convert_directory(
+            args.input,
+            args.output,
+            fmt=args.format,
+            visible_only=args.visible_only,
+            include_metadata=args.include_metadata,
+            batch_size=args.batch_size,
+            jobs=args.jobs,
+            pattern=args.pattern,
+            merged_path=args.merged,
+            column_names=column_names,
+            where=args.where
+        )
+        print(
+            f"Done! Converted {stats['files']} files ({stats['failed']} failed), "
+            f"{stats['rows']} rows in {stats['seconds']:.2f}s "
+            f"({stats['files_per_sec']:.1f} files/sec, {stats['rows_per_sec']:.0f} rows/sec)"
+        )
+        return
+    
     # Load JSON
     print(f"Loading JSON from: {args.input}")
     json_data = load_json(args.input)
     
-    # Convert to CSV
-    print(f"Converting to CSV...")
-    row_count = convert_json_to_csv(
-        json_data,
-        args.output,
-        visible_only=args.visible_only,
-        include_metadata=args.include_metadata
-    )
+    try:
+        if args.format == 'csv':
+            print(f"Converting to CSV...")
+            row_count = convert_json_to_csv(
+                json_data,
+                args.output,
+                visible_only=args.visible_only,
+                include_metadata=args.include_metadata,
+                column_names=column_names,
+                where=args.where
+            )
+        elif args.format == 'xlsx':
+            print(f"Converting to XLSX...")
+            row_count = convert_json_to_xlsx(
+                json_data,
+                args.output,
+                visible_only=args.visible_only,
+                include_metadata=args.include_metadata,
+                column_names=column_names,
+                where=args.where
+            )
+        else:
+            print(f"Converting to {args.format}...")
+            row_count = convert_json_to_columnar(
+                json_data,
+                args.output,
+                fmt=args.format,
+                visible_only=args.visible_only,
+                include_metadata=args.include_metadata,
+                batch_size=args.batch_size,
+                column_names=column_names,
+                where=args.where
+            )
+    except (ValueError, re.error) as e:
+        print(f"Error: {e}")
+        return
     
     print(f"Done! Wrote {row_count} rows to: {args.output}")
 
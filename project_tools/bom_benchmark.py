@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+BOM Benchmark
+
+Times the BOM processing paths of thumbnail_extractor on synthetic BOMs
+shaped like OnShape API responses (nested headerIdToValue, dict-valued
+materials, list values, thumbnail info).
+
+Benchmarks:
+- serialization: JSONSerializer dumps/loads per backend, compact vs pretty
+- conversion: each stage of the BOM table / CSV path, with wall time and
+  tracemalloc peak memory per stage: the public get_ordered_columns,
+  format_value and extract_cell_value that json_to_csv.py converts with
+  (defined in bom_table.py), then CSVReportGenerator.generate
+
+Usage:
+    python bom_benchmark.py
+    python bom_benchmark.py --rows 1000 10000 --repeat 5
+    python bom_benchmark.py --benchmark conversion --json bench.json
+    python bom_benchmark.py --json new.json --compare old.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from bom_table import extract_cell_value, format_value, get_ordered_columns, lookup_cell_value
+from thumbnail_extractor import CSVReportGenerator, ExtractionSummary, JSONSerializer, orjson
+
+
+# =============================================================================
+# Synthetic BOM Data
+# =============================================================================
+
+# Standard OnShape BOM headers: (id, propertyName, name, valueType)
+STANDARD_HEADERS = [
+    ("57f3fb8efa3416c06701d60e", "item", "Item", "STRING"),
+    ("57f3fb8efa3416c06701d60c", "quantity", "Quantity", "QUANTITY"),
+    ("57f3fb8efa3416c06701d60f", "partNumber", "Part number", "STRING"),
+    ("57f3fb8efa3416c06701d60d", "name", "Name", "STRING"),
+    ("57f3fb8efa3416c06701d610", "description", "Description", "STRING"),
+    ("57f3fb8efa3416c06701d615", "material", "Material", "MATERIAL"),
+    ("57f3fb8efa3416c06701d611", "revision", "Revision", "STRING"),
+    ("57f3fb8efa3416c06701d612", "state", "State", "ENUM"),
+    ("57f3fb8efa3416c06701d614", "vendor", "Vendor", "STRING"),
+    ("57f3fb8efa3416c06701d61a", "mass", "Mass", "VALUE_WITH_UNITS"),
+    ("57f3fb8efa3416c06701d61b", "exclude", "Exclude from BOM", "BOOLEAN"),
+    ("57f3fb8efa3416c06701d61c", "tags", "Tags", "LIST"),
+]
+
+MATERIALS = ["Steel", "Aluminum - 6061", "ABS", "Brass", "Nylon 6/6", "Stainless Steel 304"]
+VENDORS = ["McMaster-Carr", "Misumi", "Digi-Key", "In-house", ""]
+STATES = ["IN_PROGRESS", "RELEASED", "PENDING"]
+
+
+def make_headers(extra_columns: int = 0) -> list:
+    """Build BOM headers: the standard set plus extra custom properties."""
+    headers = [
+        {
+            "id": header_id,
+            "propertyName": property_name,
+            "name": name,
+            "valueType": value_type,
+            "visible": True,
+        }
+        for header_id, property_name, name, value_type in STANDARD_HEADERS
+    ]
+    for i in range(extra_columns):
+        headers.append({
+            "id": f"{0x5f000000 + i:024x}",
+            "propertyName": f"custom{i}",
+            "name": f"Custom {i}",
+            "valueType": "STRING" if i % 3 else "DOUBLE",
+            "visible": i % 2 == 0,
+        })
+    return headers
+
+
+def make_synthetic_bom(rows: int, extra_columns: int = 20, seed: int = 0) -> dict:
+    """
+    Generate a BOM response with realistic header and row shapes.
+
+    Args:
+        rows: Number of BOM rows
+        extra_columns: Custom property columns beyond the standard headers
+        seed: Random seed, so every run sees identical data
+    """
+    rng = random.Random(seed)
+    headers = make_headers(extra_columns)
+    custom_headers = headers[len(STANDARD_HEADERS):]
+    document_ids = [f"{rng.getrandbits(96):024x}" for _ in range(max(1, rows // 25))]
+
+    bom_rows = []
+    for i in range(rows):
+        prefix = rng.choice(("PRT", "PRT", "ASM", "HW"))
+        part_number = f"{prefix}-{i:06d}"
+        document_id = rng.choice(document_ids)
+        href = f"https://cad.onshape.com/api/thumbnails/d/{document_id}/v/{i:024x}"
+
+        values = {
+            "57f3fb8efa3416c06701d60e": str(i + 1),
+            "57f3fb8efa3416c06701d60c": rng.randint(1, 12),
+            "57f3fb8efa3416c06701d60f": part_number,
+            "57f3fb8efa3416c06701d60d": f"Part {i}, rev {rng.randint(1, 5)}",
+            "57f3fb8efa3416c06701d610": "Machined bracket\nsee drawing" if i % 4 == 0 else "",
+            "57f3fb8efa3416c06701d615": {
+                "displayName": rng.choice(MATERIALS),
+                "libraryName": "Onshape Material Library",
+                "id": f"mat-{rng.randint(1, 40)}",
+            },
+            "57f3fb8efa3416c06701d611": rng.choice("ABCD"),
+            "57f3fb8efa3416c06701d612": rng.choice(STATES),
+            "57f3fb8efa3416c06701d614": rng.choice(VENDORS),
+            "57f3fb8efa3416c06701d61a": f"{rng.uniform(0.001, 20):.3f} kg",
+            "57f3fb8efa3416c06701d61b": i % 17 == 0,
+            "57f3fb8efa3416c06701d61c": [rng.choice(("fastener", "machined", "printed")) for _ in range(i % 3)],
+        }
+        for header in custom_headers:
+            if rng.random() < 0.7:
+                if header["valueType"] == "DOUBLE":
+                    values[header["id"]] = round(rng.uniform(0, 100), 2)
+                else:
+                    values[header["id"]] = f"value {rng.randint(0, 50)}"
+
+        bom_rows.append({
+            "indentLevel": rng.randint(0, 3),
+            "headerIdToValue": values,
+            "itemSource": {
+                "documentId": document_id,
+                "itemName": f"Part {i}",
+                "viewHref": f"https://cad.onshape.com/documents/{document_id}/v/{i:024x}/e/{i:024x}",
+                "thumbnailInfo": {
+                    "sizes": [
+                        {"size": size, "href": f"{href}/s/{size}", "mediaType": "image/png"}
+                        for size in ("300x300", "600x340", "300x170", "70x40")
+                    ]
+                },
+            },
+        })
+
+    return {
+        "headers": headers,
+        "rows": bom_rows,
+        "bomSource": {
+            "document": {"name": "Benchmark Assembly"},
+            "version": {"name": "V1"},
+        },
+    }
+
+
+# =============================================================================
+# Timing
+# =============================================================================
+
+def time_call(fn, repeat: int) -> float:
+    """Return the best wall time of `repeat` calls, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure_peak(fn) -> int:
+    """Run fn once under tracemalloc and return its peak allocation in bytes."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_serialization(bom: dict, repeat: int) -> list:
+    """Time JSONSerializer dumps/loads for every available backend and mode."""
+    backends = ['json'] + (['orjson'] if orjson is not None else [])
+    results = []
+
+    for backend in backends:
+        for pretty in (False, True):
+            serializer = JSONSerializer(pretty=pretty, backend=backend)
+            data = serializer.dumps(bom)
+            results.append({
+                "benchmark": "serialization",
+                "backend": backend,
+                "mode": "pretty" if pretty else "compact",
+                "bytes": len(data),
+                "dumps_s": time_call(lambda: serializer.dumps(bom), repeat),
+                "loads_s": time_call(lambda: serializer.loads(data), repeat),
+            })
+
+    return results
+
+
+def bench_conversion(bom: dict, repeat: int) -> list:
+    """
+    Time each stage of the BOM-to-CSV conversion.
+
+    Stages are measured in isolation so a regression can be pinned to one
+    of them: json_to_csv's column ordering, value formatting alone and cell
+    lookup plus formatting over the whole table, then the full
+    CSVReportGenerator.generate (file I/O and part_lookup collection
+    included). Timings and peak memory
+    come from separate runs, since tracemalloc slows the code it traces.
+    """
+    generator = CSVReportGenerator()
+    headers = bom["headers"]
+    rows = bom["rows"]
+    columns = get_ordered_columns(headers)
+    raw_values = [
+        lookup_cell_value(row, col[0], col[2])
+        for row in rows
+        for col in columns
+    ]
+
+    def ordered_columns():
+        get_ordered_columns(headers)
+
+    def format_values():
+        for value in raw_values:
+            format_value(value)
+
+    def extract_cells():
+        for row in rows:
+            for col in columns:
+                extract_cell_value(row, col[0], col[2])
+
+    with tempfile.TemporaryDirectory() as output_folder:
+        def csv_generate():
+            with contextlib.redirect_stdout(io.StringIO()):
+                if generator.generate(output_folder, ExtractionSummary(), bom) is None:
+                    raise RuntimeError("CSVReportGenerator.generate failed")
+
+        stages = [
+            ("get_ordered_columns", ordered_columns, 1),
+            ("format_value", format_values, len(raw_values)),
+            ("extract_cell_value", extract_cells, len(raw_values)),
+            ("csv_generate", csv_generate, len(rows)),
+        ]
+
+        results = []
+        for stage, fn, items in stages:
+            seconds = time_call(fn, repeat)
+            results.append({
+                "benchmark": "conversion",
+                "stage": stage,
+                "items": items,
+                "seconds": seconds,
+                "items_per_sec": items / seconds if seconds else None,
+                "peak_bytes": measure_peak(fn),
+            })
+
+        results[-1]["csv_bytes"] = os.path.getsize(os.path.join(output_folder, "bom_data.csv"))
+
+    return results
+
+
+# =============================================================================
+# Comparison
+# =============================================================================
+
+def result_key(result: dict) -> tuple:
+    """Identify the same measurement across reports."""
+    return (
+        result["benchmark"],
+        result["rows"],
+        result.get("stage") or f"{result.get('backend')}/{result.get('mode')}",
+    )
+
+
+def result_seconds(result: dict) -> float:
+    if result["benchmark"] == "serialization":
+        return result["dumps_s"] + result["loads_s"]
+    return result["seconds"]
+
+
+def compare_reports(baseline: dict, report: dict):
+    """Print per-measurement speedup and memory change against a baseline report."""
+    old_results = {result_key(r): r for r in baseline.get("results", [])}
+    print(f"\nComparison with baseline ({baseline.get('revision') or 'unknown revision'}, "
+          f"{baseline.get('generated_at', '?')})")
+    print(f"  {'measurement':<44} {'before':>10} {'after':>10} {'speedup':>8} {'peak mem':>9}")
+
+    for r in report["results"]:
+        old = old_results.get(result_key(r))
+        if old is None:
+            continue
+        before, after = result_seconds(old), result_seconds(r)
+        name = "{} {:,} {}".format(*result_key(r))
+        memory = ""
+        if old.get("peak_bytes") and r.get("peak_bytes") is not None:
+            memory = f"{(r['peak_bytes'] / old['peak_bytes'] - 1) * 100:+.0f}%"
+        print(
+            f"  {name:<44} {before * 1000:>8.1f}ms {after * 1000:>8.1f}ms "
+            f"{before / after if after else float('inf'):>7.2f}x {memory:>9}"
+        )
+
+
+# =============================================================================
+# Main
+# =============================================================================
+
+def git_revision() -> str:
+    """Short commit hash of the checkout, with '+' if it has local changes."""
+    try:
+        cwd = os.path.dirname(os.path.abspath(__file__))
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=cwd, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=cwd, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        return revision + ("+" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_serialization(rows: int, results: list):
+    print(f"\nSerialization ({rows:,} rows)")
+    print(f"  {'backend':<8} {'mode':<8} {'size':>12} {'dumps':>10} {'loads':>10}")
+    for r in results:
+        print(
+            f"  {r['backend']:<8} {r['mode']:<8} {r['bytes']:>12,} "
+            f"{r['dumps_s'] * 1000:>8.1f}ms {r['loads_s'] * 1000:>8.1f}ms"
+        )
+
+
+def print_conversion(rows: int, results: list):
+    print(f"\nConversion ({rows:,} rows)")
+    print(f"  {'stage':<20} {'items':>10} {'time':>10} {'items/s':>12} {'peak mem':>10}")
+    for r in results:
+        print(
+            f"  {r['stage']:<20} {r['items']:>10,} {r['seconds'] * 1000:>8.2f}ms "
+            f"{r['items_per_sec']:>12,.0f} {r['peak_bytes'] / 1024 / 1024:>7.2f}MiB"
+        )
+
+
+BENCHMARKS = {
+    "serialization": (bench_serialization, print_serialization),
+    "conversion": (bench_conversion, print_conversion),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BOM processing paths")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000], help="BOM sizes to benchmark")
+    parser.add_argument("--extra-columns", type=int, default=20, help="Custom property columns per BOM")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument(
+        "--benchmark", "-b",
+        choices=sorted(BENCHMARKS),
+        action="append",
+        help="Benchmark to run (repeatable; default: all)"
+    )
+    parser.add_argument("--json", metavar="PATH", help="Also write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="Compare against a previous --json report")
+
+    args = parser.parse_args()
+    selected = args.benchmark or sorted(BENCHMARKS)
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.compare) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot read baseline '{args.compare}': {e}")
+            return 1
+
+    report = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "orjson": getattr(orjson, "__version__", None),
+        "extra_columns": args.extra_columns,
+        "repeat": args.repeat,
+        "results": [],
+    }
+
+    for rows in args.rows:
+        bom = make_synthetic_bom(rows, args.extra_columns)
+        for name in selected:
+            bench, print_results = BENCHMARKS[name]
+            results = bench(bom, args.repeat)
+            for r in results:
+                r["rows"] = rows
+            report["results"].extend(results)
+            print_results(rows, results)
+
+    if baseline is not None:
+        compare_reports(baseline, report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to: {args.json}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
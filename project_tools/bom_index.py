@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+BOM Index
+
+Command-line access to the SQLite index written by SQLiteReportGenerator.
+
+Usage:
+    python bom_index.py index                      # backfill from thumbnail_extraction/
+    python bom_index.py find PRT-1234              # assemblies using a part
+    python bom_index.py find PRT-12 --prefix       # part number prefix search
+    python bom_index.py find PRT-1234 --json
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from thumbnail_extractor import SQLiteReportGenerator
+
+
+def cmd_index(index: SQLiteReportGenerator, args) -> int:
+    start = time.perf_counter()
+    count = index.index_existing(args.root)
+    print(f"Indexed {count} extraction folders from {args.root} into {index.db_path} "
+          f"in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+def cmd_find(index: SQLiteReportGenerator, args) -> int:
+    start = time.perf_counter()
+    matches = index.find_part(args.part_number, prefix=args.prefix)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if args.json:
+        print(json.dumps(matches, indent=2))
+        return 0
+
+    if not matches:
+        print(f"No assemblies found for '{args.part_number}' ({elapsed_ms:.1f}ms)")
+        return 1
+
+    print(f"{len(matches)} matches for '{args.part_number}' ({elapsed_ms:.1f}ms):")
+    for m in matches:
+        thumb = "thumbnail" if m["thumbnail_downloaded"] else "no thumbnail"
+        print(
+            f"  {m['part_number']}  {m['document_name']} / {m['assembly_name']} "
+            f"[{m['version_name']}]  row {m['row_index']}, {thumb}  ({m['output_folder']})"
+        )
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the BOM SQLite index")
+    parser.add_argument(
+        "--db",
+        default=SQLiteReportGenerator.DEFAULT_DB_PATH,
+        help=f"Database path (default: {SQLiteReportGenerator.DEFAULT_DB_PATH})"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = subparsers.add_parser("index", help="Index existing extraction folders")
+    index_parser.add_argument("root", nargs="?", default="thumbnail_extraction", help="Extraction root folder")
+
+    find_parser = subparsers.add_parser("find", help="Find assemblies using a part number")
+    find_parser.add_argument("part_number", help="Part number to look up")
+    find_parser.add_argument("--prefix", action="store_true", help="Treat part_number as a prefix")
+    find_parser.add_argument("--json", action="store_true", help="Print matches as JSON")
+
+    args = parser.parse_args()
+    index = SQLiteReportGenerator(args.db)
+
+    if args.command == "index":
+        return cmd_index(index, args)
+    return cmd_find(index, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
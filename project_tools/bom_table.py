@@ -0,0 +1,503 @@
+"""
+BOM Table
+
+Column handling shared by the BOM exporters (thumbnail_extractor.py and
+examples/example_python/json_to_csv.py): column order and cell lookup,
+display formatting, --columns/--where resolution, and the typed
+Parquet/Arrow and Excel writers.
+
+Rows are OnShape BOM rows (headers/rows JSON); a column is a
+(header_id, display_name, property_name) tuple.
+"""
+
+import json
+import re
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: only needed for ColumnarWriter
+    pa = None
+    pq = None
+
+try:
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+except ImportError:  # Optional: only needed for XLSXWriter
+    openpyxl = None
+
+
+# Column kind per header valueType for typed (columnar / xlsx) output.
+# Any valueType not listed here is stored as a string column.
+VALUE_TYPE_KINDS = {
+    'INTEGER': 'integer',
+    'DOUBLE': 'numeric',
+    'NUMBER': 'numeric',
+    'QUANTITY': 'numeric',
+    'BOOLEAN': 'boolean',
+    'LIST': 'list',
+}
+
+# Rows buffered per record batch when writing columnar output
+DEFAULT_BATCH_SIZE = 5000
+
+# String columns whose first batch has at most this ratio of distinct values
+# are dictionary encoded (materials, vendors, revisions, ...)
+DICTIONARY_RATIO = 0.5
+
+# Excel limits: rows per sheet (including the header) and characters per cell
+XLSX_MAX_ROWS = 1048576
+XLSX_MAX_CELL_CHARS = 32767
+
+
+# =============================================================================
+# Columns and cell values
+# =============================================================================
+
+def get_ordered_columns(headers: list, use_visible_only: bool = False) -> list:
+    """
+    Get ordered list of columns based on headers array order.
+    
+    Returns list of tuples: (header_id, display_name, property_name)
+    """
+    columns = []
+    seen = set()
+    
+    for header in headers:
+        if use_visible_only and not header.get('visible', True):
+            continue
+        
+        header_id = header.get('id') or header.get('propertyName')
+        property_name = header.get('propertyName')
+        display_name = header.get('name', property_name)
+        
+        if header_id not in seen:
+            columns.append((header_id, display_name, property_name))
+            seen.add(header_id)
+    
+    return columns
+
+
+def lookup_cell_value(row: dict, header_id: str, property_name: str):
+    """
+    Find the raw cell value in a row, checking multiple possible locations.
+    
+    Row data might be stored under the header ID, property name, or in a 
+    nested 'values' or 'properties' structure.
+    
+    Returns:
+        The raw value, or None if the row has no value for this column
+    """
+    # Direct lookup by header_id
+    if header_id in row:
+        return row[header_id]
+    
+    # Direct lookup by property_name
+    if property_name and property_name in row:
+        return row[property_name]
+    
+    # Check nested 'values' structure
+    if 'values' in row and isinstance(row['values'], dict):
+        if header_id in row['values']:
+            return row['values'][header_id]
+        if property_name and property_name in row['values']:
+            return row['values'][property_name]
+    
+    # Check nested 'properties' structure
+    if 'properties' in row and isinstance(row['properties'], dict):
+        if header_id in row['properties']:
+            return row['properties'][header_id]
+        if property_name and property_name in row['properties']:
+            return row['properties'][property_name]
+    
+    # Check for headerIdToValue mapping (common in OnShape API)
+    if 'headerIdToValue' in row and isinstance(row['headerIdToValue'], dict):
+        if header_id in row['headerIdToValue']:
+            return row['headerIdToValue'][header_id]
+    
+    return None
+
+
+def extract_cell_value(row: dict, header_id: str, property_name: str) -> str:
+    """Extract a cell value from a row, formatted for CSV output."""
+    return format_value(lookup_cell_value(row, header_id, property_name))
+
+
+def stringify_value(value) -> str:
+    """Convert a raw BOM value to its display string, without CSV sanitizing."""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, dict):
+        # Handle objects like Material which might have nested structure
+        if 'displayName' in value:
+            return str(value['displayName'])
+        if 'value' in value:
+            return str(value['value'])
+        if 'name' in value:
+            return str(value['name'])
+        return json.dumps(value)
+    if isinstance(value, list):
+        return '; '.join(stringify_value(v) for v in value)
+    return str(value)
+
+
+def format_value(value) -> str:
+    """Format a value for CSV output, handling commas and newlines appropriately."""
+    formatted = stringify_value(value)
+    
+    # Replace problematic characters with underscores to avoid CSV issues
+    # First replace comma-space with just space to avoid "_ " patterns
+    formatted = formatted.replace(', ', ' ')
+    # Then replace any remaining commas with underscores
+    formatted = formatted.replace(',', '_')
+    # Replace newlines and carriage returns with underscores
+    formatted = formatted.replace('\n', '_')
+    formatted = formatted.replace('\r', '_')
+    return formatted
+
+
+# =============================================================================
+# Column projection and row filters
+# =============================================================================
+
+def find_column(name: str, columns: list) -> tuple:
+    """
+    Resolve a column by display name, property name or header ID.
+    
+    Exact matches win over case-insensitive ones.
+    
+    Raises:
+        ValueError: If no column matches
+    """
+    for column in columns:
+        if name in column:
+            return column
+    
+    lowered = name.lower()
+    for column in columns:
+        if any(part and str(part).lower() == lowered for part in column):
+            return column
+    
+    available = ', '.join(str(col[1]) for col in columns)
+    raise ValueError(f"Unknown column '{name}'. Available columns: {available}")
+
+
+class RowFilter:
+    """
+    A --where predicate on one column's display value (before CSV sanitizing).
+    
+    Supported forms:
+        Column=value    equality
+        Column^=prefix  prefix match
+        Column~=regex   regular expression search
+    """
+    
+    def __init__(self, expression: str, columns: list):
+        eq_index = expression.find('=')
+        if eq_index <= 0:
+            raise ValueError(f"Invalid filter '{expression}'. Expected Column=value, Column^=prefix or Column~=regex")
+        
+        operator = '='
+        name_end = eq_index
+        if expression[eq_index - 1] in '^~':
+            operator = expression[eq_index - 1] + '='
+            name_end = eq_index - 1
+        
+        self.expression = expression
+        self.operator = operator
+        self.operand = expression[eq_index + 1:]
+        self.column = find_column(expression[:name_end].strip(), columns)
+        self.pattern = re.compile(self.operand) if operator == '~=' else None
+    
+    def matches(self, row: dict) -> bool:
+        """Check the predicate against one row, formatting only its column."""
+        header_id, _, property_name = self.column
+        value = stringify_value(lookup_cell_value(row, header_id, property_name))
+        if self.operator == '=':
+            return value == self.operand
+        if self.operator == '^=':
+            return value.startswith(self.operand)
+        return self.pattern.search(value) is not None
+
+
+# =============================================================================
+# Typed columnar output (Parquet / Arrow)
+# =============================================================================
+
+def get_column_kinds(headers: list, columns: list) -> list:
+    """
+    Resolve the typed column kind for each output column from header valueType.
+    
+    Returns list of kinds ('integer', 'numeric', 'boolean', 'list', 'string')
+    in the same order as columns.
+    """
+    value_types = {}
+    for header in headers:
+        header_id = header.get('id') or header.get('propertyName')
+        value_types.setdefault(header_id, header.get('valueType', 'STRING'))
+    
+    return [
+        VALUE_TYPE_KINDS.get(str(value_types.get(col[0], 'STRING')).upper(), 'string')
+        for col in columns
+    ]
+
+
+def to_typed_value(value, kind: str):
+    """
+    Convert a raw BOM value to the Python type used for its column kind.
+    
+    Returns None for missing values and for values that can't be represented
+    in the column's type (e.g. non-numeric text in a numeric column).
+    """
+    if value is None:
+        return None
+    
+    if kind == 'list':
+        items = value if isinstance(value, list) else [value]
+        return [stringify_value(v) for v in items]
+    
+    if kind == 'string':
+        return stringify_value(value)
+    
+    # Numbers/booleans sometimes arrive wrapped, e.g. {"value": 2, "units": ...}
+    if isinstance(value, dict):
+        value = value.get('value')
+        if value is None:
+            return None
+    
+    if kind == 'boolean':
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text in ('true', '1', 'yes'):
+            return True
+        if text in ('false', '0', 'no'):
+            return False
+        return None
+    
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if kind == 'integer':
+        return int(number) if number.is_integer() else None
+    return number
+
+
+def unique_column_names(columns: list) -> list:
+    """Make display names unique, as columnar formats need distinct field names."""
+    names = []
+    seen_names = set()
+    for header_id, display_name, property_name in columns:
+        name = str(display_name or property_name or header_id)
+        if name in seen_names:
+            name = f"{name} ({property_name or header_id})"
+        seen_names.add(name)
+        names.append(name)
+    return names
+
+
+class ColumnarWriter:
+    """
+    Writes BOM rows as typed Arrow record batches to a Parquet or Arrow file.
+    
+    Rows are buffered per column and flushed every batch_size rows, so memory
+    stays bounded by the batch rather than the whole BOM. The schema is fixed
+    from the first batch: string columns with few distinct values are
+    dictionary encoded, using one dictionary per column that only grows
+    (Arrow IPC files allow dictionary deltas but not replacements).
+    """
+    
+    ARROW_TYPES = {
+        'integer': lambda: pa.int64(),
+        'numeric': lambda: pa.float64(),
+        'boolean': lambda: pa.bool_(),
+        'list': lambda: pa.list_(pa.string()),
+        'string': lambda: pa.string(),
+    }
+    
+    def __init__(self, output_path: str, names: list, kinds: list, fmt: str = 'parquet', batch_size: int = DEFAULT_BATCH_SIZE):
+        if pa is None:
+            raise ImportError("pyarrow is required for parquet/arrow output (pip install pyarrow)")
+        if not names:
+            raise ValueError("No columns to write; parquet/arrow output needs at least one column")
+        
+        self.output_path = output_path
+        self.names = names
+        self.kinds = kinds
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.buffers = [[] for _ in names]
+        self.dictionaries = [({}, []) for _ in names]
+        self.schema = None
+        self.writer = None
+        self.rows_written = 0
+        self.coerced_nulls = 0
+    
+    def append(self, raw_values: list):
+        """Buffer one row of raw (unformatted) cell values."""
+        for buffer, kind, value in zip(self.buffers, self.kinds, raw_values):
+            typed = to_typed_value(value, kind)
+            if typed is None and value is not None:
+                self.coerced_nulls += 1
+            buffer.append(typed)
+        
+        if len(self.buffers[0]) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        """Write buffered rows as one record batch."""
+        if not self.buffers or not self.buffers[0]:
+            return
+        
+        if self.schema is None:
+            self.schema = self._build_schema()
+            self._open()
+        
+        arrays = [
+            self._build_array(index, buffer, field.type)
+            for index, (buffer, field) in enumerate(zip(self.buffers, self.schema))
+        ]
+        batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+        if self.fmt == 'parquet':
+            self.writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            self.writer.write_batch(batch)
+        
+        self.rows_written += batch.num_rows
+        self.buffers = [[] for _ in self.names]
+    
+    def close(self):
+        """Flush remaining rows and finalize the file."""
+        self.flush()
+        if self.writer is None:
+            # No rows: still emit a valid, empty file with the base schema
+            self.schema = self._build_schema()
+            self._open()
+        self.writer.close()
+    
+    def _build_schema(self):
+        fields = []
+        for name, kind, buffer in zip(self.names, self.kinds, self.buffers):
+            arrow_type = self.ARROW_TYPES[kind]()
+            if kind == 'string' and buffer:
+                distinct = len(set(buffer))
+                if distinct <= len(buffer) * DICTIONARY_RATIO:
+                    arrow_type = pa.dictionary(pa.int32(), pa.string())
+            fields.append(pa.field(name, arrow_type))
+        return pa.schema(fields)
+    
+    def _build_array(self, index: int, buffer: list, arrow_type):
+        if not pa.types.is_dictionary(arrow_type):
+            return pa.array(buffer, type=arrow_type)
+        
+        lookup, values = self.dictionaries[index]
+        codes = []
+        for value in buffer:
+            if value is None:
+                codes.append(None)
+                continue
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(values)
+                values.append(value)
+            codes.append(code)
+        return pa.DictionaryArray.from_arrays(
+            pa.array(codes, type=pa.int32()),
+            pa.array(values, type=pa.string())
+        )
+    
+    def _open(self):
+        if self.fmt == 'parquet':
+            self.writer = pq.ParquetWriter(self.output_path, self.schema, compression='zstd')
+        else:
+            options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+            self.writer = pa.ipc.new_file(self.output_path, self.schema, options=options)
+
+
+# =============================================================================
+# Excel output
+# =============================================================================
+
+def to_xlsx_value(value, kind: str):
+    """
+    Convert a raw BOM value to an Excel cell value for its column kind.
+    
+    Lists are joined like in CSV output, text has characters Excel rejects
+    removed and is cut to the cell limit, and numbers Excel can't store
+    (NaN, infinity) become empty cells.
+    """
+    typed = to_typed_value(value, kind)
+    if typed is None:
+        return None
+    if kind == 'list':
+        typed = '; '.join(typed)
+    if isinstance(typed, float) and (typed != typed or typed in (float('inf'), float('-inf'))):
+        return None
+    if isinstance(typed, str):
+        return ILLEGAL_CHARACTERS_RE.sub('', typed)[:XLSX_MAX_CELL_CHARS] or None
+    return typed
+
+
+class XLSXWriter:
+    """
+    Streams BOM rows into a single-sheet .xlsx workbook.
+    
+    Uses openpyxl's write-only mode: each row is serialized to the sheet's
+    temporary XML as soon as it is appended, so memory stays flat no matter
+    how many rows are written and no workbook is built in memory.
+    """
+    
+    def __init__(self, output_path: str, names: list, kinds: list, sheet_title: str = 'BOM'):
+        if openpyxl is None:
+            raise ImportError("openpyxl is required for xlsx output (pip install openpyxl)")
+        
+        self.output_path = output_path
+        self.kinds = kinds
+        self.rows_written = 0
+        
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(title=sheet_title)
+        self.sheet.freeze_panes = 'A2'
+        
+        # Column widths must be set before the first row; size them from the headers
+        for index, name in enumerate(names, 1):
+            self.sheet.column_dimensions[get_column_letter(index)].width = min(max(len(name) + 2, 10), 60)
+        
+        bold = Font(bold=True)
+        header_cells = []
+        for name in names:
+            cell = self.text_cell(name)
+            cell.font = bold
+            header_cells.append(cell)
+        self.sheet.append(header_cells)
+    
+    def text_cell(self, text: str):
+        """A cell that is always stored as text, even if it looks like a formula."""
+        cell = WriteOnlyCell(self.sheet, value=text)
+        cell.data_type = 's'
+        return cell
+    
+    def append(self, values: list):
+        """Add one row of raw (untyped) BOM values."""
+        if self.rows_written + 1 >= XLSX_MAX_ROWS:
+            raise ValueError(f"BOM has more rows than an Excel sheet can hold ({XLSX_MAX_ROWS - 1})")
+        
+        row = []
+        for value, kind in zip(values, self.kinds):
+            cell_value = to_xlsx_value(value, kind)
+            if isinstance(cell_value, str) and cell_value.startswith('='):
+                cell_value = self.text_cell(cell_value)
+            row.append(cell_value)
+        self.sheet.append(row)
+        self.rows_written += 1
+    
+    def close(self):
+        self.workbook.save(self.output_path)
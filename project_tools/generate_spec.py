@@ -9,27 +9,80 @@ Key features:
 - Full function/method signatures with types
 - Interface/type definitions with properties
 - Key file code snippets (configurable)
-- Dependency graph (internal + external)
+- Dependency graph (internal + external), with fan-in/out, import cycles
+  and layers
 - Route extraction with HTTP methods
 - TODO/FIXME collection
 - File role classification
 - Configurable verbosity levels
+- Single-pass source lexer that ignores code in strings and comments
+  (--parser regex keeps the per-pattern scan; see spec_benchmark.py)
+- Incremental rebuilds with --cache (unchanged files are not re-parsed)
+- --watch mode that patches the spec as files change (file system events
+  with watchdog installed, polling otherwise)
+- --since <rev> re-extracts only files git reports changed
+- Size cap, minified-file detection and a per-file time budget; skipped
+  files are listed in the spec
+- Machine-readable JSON next to the Markdown (--json, see spec_query.py)
+- --token-budget N packs the highest-value sections and files into N tokens
+- --shards writes one spec per package of a monorepo plus a root index
 
 Usage:
     python generate_spec.py /path/to/project
     python generate_spec.py . -o docs/SPEC.md --verbosity full
     python generate_spec.py . --verbosity minimal --ignore examples notes
+    python generate_spec.py . --parser regex
+    python generate_spec.py . --jobs 0
+    python generate_spec.py . --cache
+    python generate_spec.py . --watch
+    python generate_spec.py . --profile 20 --profile-json spec_profile.json
+    python generate_spec.py . -o docs/SPEC.md --since origin/main
+    python generate_spec.py . -o docs/SPEC.md --json
+    python generate_spec.py . --verbosity full --token-budget 8000
+    python generate_spec.py . -o docs/SPEC.md --shards --cache
 """
 
 import argparse
+import bisect
+import contextlib
+import hashlib
+import heapq
 import json
+import os
+import posixpath
 import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, Literal
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 from enum import Enum
 
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows: --profile reports no peak RSS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None  # --token-budget estimates ~4 chars per token
+
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None  # --watch polls the tree instead of using file system events
+
 
 # =============================================================================
 # Configuration
@@ -49,6 +102,18 @@ IGNORE_FILES = {
 }
 
 CODE_EXTENSIONS = {'.ts', '.js', '.tsx', '.jsx', '.mjs', '.cjs'}
+
+# Per-file parse cache location for --cache, relative to the project root
+DEFAULT_CACHE_DIR = '.cache/generate_spec'
+
+# Guard rails for generated/vendored code (see FileLimits)
+MAX_FILE_KB = 512
+FILE_TIME_BUDGET = 5.0          # seconds per file
+MINIFIED_MIN_BYTES = 2048       # smaller files are never treated as minified
+MINIFIED_AVG_LINE = 300         # average chars per line
+MINIFIED_LONG_LINE = 1000       # a line this long, with...
+MINIFIED_WHITESPACE = 0.05      # ...less whitespace than this, is minified
+
 CONFIG_FILES = {'package.json', 'tsconfig.json', 'vite.config.ts', 'vite.config.js', '.env.example'}
 ENTRY_POINTS = {'index.ts', 'index.js', 'main.ts', 'main.js', 'app.ts', 'app.js', 'server.ts', 'server.js'}
 
@@ -258,6 +323,24 @@ class FileInfo:
     description: str = ""
     is_entry_point: bool = False
     snippet: str = ""
+    skipped: str = ""  # Why the file wasn't parsed (too large, minified, timed out)
+
+
+@dataclass
+class FileLimits:
+    """Per-file guard rails so one bundle can't stall a run (0 disables a limit)."""
+    max_bytes: int = MAX_FILE_KB * 1024
+    time_budget: float = FILE_TIME_BUDGET
+    skip_minified: bool = True
+
+
+@dataclass
+class GraphAnalysis:
+    """Per-file metrics of the internal import graph (see analyze_dependency_graph)."""
+    fan_in: dict = field(default_factory=dict)    # path -> number of files importing it
+    fan_out: dict = field(default_factory=dict)   # path -> number of files it imports
+    layers: dict = field(default_factory=dict)    # path -> 0 if it imports no internal file, else 1 + its highest import
+    cycles: list = field(default_factory=list)    # import cycles (sorted paths), largest first
 
 
 @dataclass
@@ -271,6 +354,9 @@ class ProjectSpec:
     dependencies: list = field(default_factory=list)
     dev_dependencies: list = field(default_factory=list)
     internal_deps: dict = field(default_factory=dict)
+    unresolved_imports: dict = field(default_factory=dict)
+    skipped_files: list = field(default_factory=list)
+    graph: GraphAnalysis = field(default_factory=GraphAnalysis)
     all_routes: list = field(default_factory=list)
     all_todos: list = field(default_factory=list)
     generated_at: str = ""
@@ -382,47 +468,63 @@ def truncate_at_sentence(text: str, max_length: int) -> str:
     return truncated + '...'
 
 
-def extract_jsdoc_before(content: str, pos: int) -> str:
-    """Extract JSDoc comment that appears immediately before a given position."""
-    before = content[:pos]
-    
-    # Look for the last /** ... */ block before this position
-    # But only if it's close (within 200 chars of whitespace/code)
-    # This prevents picking up JSDoc from a previous function
+class JSDocIndex:
+    """
+    Positions of every `/**` opener and `*/` closer in a file.
     
-    # Find the last */ before the position
-    last_close = before.rfind('*/')
-    if last_close == -1:
-        return ""
+    Built in one pass per file so each exported symbol finds its JSDoc with
+    a binary search instead of copying and re-scanning the file prefix.
+    """
     
-    # Check that there's only whitespace between */ and the function
-    between = before[last_close + 2:]
-    if between.strip() and not between.strip().startswith('export'):
-        # There's code between the JSDoc and this function - skip
-        return ""
+    NON_SPACE = re.compile(r'\S')
     
-    # Now find the matching /** for this */
-    # Search backwards from last_close for /**
-    search_start = max(0, last_close - 2000)  # Don't search too far back
-    jsdoc_start = before.rfind('/**', search_start, last_close)
-    if jsdoc_start == -1:
-        return ""
+    def __init__(self, content: str):
+        self.content = content
+        self.opens = [m.start() for m in re.finditer(r'/\*\*', content)]
+        self.closes = [m.start() for m in re.finditer(r'\*/', content)]
     
-    # Extract just this JSDoc block
-    jsdoc_content = before[jsdoc_start + 3:last_close]
-    return jsdoc_content
+    def before(self, pos: int) -> str:
+        """Return the JSDoc body immediately before pos, or "" if there is none."""
+        content = self.content
+        
+        # The last */ that ends at or before pos
+        i = bisect.bisect_right(self.closes, pos - 2) - 1
+        if i < 0:
+            return ""
+        last_close = self.closes[i]
+        
+        # Only whitespace (or an `export` keyword) may sit between */ and pos,
+        # otherwise the comment belongs to earlier code
+        code = self.NON_SPACE.search(content, last_close + 2, pos)
+        if code and not content.startswith('export', code.start(), pos):
+            return ""
+        
+        # The matching /** that starts within 2000 chars of the closer
+        j = bisect.bisect_right(self.opens, last_close - 3) - 1
+        if j < 0 or self.opens[j] < max(0, last_close - 2000):
+            return ""
+        
+        return content[self.opens[j] + 3:last_close]
+
+
+def extract_jsdoc_before(content: str, pos: int, index: Optional[JSDocIndex] = None) -> str:
+    """Extract JSDoc comment that appears immediately before a given position."""
+    return (index or JSDocIndex(content)).before(pos)
 
 
 def extract_interface_properties(content: str, interface_name: str) -> list[PropertyInfo]:
     """Extract properties from an interface or type definition."""
-    properties = []
-    
+    return parse_interface_body(find_interface_body(content, interface_name))
+
+
+def find_interface_body(content: str, interface_name: str) -> Optional[str]:
+    """Find an interface/type body by name and return the text between its braces."""
     # Find the start of the interface
     pattern = rf'(?:export\s+)?(?:interface|type)\s+{re.escape(interface_name)}(?:<[^>]+>)?\s*(?:=\s*)?\{{'
     match = re.search(pattern, content)
     
     if not match:
-        return properties
+        return None
     
     # Extract body using brace counting
     start = match.end() - 1  # Include the opening brace
@@ -442,9 +544,16 @@ def extract_interface_properties(content: str, interface_name: str) -> list[Prop
                 break
     
     if body_start is None or body_end is None:
-        return properties
+        return None
     
-    body = content[body_start:body_end]
+    return content[body_start:body_end]
+
+
+def parse_interface_body(body: Optional[str]) -> list[PropertyInfo]:
+    """Parse the top-level properties of an interface/type body."""
+    properties = []
+    if body is None:
+        return properties
     
     # Parse properties - capture at depth 0 before any nested braces
     lines = body.split('\n')
@@ -493,19 +602,8 @@ def extract_interface_properties(content: str, interface_name: str) -> list[Prop
 
 
 
-def extract_class_details(content: str, class_match) -> ClassInfo:
-    """Extract comprehensive class information."""
-    is_default = bool(class_match.group(1))
-    class_name = class_match.group(2)
-    extends = class_match.group(3) or ""
-    implements = class_match.group(4) or ""
-    
-    # Get JSDoc before class
-    jsdoc = extract_jsdoc_before(content, class_match.start())
-    description, _, _ = parse_jsdoc(jsdoc)
-    
-    # Find class body
-    start = class_match.end()
+def find_class_body(content: str, start: int) -> str:
+    """Return the first brace-matched block at or after start, braces included."""
     brace_count = 0
     class_body = ""
     in_class = False
@@ -522,6 +620,24 @@ def extract_class_details(content: str, class_match) -> ClassInfo:
             if brace_count == 0:
                 break
     
+    return class_body
+
+
+def extract_class_details(content: str, class_match, scanner=None) -> ClassInfo:
+    """Extract comprehensive class information."""
+    scanner = scanner or RegexScanner(content)
+    is_default = bool(class_match.group(1))
+    class_name = class_match.group(2)
+    extends = class_match.group(3) or ""
+    implements = class_match.group(4) or ""
+    
+    # Get JSDoc before class
+    jsdoc = scanner.jsdoc_before(class_match.start())
+    description, _, _ = parse_jsdoc(jsdoc)
+    
+    # Find class body
+    class_body = scanner.class_body(class_match.end())
+    
     # Extract constructor
     constructor_params = ""
     ctor_match = PATTERNS['class_constructor'].search(class_body)
@@ -581,14 +697,344 @@ def extract_class_details(content: str, class_match) -> ClassInfo:
     )
 
 
-def extract_file_info(file_path: Path, root: Path, include_snippet: bool = False, max_snippet_lines: int = 40) -> Optional[FileInfo]:
-    """Extract comprehensive information from a JS/TS file."""
+# =============================================================================
+# Source Scanners
+# =============================================================================
+
+class RegexScanner:
+    """
+    Regex extraction path: one finditer per pattern over the whole file,
+    plus a fresh search for every class and interface body.
+    
+    Kept behind --parser regex as the reference for SourceLexer.
+    """
+    
+    def __init__(self, content: str):
+        self.content = content
+        self.jsdoc_index = JSDocIndex(content)
+    
+    def find(self, kind: str):
+        """Matches of PATTERNS[kind], in source order."""
+        return PATTERNS[kind].finditer(self.content)
+    
+    def todos(self):
+        return PATTERNS['todo_comment'].finditer(self.content)
+    
+    def file_jsdoc(self):
+        """The first JSDoc block in the file (jsdoc_block match), if any."""
+        return PATTERNS['jsdoc_block'].search(self.content)
+    
+    def jsdoc_before(self, pos: int) -> str:
+        return self.jsdoc_index.before(pos)
+    
+    def class_body(self, start: int) -> str:
+        return find_class_body(self.content, start)
+    
+    def interface_body(self, match) -> Optional[str]:
+        return find_interface_body(self.content, match.group(2))
+
+
+class SourceLexer:
+    """
+    Single-pass scanner for JS/TS source.
+    
+    Walks the file once, stepping over string, template and regex literals
+    and comments. Statements are matched with the same PATTERNS, anchored
+    where their keyword appears in code, so `export` inside a string or a
+    commented-out route is never picked up. The pass also records every
+    comment and the matching `}` of every `{`, so JSDoc, class bodies and
+    interface bodies are bisects and dict lookups instead of new scans.
+    """
+    
+    # Every token starts with one of these characters, which lets the regex
+    # engine skip ahead without trying each alternative at every position
+    TOKEN = re.compile(
+        r"[/'\"`{}@eirRaA]"
+        r"(?:(?<=/)[/*]?|(?<=[eia])(?<![\w$].)(?:(?<=e)xport|(?<=i)mport)\b|(?<=[rR])(?i:outer)\.|(?<=[aA])(?i:pp)\."
+        r"|(?<=['\"`{}@]))"
+    )
+    STRINGS = {
+        "'": re.compile(r"'(?:[^'\\\n]|\\[\s\S])*'?"),
+        '"': re.compile(r'"(?:[^"\\\n]|\\[\s\S])*"?'),
+    }
+    # Template text up to the closing backtick or the next ${
+    TEMPLATE_TEXT = re.compile(r'(?:[^`\\$]|\\[\s\S]|\$(?!\{))*(`|\$\{)?')
+    REGEX_LITERAL = re.compile(r'/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*')
+    # Keywords after which a / starts a regex rather than a division
+    REGEX_KEYWORDS = {
+        'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+        'throw', 'case', 'do', 'else', 'yield', 'await',
+    }
+    EXPORT_KINDS = (
+        'export_function', 'export_arrow', 'export_class',
+        'export_interface', 'export_const', 'export_default',
+    )
+    INTERFACE_OPEN = re.compile(r'export\s+(?:interface|type)\s+\w+(?:<[^>]+>)?\s*(?:=\s*)?\{')
+    NON_SPACE = re.compile(r'\S')
+    # Brace-stack entry for the ${ of a template substitution
+    TEMPLATE = -1
+    
+    def __init__(self, content: str):
+        self.content = content
+        self.matches = {kind: [] for kind in self.EXPORT_KINDS}
+        self.matches.update({'import_statement': [], 'express_route': [], 'decorator_route': []})
+        self.comments = []        # (start, end) of every comment
+        self.block_comments = []  # (start, end) of closed /* */ comments
+        self.block_ends = []
+        self.brace_opens = []
+        self.brace_close = {}
+        self._scan()
+    
+    def _scan(self):
+        content = self.content
+        search = self.TOKEN.search
+        stack = []
+        pos = 0
+        
+        while True:
+            m = search(content, pos)
+            if m is None:
+                break
+            token = m.group()
+            start = m.start()
+            pos = m.end()
+            char = token[0]
+            
+            if char == '{':
+                stack.append(start)
+                self.brace_opens.append(start)
+            elif char == '}':
+                if stack:
+                    opened = stack.pop()
+                    if opened == self.TEMPLATE:
+                        pos = self._skip_template(pos, stack)
+                    else:
+                        self.brace_close[opened] = start
+            elif char == "'" or char == '"':
+                pos = self.STRINGS[char].match(content, start).end()
+            elif token == '//':
+                end = content.find('\n', pos)
+                pos = len(content) if end == -1 else end
+                self.comments.append((start, pos))
+            elif token == '/*':
+                end = content.find('*/', pos)
+                if end == -1:
+                    pos = len(content)
+                else:
+                    pos = end + 2
+                    self.block_comments.append((start, pos))
+                    self.block_ends.append(pos)
+                self.comments.append((start, pos))
+            elif char == '/':
+                if self._regex_allowed(start):
+                    literal = self.REGEX_LITERAL.match(content, start)
+                    if literal:
+                        pos = literal.end()
+            elif char == '`':
+                pos = self._skip_template(pos, stack)
+            elif token == 'export':
+                for export_kind in self.EXPORT_KINDS:
+                    match = PATTERNS[export_kind].match(content, start)
+                    if match:
+                        self.matches[export_kind].append(match)
+            elif token == 'import':
+                self._match('import_statement', start)
+            elif char == '@':
+                self._match('decorator_route', start)
+            else:
+                self._match('express_route', start)
+    
+    def _match(self, kind: str, start: int):
+        match = PATTERNS[kind].match(self.content, start)
+        if match:
+            self.matches[kind].append(match)
+    
+    def _skip_template(self, pos: int, stack: list) -> int:
+        """Skip template text from pos; a ${ resumes code scanning inside it."""
+        text = self.TEMPLATE_TEXT.match(self.content, pos)
+        if text.group(1) == '${':
+            stack.append(self.TEMPLATE)
+        return text.end()
+    
+    def _regex_allowed(self, pos: int) -> bool:
+        """Whether a / at pos starts a regex literal (not a division or JSX close)."""
+        content = self.content
+        j = pos - 1
+        while j >= 0 and content[j].isspace():
+            j -= 1
+        if j < 0:
+            return True
+        
+        char = content[j]
+        if char in ')]}<"\'`':
+            return False
+        if char.isalnum() or char in '_$':
+            k = j
+            while k >= 0 and (content[k].isalnum() or content[k] in '_$'):
+                k -= 1
+            return content[k + 1:j + 1] in self.REGEX_KEYWORDS
+        return True
+    
+    def _is_jsdoc(self, start: int, end: int) -> bool:
+        return end - start >= 5 and self.content.startswith('/**', start)
+    
+    def find(self, kind: str):
+        """Matches of PATTERNS[kind] found in code, in source order."""
+        return self.matches[kind]
+    
+    def todos(self):
+        for start, end in self.comments:
+            yield from PATTERNS['todo_comment'].finditer(self.content, start, end)
+    
+    def file_jsdoc(self):
+        """The first JSDoc block in the file (jsdoc_block match), if any."""
+        for start, end in self.block_comments:
+            if self._is_jsdoc(start, end):
+                return PATTERNS['jsdoc_block'].match(self.content, start)
+        return None
+    
+    def jsdoc_before(self, pos: int) -> str:
+        """Body of the JSDoc block that ends right before pos, or ""."""
+        i = bisect.bisect_right(self.block_ends, pos) - 1
+        if i < 0:
+            return ""
+        start, end = self.block_comments[i]
+        
+        code = self.NON_SPACE.search(self.content, end, pos)
+        if code and not self.content.startswith('export', code.start(), pos):
+            return ""
+        if not self._is_jsdoc(start, end) or start < end - 2002:
+            return ""
+        return self.content[start + 3:end - 2]
+    
+    def class_body(self, start: int) -> str:
+        """The first brace-matched block at or after start, braces included."""
+        i = bisect.bisect_left(self.brace_opens, start)
+        if i == len(self.brace_opens):
+            return ""
+        opened = self.brace_opens[i]
+        closed = self.brace_close.get(opened)
+        return self.content[opened:] if closed is None else self.content[opened:closed + 1]
+    
+    def interface_body(self, match) -> Optional[str]:
+        """Text between the braces of the interface/type declared at match."""
+        header = self.INTERFACE_OPEN.match(self.content, match.start())
+        if not header:
+            return None
+        closed = self.brace_close.get(header.end() - 1)
+        if closed is None:
+            return None
+        return self.content[header.end():closed]
+
+
+PARSERS = {
+    'lexer': SourceLexer,
+    'regex': RegexScanner,
+}
+DEFAULT_PARSER = 'lexer'
+
+
+class FileTimeout(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def time_budget(seconds: float):
+    """
+    Raise FileTimeout if the block runs longer than `seconds`.
+    
+    Uses SIGALRM, which the regex engine checks while backtracking, so it
+    only applies on Unix in the main thread (including --jobs workers);
+    elsewhere the block runs unbounded.
+    """
+    if not seconds or not hasattr(signal, 'setitimer') or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    
+    def on_alarm(signum, frame):
+        raise FileTimeout()
+    
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
     try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def detect_minified(content: str) -> str:
+    """Return why content looks minified/generated, or "" if it looks hand-written."""
+    if len(content) < MINIFIED_MIN_BYTES:
+        return ""
+    
+    lines = content.split('\n')
+    avg_line = len(content) / len(lines)
+    if avg_line > MINIFIED_AVG_LINE:
+        return f"minified (average line {avg_line:,.0f} chars)"
+    
+    longest = max(map(len, lines))
+    if longest > MINIFIED_LONG_LINE:
+        whitespace = sum(content.count(c) for c in ' \t\n\r') / len(content)
+        if whitespace < MINIFIED_WHITESPACE:
+            return f"minified ({longest:,} char line, {whitespace:.0%} whitespace)"
+    return ""
+
+
+def extract_file_info(
+    file_path: Path,
+    root: Path,
+    include_snippet: bool = False,
+    max_snippet_lines: int = 40,
+    parser: str = DEFAULT_PARSER,
+    limits: Optional[FileLimits] = None
+) -> Optional[FileInfo]:
+    """
+    Extract comprehensive information from a JS/TS file.
+    
+    Files over the limits come back as a FileInfo with only `skipped` set.
+    """
+    limits = limits or FileLimits()
+    relative = str(file_path.relative_to(root)).replace('\\', '/')
+    
+    def skipped(reason: str, line_count: int = 0) -> FileInfo:
+        return FileInfo(
+            path=file_path,
+            relative_path=relative,
+            role=detect_file_role(relative),
+            line_count=line_count,
+            skipped=reason
+        )
+    
+    try:
+        size = file_path.stat().st_size
+        if limits.max_bytes and size > limits.max_bytes:
+            return skipped(f"too large ({size // 1024:,} KB > {limits.max_bytes // 1024:,} KB)")
         content = file_path.read_text(encoding='utf-8', errors='ignore')
     except Exception:
         return None
     
-    relative = str(file_path.relative_to(root)).replace('\\', '/')
+    if limits.skip_minified:
+        reason = detect_minified(content)
+        if reason:
+            return skipped(reason, content.count('\n') + 1)
+    
+    try:
+        with time_budget(limits.time_budget):
+            return parse_file(file_path, relative, content, include_snippet, max_snippet_lines, parser)
+    except FileTimeout:
+        return skipped(f"timed out after {limits.time_budget:g}s", content.count('\n') + 1)
+
+
+def parse_file(
+    file_path: Path,
+    relative: str,
+    content: str,
+    include_snippet: bool,
+    max_snippet_lines: int,
+    parser: str
+) -> FileInfo:
+    """Run the scanner over one file's content and collect everything documented."""
     lines = content.splitlines()
     
     info = FileInfo(
@@ -599,20 +1045,22 @@ def extract_file_info(file_path: Path, root: Path, include_snippet: bool = False
         is_entry_point=file_path.name in ENTRY_POINTS
     )
     
+    scanner = PARSERS[parser](content)
+    
     # File-level description from first JSDoc
-    first_jsdoc = PATTERNS['jsdoc_block'].search(content)
+    first_jsdoc = scanner.file_jsdoc()
     if first_jsdoc and first_jsdoc.start() < 500:  # Only if near start of file
         desc, _, _ = parse_jsdoc(first_jsdoc.group(1))
         info.description = desc
     
     # Extract exported functions
-    for match in PATTERNS['export_function'].finditer(content):
+    for match in scanner.find('export_function'):
         is_async = bool(match.group(1))
         name = match.group(2)
         params_str = match.group(4) or "()"
         return_type = clean_type(match.group(5) or "")
         
-        jsdoc = extract_jsdoc_before(content, match.start())
+        jsdoc = scanner.jsdoc_before(match.start())
         desc, jsdoc_params, jsdoc_return = parse_jsdoc(jsdoc)
         
         # Parse params from signature
@@ -646,7 +1094,7 @@ def extract_file_info(file_path: Path, root: Path, include_snippet: bool = False
         info.exports.append(name)
     
     # Arrow function exports
-    for match in PATTERNS['export_arrow'].finditer(content):
+    for match in scanner.find('export_arrow'):
         name = match.group(1)
         is_async = bool(match.group(3))
         params_str = match.group(4) or ""
@@ -662,7 +1110,7 @@ def extract_file_info(file_path: Path, root: Path, include_snippet: bool = False
                 elif p:
                     params.append(ParamInfo(name=p.split('=')[0].strip()))
         
-        jsdoc = extract_jsdoc_before(content, match.start())
+        jsdoc = scanner.jsdoc_before(match.start())
         desc, _, _ = parse_jsdoc(jsdoc)
         
         info.functions.append(FunctionInfo(
@@ -675,20 +1123,20 @@ def extract_file_info(file_path: Path, root: Path, include_snippet: bool = False
         info.exports.append(name)
     
     # Classes
-    for match in PATTERNS['export_class'].finditer(content):
-        class_info = extract_class_details(content, match)
+    for match in scanner.find('export_class'):
+        class_info = extract_class_details(content, match, scanner)
         info.classes.append(class_info)
         info.exports.append(class_info.name)
     
     # Interfaces and types
-    for match in PATTERNS['export_interface'].finditer(content):
+    for match in scanner.find('export_interface'):
         kind = match.group(1)
         name = match.group(2)
         
-        jsdoc = extract_jsdoc_before(content, match.start())
+        jsdoc = scanner.jsdoc_before(match.start())
         desc, _, _ = parse_jsdoc(jsdoc)
         
-        properties = extract_interface_properties(content, name)
+        properties = parse_interface_body(scanner.interface_body(match))
         
         info.interfaces.append(InterfaceInfo(
             name=name,
@@ -699,19 +1147,19 @@ def extract_file_info(file_path: Path, root: Path, include_snippet: bool = False
         info.exports.append(name)
     
     # Const exports
-    for match in PATTERNS['export_const'].finditer(content):
+    for match in scanner.find('export_const'):
         name = match.group(1)
         if name not in info.exports:
             info.exports.append(name)
     
     # Default exports
-    for match in PATTERNS['export_default'].finditer(content):
+    for match in scanner.find('export_default'):
         name = match.group(1)
         if name not in info.exports:
             info.exports.append(f"{name} (default)")
     
     # Imports
-    for match in PATTERNS['import_statement'].finditer(content):
+    for match in scanner.find('import_statement'):
         named = match.group(1)
         default_imp = match.group(2)
         namespace = match.group(3)
@@ -730,20 +1178,20 @@ def extract_file_info(file_path: Path, root: Path, include_snippet: bool = False
         ))
     
     # Routes
-    for match in PATTERNS['express_route'].finditer(content):
+    for match in scanner.find('express_route'):
         info.routes.append(RouteInfo(
             method=match.group(1).upper(),
             path=match.group(2)
         ))
     
-    for match in PATTERNS['decorator_route'].finditer(content):
+    for match in scanner.find('decorator_route'):
         info.routes.append(RouteInfo(
             method=match.group(1).upper(),
             path=match.group(2)
         ))
     
     # TODOs
-    for match in PATTERNS['todo_comment'].finditer(content):
+    for match in scanner.todos():
         tag = match.group(1).upper()
         text = match.group(2).strip()[:80]
         info.todos.append(f"{tag}: {text}")
@@ -788,67 +1236,290 @@ def parse_package_json(root: Path) -> dict:
         return {}
 
 
-def build_dependency_graph(files: list[FileInfo]) -> dict[str, list[str]]:
-    """Build internal dependency graph showing what imports what."""
-    # Map file stems/paths to their FileInfo
-    file_map = {}
-    for f in files:
-        # Store by various possible import paths
-        stem = f.path.stem
-        rel_no_ext = f.relative_path.rsplit('.', 1)[0]
-        file_map[stem] = f.relative_path
-        file_map[rel_no_ext] = f.relative_path
-        file_map['./' + rel_no_ext] = f.relative_path
-        file_map['/' + rel_no_ext] = f.relative_path
+class ImportResolver:
+    """
+    Resolves relative import specifiers to project files with hashed lookups.
+    
+    The specifier is joined to the importing file's directory and
+    normalized, then tried as written, as the TS source behind an emitted
+    .js name (ESM style), with each code extension, and as a directory
+    index - the same order bundlers and tsc use.
+    """
+    
+    EXTENSIONS = ('.ts', '.tsx', '.d.ts', '.js', '.jsx', '.mjs', '.cjs')
+    SOURCE_FOR_EMITTED = {'.js': ('.ts', '.tsx'), '.jsx': ('.tsx',), '.mjs': ('.mts',), '.cjs': ('.cts',)}
+    
+    def __init__(self, paths):
+        self.paths = set(paths)
+    
+    @classmethod
+    def from_files(cls, root: Path, file_paths: list[Path]) -> 'ImportResolver':
+        return cls(str(p.relative_to(root)).replace('\\', '/') for p in file_paths)
+    
+    def candidates(self, base: str):
+        yield base
+        stem, ext = posixpath.splitext(base)
+        for source_ext in self.SOURCE_FOR_EMITTED.get(ext, ()):
+            yield stem + source_ext
+        for ext in self.EXTENSIONS:
+            yield base + ext
+        for ext in self.EXTENSIONS:
+            yield base + '/index' + ext
+    
+    def resolve(self, importer: str, module: str) -> Optional[str]:
+        """Relative path of the file `module` refers to from `importer`, or None."""
+        base = posixpath.normpath(posixpath.join(posixpath.dirname(importer), module))
+        for candidate in self.candidates(base):
+            if candidate in self.paths:
+                return candidate
+        return None
+
+
+def resolve_file_imports(file: FileInfo, resolver: ImportResolver) -> tuple[list[str], list[str]]:
+    """
+    Resolve a file's relative imports.
     
-    graph = {}  # target -> [importers]
+    Returns:
+        tuple: (files imported, excluding itself; specifiers that didn't resolve)
+    """
+    targets = []
+    unresolved = []
+    for imp in file.imports:
+        if not imp.is_relative:
+            continue
+        target = resolver.resolve(file.relative_path, imp.module)
+        if target is None:
+            if imp.module not in unresolved:
+                unresolved.append(imp.module)
+        elif target != file.relative_path and target not in targets:
+            targets.append(target)
+    return targets, unresolved
+
+
+def build_dependency_graph(
+    files: list[FileInfo],
+    resolver: ImportResolver
+) -> tuple[dict[str, list[str]], dict[str, list[str]]]:
+    """
+    Build internal dependency graph showing what imports what.
+    
+    Returns:
+        tuple: (target -> [importers], importer -> [unresolved specifiers])
+    """
+    graph = {}
+    unresolved = {}
     
     for file in files:
-        for imp in file.imports:
-            if imp.is_relative:
-                # Try to resolve the import
-                for key in file_map:
-                    if imp.module.endswith(key) or key.endswith(imp.module.lstrip('./')):
-                        target = file_map[key]
-                        if target != file.relative_path:
-                            if target not in graph:
-                                graph[target] = []
-                            if file.relative_path not in graph[target]:
-                                graph[target].append(file.relative_path)
+        targets, missing = resolve_file_imports(file, resolver)
+        for target in targets:
+            graph.setdefault(target, []).append(file.relative_path)
+        if missing:
+            unresolved[file.relative_path] = missing
+    
+    return graph, unresolved
+
+
+def patch_dependency_graph(
+    graph: dict[str, list[str]],
+    unresolved: dict[str, list[str]],
+    files: list[FileInfo],
+    changed: set[str],
+    resolver: ImportResolver
+):
+    """
+    Re-resolve the imports of changed files in place.
+    
+    Only valid while the resolver's set of paths is unchanged; added or
+    removed files need a new resolver and a full rebuild. Importer lists
+    stay sorted, matching build_dependency_graph on sorted files.
+    """
+    for target in list(graph):
+        importers = [i for i in graph[target] if i not in changed]
+        if importers:
+            graph[target] = importers
+        else:
+            del graph[target]
+    for path in changed:
+        unresolved.pop(path, None)
+    
+    for file in files:
+        if file.relative_path in changed:
+            targets, missing = resolve_file_imports(file, resolver)
+            for target in targets:
+                bisect.insort(graph.setdefault(target, []), file.relative_path)
+            if missing:
+                unresolved[file.relative_path] = missing
+
+
+def analyze_dependency_graph(graph: dict[str, list[str]], files: list[FileInfo]) -> GraphAnalysis:
+    """
+    Fan-in, fan-out, import cycles and layers in O(files + imports).
+    
+    Cycles are the strongly connected components of two or more files,
+    found with an iterative Tarjan so long import chains can't hit the
+    recursion limit. Tarjan finishes a component only after every
+    component it imports, so layers are assigned in the same pass: a
+    component sits one above the highest layer it imports, and every file
+    in a cycle shares its layer.
+    """
+    imports: dict[str, list[str]] = {f.relative_path: [] for f in files}
+    for target, importers in graph.items():
+        imports.setdefault(target, [])
+        for importer in importers:
+            imports.setdefault(importer, []).append(target)
+    
+    analysis = GraphAnalysis(
+        fan_in={path: len(graph.get(path, ())) for path in imports},
+        fan_out={path: len(targets) for path, targets in imports.items()},
+    )
+    layers = analysis.layers
+    
+    index: dict[str, int] = {}
+    lowlink: dict[str, int] = {}
+    stack: list[str] = []
+    on_stack = set()
+    for start in imports:
+        if start in index:
+            continue
+        index[start] = lowlink[start] = len(index)
+        stack.append(start)
+        on_stack.add(start)
+        work = [(start, iter(imports[start]))]
+        while work:
+            node, targets = work[-1]
+            for target in targets:
+                if target not in index:
+                    index[target] = lowlink[target] = len(index)
+                    stack.append(target)
+                    on_stack.add(target)
+                    work.append((target, iter(imports[target])))
+                    break
+                if target in on_stack:
+                    lowlink[node] = min(lowlink[node], index[target])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] != index[node]:
+                    continue
+                
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
                         break
+                members = set(component)
+                layer = 0
+                for member in component:
+                    for target in imports[member]:
+                        if target not in members and layers[target] >= layer:
+                            layer = layers[target] + 1
+                for member in component:
+                    layers[member] = layer
+                if len(component) > 1:
+                    analysis.cycles.append(sorted(component))
     
-    return graph
+    analysis.cycles.sort(key=lambda c: (-len(c), c))
+    return analysis
 
 
 # =============================================================================
 # Tree Generation
 # =============================================================================
 
-def generate_tree(root: Path, ignore_patterns: set, max_depth: int = 4, prefix: str = "") -> str:
+@dataclass
+class DirectoryNode:
+    """One directory from walk_project: its files and subdirectories."""
+    name: str
+    files: list = field(default_factory=list)
+    dirs: list = field(default_factory=list)
+
+
+@dataclass
+class ProjectWalk:
+    """Result of a single pruned walk, shared by the tree and the scanner."""
+    root: DirectoryNode
+    code_files: list = field(default_factory=list)
+    skipped_entries: int = 0
+    pruned_dirs: int = 0
+
+
+def walk_project(root: Path, ignore_patterns: set) -> ProjectWalk:
+    """
+    Walk the project once with os.scandir.
+    
+    Entries whose name is in ignore_patterns are skipped where they are met,
+    so ignored directories (node_modules, .git, dist, ...) are never listed
+    or stat'ed. Symlinked directories are listed but not descended into.
+    """
+    walk = ProjectWalk(root=DirectoryNode(root.name))
+    stack = [(str(root), walk.root)]
+    
+    while stack:
+        dir_path, node = stack.pop()
+        try:
+            with os.scandir(dir_path) as entries:
+                entries = list(entries)
+        except OSError:
+            continue
+        
+        for entry in entries:
+            if entry.name in ignore_patterns:
+                walk.skipped_entries += 1
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        walk.pruned_dirs += 1
+                except OSError:
+                    pass
+                continue
+            
+            try:
+                is_dir = entry.is_dir()
+                descend = is_dir and not entry.is_symlink()
+            except OSError:
+                is_dir = descend = False
+            
+            if is_dir:
+                child = DirectoryNode(entry.name)
+                node.dirs.append(child)
+                if descend:
+                    stack.append((entry.path, child))
+            else:
+                node.files.append(entry.name)
+                if os.path.splitext(entry.name)[1] in CODE_EXTENSIONS and entry.name not in IGNORE_FILES:
+                    walk.code_files.append(Path(entry.path))
+    
+    return walk
+
+
+def generate_tree(node: DirectoryNode, max_depth: int = 4, prefix: str = "") -> str:
     """Generate directory tree structure."""
+    lines = []
+    _append_tree_lines(node, max_depth, prefix, lines)
+    return ''.join(lines)
+
+
+def _append_tree_lines(node: DirectoryNode, max_depth: int, prefix: str, lines: list):
     if max_depth < 0:
-        return ""
-    
-    try:
-        entries = sorted(root.iterdir(), key=lambda x: (x.is_file(), x.name.lower()))
-    except PermissionError:
-        return ""
+        return
     
-    entries = [e for e in entries if e.name not in ignore_patterns and not e.name.startswith('.')]
-    tree_str = ""
+    entries = [(False, child.name, child) for child in node.dirs] + [(True, name, None) for name in node.files]
+    entries.sort(key=lambda e: (e[0], e[1].lower()))
+    entries = [e for e in entries if not e[1].startswith('.')]
     
-    for i, entry in enumerate(entries):
+    for i, (is_file, name, child) in enumerate(entries):
         is_last = i == len(entries) - 1
         connector = "└── " if is_last else "├── "
         
-        if entry.is_file():
-            tree_str += f"{prefix}{connector}{entry.name}\n"
+        if is_file:
+            lines.append(f"{prefix}{connector}{name}\n")
         else:
-            tree_str += f"{prefix}{connector}{entry.name}/\n"
+            lines.append(f"{prefix}{connector}{name}/\n")
             extension = "    " if is_last else "│   "
-            tree_str += generate_tree(entry, ignore_patterns, max_depth - 1, prefix + extension)
-    
-    return tree_str
+            _append_tree_lines(child, max_depth - 1, prefix + extension, lines)
 
 
 # =============================================================================
@@ -979,8 +1650,11 @@ def format_interface(iface: InterfaceInfo, verbosity: Verbosity) -> list[str]:
     return lines
 
 
-def generate_spec(project: ProjectSpec, verbosity: Verbosity) -> str:
-    """Generate the SPEC markdown content."""
+ROLES_ORDER = ['config', 'route', 'controller', 'service', 'model', 'state', 'view', 'util', 'type', 'middleware', 'module']
+
+
+def format_header(project: ProjectSpec) -> list[str]:
+    """Title, generation time and package description."""
     lines = [
         f"# {project.name}",
         "",
@@ -991,17 +1665,22 @@ def generate_spec(project: ProjectSpec, verbosity: Verbosity) -> str:
         lines.extend(["", project.description])
     
     lines.append("")
-    
-    # Scripts (if any)
-    if project.scripts and verbosity != Verbosity.MINIMAL:
-        lines.extend(["## Scripts", ""])
-        for name, cmd in list(project.scripts.items())[:8]:
-            cmd_short = cmd[:60] + "..." if len(cmd) > 60 else cmd
-            lines.append(f"- `{name}`: {cmd_short}")
-        lines.append("")
-    
-    # Directory structure
-    lines.extend([
+    return lines
+
+
+def format_scripts(project: ProjectSpec, verbosity: Verbosity) -> list[str]:
+    if not project.scripts:
+        return []
+    lines = ["## Scripts", ""]
+    for name, cmd in list(project.scripts.items())[:8]:
+        cmd_short = cmd[:60] + "..." if len(cmd) > 60 else cmd
+        lines.append(f"- `{name}`: {cmd_short}")
+    lines.append("")
+    return lines
+
+
+def format_structure(project: ProjectSpec, verbosity: Verbosity) -> list[str]:
+    return [
         "## Structure",
         "",
         "```",
@@ -1009,168 +1688,1569 @@ def generate_spec(project: ProjectSpec, verbosity: Verbosity) -> str:
         project.structure.rstrip(),
         "```",
         "",
-    ])
-    
-    # Quick stats
+    ]
+
+
+def format_stats(project: ProjectSpec, verbosity: Verbosity) -> list[str]:
     total_lines = sum(f.line_count for f in project.files)
-    lines.extend([
+    return [
         "## Stats",
         "",
         f"Files: {len(project.files)} | Lines: {total_lines:,} | Routes: {len(project.all_routes)} | TODOs: {len(project.all_todos)}",
         "",
-    ])
+    ]
+
+
+def format_routes(project: ProjectSpec, verbosity: Verbosity) -> list[str]:
+    # Show all (important for API work)
+    if not project.all_routes:
+        return []
+    lines = ["## Routes", ""]
+    for route in project.all_routes:
+        lines.append(f"- {route.method} {route.path}")
+    lines.append("")
+    return lines
+
+
+def format_todos(project: ProjectSpec, verbosity: Verbosity) -> list[str]:
+    # Condensed
+    if not project.all_todos:
+        return []
+    lines = ["## TODOs", ""]
+    for todo, filepath in project.all_todos[:12]:
+        lines.append(f"- [{Path(filepath).name}] {todo}")
+    if len(project.all_todos) > 12:
+        lines.append(f"- ... +{len(project.all_todos) - 12} more")
+    lines.append("")
+    return lines
+
+
+def format_file(file: FileInfo, verbosity: Verbosity) -> list[str]:
+    """One file's block in the Modules section."""
+    # File header
+    entry_mark = " [entry]" if file.is_entry_point else ""
+    lines = [f"#### {file.relative_path}{entry_mark}", ""]
     
-    # Routes - show all (important for API work)
-    if project.all_routes:
-        lines.extend(["## Routes", ""])
-        for route in project.all_routes:
-            lines.append(f"- {route.method} {route.path}")
+    if file.description and verbosity != Verbosity.MINIMAL:
+        lines.append(f"{file.description}")
         lines.append("")
     
-    # TODOs (condensed)
-    if project.all_todos and verbosity != Verbosity.MINIMAL:
-        lines.extend(["## TODOs", ""])
-        for todo, filepath in project.all_todos[:12]:
-            lines.append(f"- [{Path(filepath).name}] {todo}")
-        if len(project.all_todos) > 12:
-            lines.append(f"- ... +{len(project.all_todos) - 12} more")
+    # Classes
+    for cls in file.classes:
+        lines.extend(format_class(cls, verbosity))
         lines.append("")
     
-    # Group files by role then by directory
-    roles_order = ['config', 'route', 'controller', 'service', 'model', 'state', 'view', 'util', 'type', 'middleware', 'module']
-    files_by_role: dict[str, list[FileInfo]] = {}
+    # Interfaces (full verbosity only, or if no classes)
+    if file.interfaces and (verbosity == Verbosity.FULL or not file.classes):
+        for iface in file.interfaces[:5]:
+            lines.extend(format_interface(iface, verbosity))
+            lines.append("")
     
-    for f in project.files:
-        role = f.role if f.role in roles_order else 'module'
-        if role not in files_by_role:
-            files_by_role[role] = []
-        files_by_role[role].append(f)
+    # Standalone functions
+    fn_names_in_classes = set()
+    for cls in file.classes:
+        for m in cls.methods:
+            fn_names_in_classes.add(m.name)
+    
+    standalone_fns = [fn for fn in file.functions if fn.name not in fn_names_in_classes]
+    if standalone_fns:
+        lines.append("Functions:")
+        for fn in standalone_fns[:10]:
+            lines.append(format_function(fn, verbosity))
+        if len(standalone_fns) > 10:
+            lines.append(f"- ... +{len(standalone_fns) - 10} more")
+        lines.append("")
+    
+    # Routes for this file
+    if file.routes:
+        routes_str = ", ".join(f"{r.method} {r.path}" for r in file.routes[:5])
+        lines.append(f"Routes: {routes_str}")
+        lines.append("")
+    
+    # External dependencies - deduplicated
+    external = list(dict.fromkeys(imp.module for imp in file.imports if not imp.is_relative))
+    if external and verbosity != Verbosity.MINIMAL:
+        lines.append(f"Imports: {', '.join(external[:8])}")
+        lines.append("")
+    
+    # Code snippet
+    if file.snippet and verbosity == Verbosity.FULL:
+        lines.extend([
+            "```typescript",
+            file.snippet,
+            "```",
+            ""
+        ])
+    
+    return lines
+
+
+def role_title(role: str) -> str:
+    return role.title() + "s" if not role.endswith('s') else role.title()
+
+
+def files_by_role(files: list[FileInfo]) -> dict[str, list[FileInfo]]:
+    """Files grouped by role in ROLES_ORDER, sorted by path within a role."""
+    grouped: dict[str, list[FileInfo]] = {}
+    for f in files:
+        role = f.role if f.role in ROLES_ORDER else 'module'
+        grouped.setdefault(role, []).append(f)
+    return {
+        role: sorted(grouped[role], key=lambda f: f.relative_path)
+        for role in ROLES_ORDER if role in grouped
+    }
+
+
+def format_modules(
+    project: ProjectSpec,
+    verbosity: Verbosity,
+    levels: Optional[dict[str, Verbosity]] = None
+) -> list[str]:
+    """
+    Files grouped by role then by directory.
+    
+    `levels` gives a per-file verbosity (see pack_spec); files missing from
+    it are left out, as is the whole section if none remain.
+    """
+    if levels is not None and not levels:
+        return []
+    
+    lines = ["## Modules", ""]
+    
+    for role, role_files in files_by_role(project.files).items():
+        if levels is not None:
+            role_files = [f for f in role_files if f.relative_path in levels]
+            if not role_files:
+                continue
+        
+        lines.extend([f"### {role_title(role)}", ""])
+        
+        for file in role_files:
+            lines.extend(format_file(file, levels[file.relative_path] if levels is not None else verbosity))
+    
+    return lines
+
+
+def format_dependencies(project: ProjectSpec, verbosity: Verbosity) -> list[str]:
+    if not project.dependencies:
+        return []
+    return [
+        "## Dependencies",
+        "",
+        ", ".join(sorted(project.dependencies)),
+        "",
+    ]
+
+
+def format_internal_imports(project: ProjectSpec, verbosity: Verbosity) -> list[str]:
+    if not project.internal_deps:
+        return []
+    lines = [
+        "## Internal Imports",
+        "",
+        "File <- Imported by:",
+        "",
+    ]
+    for target, importers in sorted(project.internal_deps.items())[:20]:
+        importers_short = [Path(i).name for i in importers[:3]]
+        more = f" +{len(importers) - 3}" if len(importers) > 3 else ""
+        lines.append(f"- {target} <- {', '.join(importers_short)}{more}")
+    lines.append("")
+    return lines
+
+
+def format_dependency_graph(project: ProjectSpec, verbosity: Verbosity) -> list[str]:
+    """Layers, cycles and the most connected files from project.graph."""
+    graph = project.graph
+    if not project.internal_deps or not graph.layers:
+        return []
     
-    # Modules section
-    lines.extend(["## Modules", ""])
+    per_layer: dict[int, int] = {}
+    for layer in graph.layers.values():
+        per_layer[layer] = per_layer.get(layer, 0) + 1
+    in_cycles = sum(len(cycle) for cycle in graph.cycles)
+    cycles = f"{len(graph.cycles)} ({in_cycles} files)" if graph.cycles else "none"
+    lines = [
+        "## Dependency Graph",
+        "",
+        f"Layers: {len(per_layer)} (0 = imports no internal file) | Cycles: {cycles}",
+        "",
+        "Files per layer: " + ", ".join(f"{layer}: {count}" for layer, count in sorted(per_layer.items())),
+        "",
+    ]
+    
+    def describe(path: str) -> str:
+        return f"- {path}: in {graph.fan_in[path]}, out {graph.fan_out[path]}, layer {graph.layers[path]}"
     
-    for role in roles_order:
-        if role not in files_by_role:
+    for title, counts in (("Most imported (fan-in):", graph.fan_in), ("Most importing (fan-out):", graph.fan_out)):
+        top = heapq.nsmallest(8, (path for path, n in counts.items() if n), key=lambda p: (-counts[p], p))
+        if top:
+            lines.append(title)
+            lines.extend(describe(path) for path in top)
+            lines.append("")
+    
+    if graph.cycles:
+        lines.append("Import cycles:")
+        for cycle in graph.cycles[:10]:
+            lines.append(f"- {', '.join(cycle)}")
+        if len(graph.cycles) > 10:
+            lines.append(f"- ... +{len(graph.cycles) - 10} more")
+        lines.append("")
+    return lines
+
+
+def format_unresolved_imports(project: ProjectSpec, verbosity: Verbosity) -> list[str]:
+    if not project.unresolved_imports:
+        return []
+    lines = [
+        "## Unresolved Imports",
+        "",
+        "Relative imports that match no scanned file (missing, ignored, or non-code):",
+        "",
+    ]
+    for importer, modules in sorted(project.unresolved_imports.items())[:20]:
+        lines.append(f"- {importer}: {', '.join(modules)}")
+    if len(project.unresolved_imports) > 20:
+        lines.append(f"- ... +{len(project.unresolved_imports) - 20} more files")
+    lines.append("")
+    return lines
+
+
+def format_skipped_files(project: ProjectSpec, verbosity: Verbosity) -> list[str]:
+    if not project.skipped_files:
+        return []
+    lines = [
+        "## Skipped Files",
+        "",
+        "Not parsed, so missing from the sections above:",
+        "",
+    ]
+    for file in project.skipped_files:
+        lines.append(f"- {file.relative_path}: {file.skipped}")
+    lines.append("")
+    return lines
+
+
+# (name, formatter, lowest verbosity that includes it), in document order
+SPEC_SECTIONS = [
+    ('scripts', format_scripts, Verbosity.STANDARD),
+    ('structure', format_structure, Verbosity.MINIMAL),
+    ('stats', format_stats, Verbosity.MINIMAL),
+    ('routes', format_routes, Verbosity.MINIMAL),
+    ('todos', format_todos, Verbosity.STANDARD),
+    ('modules', format_modules, Verbosity.MINIMAL),
+    ('dependencies', format_dependencies, Verbosity.MINIMAL),
+    ('internal_imports', format_internal_imports, Verbosity.STANDARD),
+    ('dependency_graph', format_dependency_graph, Verbosity.STANDARD),
+    ('unresolved_imports', format_unresolved_imports, Verbosity.STANDARD),
+    ('skipped_files', format_skipped_files, Verbosity.MINIMAL),
+]
+
+
+def includes(verbosity: Verbosity, level: Verbosity) -> bool:
+    """True if output at `verbosity` includes content shown from `level` up."""
+    order = list(Verbosity)
+    return order.index(verbosity) >= order.index(level)
+
+
+def generate_spec(project: ProjectSpec, verbosity: Verbosity) -> str:
+    """Generate the SPEC markdown content."""
+    lines = format_header(project)
+    for _, formatter, level in SPEC_SECTIONS:
+        if includes(verbosity, level):
+            lines.extend(formatter(project, verbosity))
+    return '\n'.join(lines)
+
+
+# =============================================================================
+# Token Budget
+# =============================================================================
+
+TOKEN_ENCODING = 'cl100k_base'
+
+# Value of each optional section under --token-budget (Stats is always kept;
+# files are scored by file_score and compete with these)
+SECTION_SCORES = {
+    'routes': 80,
+    'structure': 40,
+    'dependencies': 30,
+    'scripts': 25,
+    'internal_imports': 20,
+    'dependency_graph': 20,
+    'skipped_files': 15,
+    'todos': 10,
+    'unresolved_imports': 5,
+}
+
+ROLE_SCORES = {
+    'route': 30, 'controller': 30, 'service': 25, 'config': 20, 'middleware': 20, 'model': 20,
+    'state': 15, 'type': 15, 'view': 10, 'util': 10, 'module': 10,
+}
+
+# Share of a file's score earned at each verbosity (full is doubled for files with a snippet)
+LEVEL_SCORES = {Verbosity.MINIMAL: 1.0, Verbosity.STANDARD: 0.4, Verbosity.FULL: 0.2}
+
+
+class TokenCounter:
+    """
+    Token counts for spec fragments, memoized by text.
+    
+    Uses the tiktoken encoding when tiktoken is installed, otherwise the
+    ~4 chars per token estimate. Only fragments seen in the current or
+    previous render are remembered, so --watch re-renders encode just the
+    files that changed.
+    """
+    
+    def __init__(self, encoding: str = TOKEN_ENCODING):
+        self.encoder = None
+        if tiktoken:
+            try:
+                self.encoder = tiktoken.get_encoding(encoding)
+            except Exception as e:
+                # The encoding is downloaded on first use
+                print(f"Warning: tiktoken could not load {encoding} ({e}); estimating tokens from length")
+        self.name = encoding if self.encoder else "~4 chars/token"
+        self.counts: dict[str, int] = {}
+        self.previous: dict[str, int] = {}
+    
+    def measure(self, text: str) -> int:
+        if self.encoder:
+            return len(self.encoder.encode(text, disallowed_special=()))
+        return -(-len(text) // 4)
+    
+    def count(self, text: str) -> int:
+        tokens = self.counts.get(text)
+        if tokens is None:
+            tokens = self.previous.get(text)
+            if tokens is None:
+                tokens = self.measure(text)
+            self.counts[text] = tokens
+        return tokens
+    
+    def next_render(self):
+        self.previous, self.counts = self.counts, {}
+
+
+@dataclass
+class PackedSpec:
+    content: str
+    tokens: int
+    budget: int
+    levels: dict = field(default_factory=dict)      # relative_path -> Verbosity of each file shown
+    omitted: list = field(default_factory=list)     # titles of sections left out
+
+
+def file_score(file: FileInfo, fan_in: int) -> float:
+    """How much a file's entry is worth: role, entry point, routes, importers, types and exports."""
+    score = ROLE_SCORES.get(file.role, ROLE_SCORES['module'])
+    if file.is_entry_point:
+        score += 40
+    score += 5 * min(len(file.routes), 10)
+    score += 3 * min(fan_in, 15)
+    score += 2 * min(len(file.interfaces), 5)
+    score += min(len(file.exports), 10)
+    return score
+
+
+def pack_spec(
+    project: ProjectSpec,
+    verbosity: Verbosity,
+    budget: int,
+    counter: TokenCounter,
+    reserve: int = 0
+) -> PackedSpec:
+    """
+    Render the spec with the most valuable content that fits `budget` tokens,
+    less `reserve` tokens the caller appends afterwards.
+    
+    The header and stats are always kept. Each optional section is one
+    candidate; each file is a chain of candidates (its minimal entry, then
+    the upgrades to standard and full, up to `verbosity`). Candidates are
+    taken greedily by score, skipping any that no longer fit, and the kept
+    content is rendered in the usual document order.
+    """
+    counter.next_render()
+    limit = budget - reserve
+    
+    def cost(lines: list[str]) -> int:
+        return counter.count('\n'.join(lines) + '\n') if lines else 0
+    
+    def stats_lines(shown: int, omitted: list[str]) -> list[str]:
+        lines = format_stats(project, verbosity)
+        note = f"Token budget: {budget:,} | Files shown: {shown}/{len(project.files)}"
+        if omitted:
+            note += f" | Omitted: {', '.join(omitted)}"
+        return lines[:-1] + [note, ""]
+    
+    sections = {}
+    for name, formatter, level in SPEC_SECTIONS:
+        if name in SECTION_SCORES and includes(verbosity, level):
+            lines = formatter(project, verbosity)
+            if lines:
+                sections[name] = lines
+    titles = {name: lines[0].lstrip('# ') for name, lines in sections.items()}
+    
+    # (score, order, section name or file path, file level), best first;
+    # a file's levels share its order so they stay in sequence on ties
+    candidates = [(SECTION_SCORES[name], i, name, None) for i, name in enumerate(sections)]
+    levels_allowed = [level for level in Verbosity if includes(verbosity, level)]
+    files = {f.relative_path: f for f in project.files}
+    file_costs = {}
+    for i, file in enumerate(project.files, start=len(candidates)):
+        score = file_score(file, len(project.internal_deps.get(file.relative_path, [])))
+        file_costs[file.relative_path] = {level: cost(format_file(file, level)) for level in levels_allowed}
+        for level in levels_allowed:
+            share = LEVEL_SCORES[level] * (2 if level == Verbosity.FULL and file.snippet else 1)
+            candidates.append((score * share, i, file.relative_path, level))
+    candidates.sort(key=lambda c: (-c[0], c[1]))
+    
+    used = cost(format_header(project)) + cost(stats_lines(len(project.files), list(titles.values())))
+    kept_sections = set()
+    levels: dict[str, Verbosity] = {}
+    open_roles = set()
+    picked = []  # (key, previous level, tokens), in pick order
+    for _, _, key, level in candidates:
+        if level is None:
+            tokens = cost(sections[key])
+        else:
+            prev = levels_allowed[levels_allowed.index(level) - 1] if level != levels_allowed[0] else None
+            if levels.get(key) != prev:
+                continue
+            tokens = file_costs[key][level] - (file_costs[key][prev] if prev else 0)
+            role = files[key].role if files[key].role in ROLES_ORDER else 'module'
+            if prev is None and role not in open_roles:
+                tokens += cost([f"### {role_title(role)}", ""]) + (0 if open_roles else cost(["## Modules", ""]))
+        if used + tokens > limit:
             continue
+        used += tokens
+        picked.append((key, levels.get(key) if level else None, tokens))
+        if level is None:
+            kept_sections.add(key)
+        else:
+            levels[key] = level
+            open_roles.add(files[key].role if files[key].role in ROLES_ORDER else 'module')
+    
+    while True:
+        omitted = [titles[name] for name in sections if name not in kept_sections]
+        lines = format_header(project)
+        for name, formatter, _ in SPEC_SECTIONS:
+            if name == 'stats':
+                lines.extend(stats_lines(len(levels), omitted))
+            elif name == 'modules':
+                lines.extend(format_modules(project, verbosity, levels))
+            elif name in kept_sections:
+                lines.extend(sections[name])
+        content = '\n'.join(lines)
+        tokens = counter.measure(content)
+        if tokens <= limit or not picked:
+            break
+        # Fragment counts don't add up exactly; give back the lowest-value picks
+        over = tokens - limit
+        while picked and over > 0:
+            key, prev, freed = picked.pop()
+            over -= freed
+            if key in kept_sections:
+                kept_sections.discard(key)
+            elif prev:
+                levels[key] = prev
+            else:
+                del levels[key]
+    
+    return PackedSpec(content, tokens, budget, levels, omitted)
+
+
+def render_spec(
+    project: ProjectSpec,
+    verbosity: Verbosity,
+    token_budget: Optional[int] = None,
+    counter: Optional[TokenCounter] = None,
+    reserve: int = 0
+) -> tuple[str, Optional[PackedSpec]]:
+    """
+    The spec markdown, packed into `token_budget` tokens when one is given
+    (leaving `reserve` of them for text the caller appends).
+    """
+    if not token_budget:
+        return generate_spec(project, verbosity), None
+    packed = pack_spec(project, verbosity, token_budget, counter or TokenCounter(), reserve)
+    return packed.content, packed
+
+
+# =============================================================================
+# Parse Cache
+# =============================================================================
+
+def dumps_compact(data) -> str:
+    """Compact JSON text (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(data).decode('utf-8')
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+
+def loads_json(raw: bytes):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def function_to_dict(info: FunctionInfo) -> dict:
+    return {**vars(info), 'params': [vars(p).copy() for p in info.params]}
+
+
+def function_from_dict(data: dict) -> FunctionInfo:
+    return FunctionInfo(**{**data, 'params': [ParamInfo(**p) for p in data['params']]})
+
+
+def file_info_to_dict(info: FileInfo) -> dict:
+    """
+    Serialize a FileInfo (and its nested infos) to plain JSON types.
+    
+    Spelled out rather than dataclasses.asdict, whose recursive deepcopy
+    dominated --json and cache writes on large trees.
+    """
+    return {
+        **vars(info),
+        'path': str(info.path),
+        'functions': [function_to_dict(f) for f in info.functions],
+        'classes': [
+            {
+                **vars(c),
+                'methods': [function_to_dict(m) for m in c.methods],
+                'properties': [vars(p).copy() for p in c.properties],
+            }
+            for c in info.classes
+        ],
+        'interfaces': [
+            {**vars(i), 'properties': [vars(p).copy() for p in i.properties]}
+            for i in info.interfaces
+        ],
+        'imports': [vars(i).copy() for i in info.imports],
+        'routes': [vars(r).copy() for r in info.routes],
+    }
+
+
+def file_info_from_dict(data: dict, root: Path) -> FileInfo:
+    """Rebuild a FileInfo from file_info_to_dict output, re-rooted at root."""
+    return FileInfo(**{
+        **data,
+        'path': root / data['relative_path'],
+        'functions': [function_from_dict(f) for f in data['functions']],
+        'classes': [
+            ClassInfo(**{
+                **c,
+                'methods': [function_from_dict(m) for m in c['methods']],
+                'properties': [PropertyInfo(**p) for p in c['properties']],
+            })
+            for c in data['classes']
+        ],
+        'interfaces': [
+            InterfaceInfo(**{**i, 'properties': [PropertyInfo(**p) for p in i['properties']]})
+            for i in data['interfaces']
+        ],
+        'imports': [ImportInfo(**i) for i in data['imports']],
+        'routes': [RouteInfo(**r) for r in data['routes']],
+    })
+
+
+class ParseCache:
+    """
+    Persistent per-file cache of extraction results.
+    
+    Entries are keyed by relative path and trusted while size and mtime
+    match; if those changed, the content hash decides (a checkout or touch
+    that left the file as it was is still a hit). The whole cache is
+    discarded when its fingerprint differs: this script's own source and
+    the options that change extraction (snippets, snippet length, parser).
+    """
+    
+    FORMAT_VERSION = 1
+    FILENAME = 'file_cache.json'
+    
+    def __init__(self, path: Path, options: dict):
+        self.path = Path(path)
+        self.fingerprint = self.compute_fingerprint(options)
+        self.entries = {}
+        self.extra = {}  # what save() was given alongside the entries
+        self.current = {}
+        self.hits = 0
+        self.misses = 0
         
-        role_files = files_by_role[role]
-        role_title = role.title() + "s" if not role.endswith('s') else role.title()
+        try:
+            data = loads_json(self.path.read_bytes())
+        except (OSError, ValueError):
+            return
+        if data.get('fingerprint') == self.fingerprint:
+            self.entries = data.get('files', {})
+            self.extra = {k: v for k, v in data.items() if k not in ('format', 'fingerprint', 'files')}
+    
+    @classmethod
+    def compute_fingerprint(cls, options: dict) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{cls.FORMAT_VERSION}\n".encode())
+        digest.update(Path(__file__).read_bytes())
+        digest.update(json.dumps(options, sort_keys=True).encode())
+        return digest.hexdigest()
+    
+    @staticmethod
+    def relative_key(file_path: Path, root: Path) -> str:
+        return str(file_path.relative_to(root)).replace('\\', '/')
+    
+    def lookup(self, file_path: Path, root: Path) -> tuple[bool, Optional[FileInfo]]:
+        """
+        Look up a file's cached result.
         
-        lines.extend([f"### {role_title}", ""])
+        Returns:
+            tuple: (hit, info) - info is None for a cached "nothing to document"
+        """
+        key = self.relative_key(file_path, root)
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return False, None
         
-        for file in sorted(role_files, key=lambda f: f.relative_path):
-            # File header
-            entry_mark = " [entry]" if file.is_entry_point else ""
-            lines.append(f"#### {file.relative_path}{entry_mark}")
-            lines.append("")
-            
-            if file.description and verbosity != Verbosity.MINIMAL:
-                lines.append(f"{file.description}")
-                lines.append("")
-            
-            # Classes
-            for cls in file.classes:
-                lines.extend(format_class(cls, verbosity))
-                lines.append("")
-            
-            # Interfaces (full verbosity only, or if no classes)
-            if file.interfaces and (verbosity == Verbosity.FULL or not file.classes):
-                for iface in file.interfaces[:5]:
-                    lines.extend(format_interface(iface, verbosity))
-                    lines.append("")
-            
-            # Standalone functions
-            fn_names_in_classes = set()
-            for cls in file.classes:
-                for m in cls.methods:
-                    fn_names_in_classes.add(m.name)
-            
-            standalone_fns = [fn for fn in file.functions if fn.name not in fn_names_in_classes]
-            if standalone_fns:
-                lines.append("Functions:")
-                for fn in standalone_fns[:10]:
-                    lines.append(format_function(fn, verbosity))
-                if len(standalone_fns) > 10:
-                    lines.append(f"- ... +{len(standalone_fns) - 10} more")
-                lines.append("")
-            
-            # Routes for this file
-            if file.routes:
-                routes_str = ", ".join(f"{r.method} {r.path}" for r in file.routes[:5])
-                lines.append(f"Routes: {routes_str}")
-                lines.append("")
-            
-            # External dependencies - deduplicated
-            external = list(dict.fromkeys(imp.module for imp in file.imports if not imp.is_relative))
-            if external and verbosity != Verbosity.MINIMAL:
-                lines.append(f"Imports: {', '.join(external[:8])}")
-                lines.append("")
-            
-            # Code snippet
-            if file.snippet and verbosity == Verbosity.FULL:
-                lines.extend([
-                    "```typescript",
-                    file.snippet,
-                    "```",
-                    ""
-                ])
-    
-    # Dependencies summary
-    if project.dependencies:
-        lines.extend([
-            "## Dependencies",
-            "",
-            ", ".join(sorted(project.dependencies)),
-            "",
-        ])
+        state = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        entry = self.entries.get(key)
+        if entry and entry['size'] == state['size'] and entry['mtime_ns'] == state['mtime_ns']:
+            state['sha256'] = entry['sha256']
+        else:
+            try:
+                state['sha256'] = hashlib.sha256(file_path.read_bytes()).hexdigest()
+            except OSError:
+                return False, None
+            if not entry or entry['sha256'] != state['sha256']:
+                self.current[key] = state
+                self.misses += 1
+                return False, None
+        
+        self.current[key] = {**state, 'info': entry['info']}
+        self.hits += 1
+        info = entry['info']
+        return True, file_info_from_dict(info, root) if info else None
+    
+    def store(self, file_path: Path, root: Path, info: Optional[FileInfo]):
+        """Record the result for a file that missed in lookup()."""
+        state = self.current.get(self.relative_key(file_path, root))
+        if state is not None:
+            state['info'] = file_info_to_dict(info) if info else None
+    
+    def save(self, **extra):
+        """Write entries for the files seen this run (deleted files drop out)."""
+        files = {key: state for key, state in self.current.items() if 'info' in state}
+        data = {'format': self.FORMAT_VERSION, 'fingerprint': self.fingerprint, **extra, 'files': files}
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        tmp_path.write_text(dumps_compact(data), encoding='utf-8')
+        os.replace(tmp_path, self.path)
+
+
+# =============================================================================
+# Spec JSON
+# =============================================================================
+
+SPEC_JSON_FORMAT = 2
+
+
+def project_to_dict(project: ProjectSpec) -> dict:
+    """
+    Serialize a ProjectSpec for --json.
+    
+    Routes and TODOs are left out (load_spec_json rebuilds them from the
+    files), as are absolute file paths (rebuilt from root).
+    """
+    def file_dict(info: FileInfo) -> dict:
+        data = file_info_to_dict(info)
+        del data['path']
+        return data
+    
+    return {
+        'format': SPEC_JSON_FORMAT,
+        'name': project.name,
+        'description': project.description,
+        'root': str(project.root),
+        'generated_at': project.generated_at,
+        'scripts': project.scripts,
+        'dependencies': project.dependencies,
+        'dev_dependencies': project.dev_dependencies,
+        'structure': project.structure,
+        'files': [file_dict(f) for f in project.files],
+        'skipped_files': [file_dict(f) for f in project.skipped_files],
+        'internal_deps': project.internal_deps,
+        'unresolved_imports': project.unresolved_imports,
+        'graph': vars(project.graph),
+    }
+
+
+def dump_spec_json(project: ProjectSpec) -> str:
+    """Compact JSON for a ProjectSpec."""
+    return dumps_compact(project_to_dict(project))
+
+
+def load_spec_json(path: Path, root: Optional[Path] = None) -> ProjectSpec:
+    """
+    Rehydrate a ProjectSpec written by --json, without touching the source tree.
+    
+    Args:
+        path: The .json file
+        root: Project root to rebuild file paths against (default: the one recorded)
+    """
+    data = loads_json(Path(path).read_bytes())
+    if data.get('format') != SPEC_JSON_FORMAT:
+        raise ValueError(f"{path}: unsupported spec format {data.get('format')!r} (expected {SPEC_JSON_FORMAT})")
+    
+    root = Path(root or data['root'])
+    project = ProjectSpec(
+        root=root,
+        name=data['name'],
+        description=data['description'],
+        structure=data['structure'],
+        scripts=data['scripts'],
+        dependencies=data['dependencies'],
+        dev_dependencies=data['dev_dependencies'],
+        internal_deps=data['internal_deps'],
+        unresolved_imports=data['unresolved_imports'],
+        graph=GraphAnalysis(**data['graph']),
+        generated_at=data['generated_at']
+    )
+    project.files = [file_info_from_dict(f, root) for f in data['files']]
+    project.skipped_files = [file_info_from_dict(f, root) for f in data['skipped_files']]
+    collect_routes_and_todos(project)
+    return project
+
+
+# =============================================================================
+# Git-Scoped Refresh
+# =============================================================================
+
+def git_changed_paths(root: Path, rev: str) -> Optional[set[str]]:
+    """
+    Paths under root that differ from rev: committed, staged, unstaged, and untracked.
     
-    # Internal dependency graph
-    if project.internal_deps and verbosity != Verbosity.MINIMAL:
-        lines.extend([
-            "## Internal Imports",
-            "",
-            "File <- Imported by:",
-            "",
-        ])
-        for target, importers in sorted(project.internal_deps.items())[:20]:
-            importers_short = [Path(i).name for i in importers[:3]]
-            more = f" +{len(importers) - 3}" if len(importers) > 3 else ""
-            lines.append(f"- {target} <- {', '.join(importers_short)}{more}")
+    Returns:
+        set: Paths relative to root, or None if git failed
+    """
+    commands = [
+        ['git', 'diff', '--name-only', '--no-renames', '--relative', '-z', rev, '--'],
+        ['git', 'ls-files', '--others', '--exclude-standard', '-z'],
+    ]
+    paths = set()
+    for command in commands:
+        try:
+            result = subprocess.run(command, cwd=root, capture_output=True, text=True, check=True)
+        except FileNotFoundError:
+            print("Error: git not found")
+            return None
+        except subprocess.CalledProcessError as e:
+            print(f"Error: {' '.join(command[:2])} failed: {e.stderr.strip()}")
+            return None
+        paths.update(p for p in result.stdout.split('\0') if p)
+    return paths
+
+
+def git_is_ancestor(root: Path, rev: str) -> bool:
+    """True if rev exists and HEAD descends from it."""
+    try:
+        result = subprocess.run(['git', 'merge-base', '--is-ancestor', rev, 'HEAD'], cwd=root, capture_output=True)
+    except OSError:
+        return False
+    return result.returncode == 0
+
+
+def git_head(root: Path) -> str:
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+    return result.stdout.strip()
+
+
+class SpecState(ParseCache):
+    """
+    Extraction results for every scanned file, kept next to the spec for --since.
+    
+    Unlike ParseCache, validity comes from git rather than the filesystem:
+    an entry is reused unless git reports the file changed since the given
+    revision or since the commit the state was saved at, so fresh CI
+    checkouts (new mtimes, no local cache) still hit.
+    """
+    
+    SUFFIX = '.state.json'
+    
+    def __init__(self, path: Path, options: dict, changed: set[str]):
+        super().__init__(path, options)
+        self.changed = changed
+    
+    @classmethod
+    def path_for(cls, output_path: Path) -> Path:
+        """SPEC.md -> SPEC.state.json"""
+        return output_path.with_name(output_path.stem + cls.SUFFIX)
+    
+    @classmethod
+    def load(cls, output_path: Path, options: dict, root: Path, rev: str) -> Optional['SpecState']:
+        """
+        State for a --since REV run, or None if git failed.
+        
+        Files changed since REV or since the saved revision are re-extracted.
+        A state without a revision, or saved at a commit HEAD doesn't descend
+        from (rebased away, other branch), is discarded.
+        """
+        changed = git_changed_paths(root, rev)
+        if changed is None:
+            return None
+        state = cls(cls.path_for(output_path), options, changed)
+        if not state.entries:
+            return state
+        
+        revision = state.extra.get('revision', '')
+        if not revision or not git_is_ancestor(root, revision):
+            print(f"{state.path.name} was saved at {revision[:12] or 'an unknown revision'}, "
+                  "which HEAD doesn't descend from; ignoring it")
+            state.entries = {}
+            return state
+        since_saved = git_changed_paths(root, revision)
+        if since_saved is None:
+            return None
+        changed |= since_saved
+        return state
+    
+    def save(self, root: Path):
+        """
+        Save with the HEAD revision; files that differ from HEAD are left out,
+        since their content isn't what that revision holds.
+        """
+        dirty = git_changed_paths(root, 'HEAD')
+        if dirty is None:
+            super().save()  # no revision: the next run extracts everything
+            return
+        for key in dirty:
+            self.current.pop(key, None)
+        super().save(revision=git_head(root))
+    
+    def lookup(self, file_path: Path, root: Path) -> tuple[bool, Optional[FileInfo]]:
+        key = self.relative_key(file_path, root)
+        entry = self.entries.get(key)
+        if entry is None or key in self.changed:
+            self.current[key] = {}
+            self.misses += 1
+            return False, None
+        
+        self.current[key] = entry
+        self.hits += 1
+        info = entry['info']
+        return True, file_info_from_dict(info, root) if info else None
+
+
+# =============================================================================
+# Profiling
+# =============================================================================
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MiB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+class TimedPattern:
+    """Stand-in for a compiled PATTERNS entry that accumulates time spent matching."""
+    
+    def __init__(self, pattern: re.Pattern, stats: dict):
+        self.pattern = pattern
+        self.stats = stats
+    
+    def __getattr__(self, name):
+        return getattr(self.pattern, name)
+    
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        result = method(*args)
+        self.stats['seconds'] += time.perf_counter() - start
+        self.stats['calls'] += 1
+        self.stats['matches'] += result is not None
+        return result
+    
+    def match(self, *args):
+        return self._timed(self.pattern.match, *args)
+    
+    def search(self, *args):
+        return self._timed(self.pattern.search, *args)
+    
+    def finditer(self, *args):
+        self.stats['calls'] += 1
+        iterator = self.pattern.finditer(*args)
+        while True:
+            start = time.perf_counter()
+            match = next(iterator, None)
+            self.stats['seconds'] += time.perf_counter() - start
+            if match is None:
+                return
+            self.stats['matches'] += 1
+            yield match
+
+
+class SpecProfiler:
+    """
+    Collects --profile data: wall time and peak RSS per phase, extraction
+    time per file, and time per PATTERNS entry.
+    
+    install() swaps every PATTERNS entry for a TimedPattern and wraps the
+    scanners so their setup (the lexer's tokenizing pass) is timed too.
+    Extraction has to run in this process for that, so --profile parses
+    serially.
+    """
+    
+    def __init__(self, top: int = 15):
+        self.top = top
+        self.phases = []
+        self.files = []
+        self.patterns = {}
+    
+    def install(self):
+        for name, pattern in list(PATTERNS.items()):
+            self.patterns[name] = {'calls': 0, 'matches': 0, 'seconds': 0.0}
+            PATTERNS[name] = TimedPattern(pattern, self.patterns[name])
+        for name, scanner_class in list(PARSERS.items()):
+            stats = self.patterns[f"({name} setup)"] = {'calls': 0, 'matches': 0, 'seconds': 0.0}
+            PARSERS[name] = self._timed_scanner(scanner_class, stats)
+    
+    @staticmethod
+    def _timed_scanner(scanner_class, stats: dict):
+        def create(content):
+            start = time.perf_counter()
+            scanner = scanner_class(content)
+            stats['seconds'] += time.perf_counter() - start
+            stats['calls'] += 1
+            return scanner
+        return create
+    
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        yield
+        self.phases.append({'phase': name, 'seconds': time.perf_counter() - start, 'peak_rss_mb': peak_rss_mb()})
+    
+    def extract(self, task: tuple) -> Optional[FileInfo]:
+        """extract_documented_file, timed per file."""
+        file_path, root = task[0], task[1]
+        start = time.perf_counter()
+        info = extract_documented_file(task)
+        seconds = time.perf_counter() - start
+        try:
+            size = file_path.stat().st_size
+        except OSError:
+            size = 0
+        self.files.append({
+            'file': str(file_path.relative_to(root)).replace('\\', '/'),
+            'bytes': size,
+            'seconds': seconds,
+        })
+        return info
+    
+    def report(self) -> dict:
+        slowest = sorted(self.files, key=lambda f: f['seconds'], reverse=True)[:self.top]
+        patterns = sorted(
+            ({'pattern': name, **stats} for name, stats in self.patterns.items() if stats['calls']),
+            key=lambda p: p['seconds'],
+            reverse=True
+        )
+        return {
+            'total_seconds': sum(p['seconds'] for p in self.phases),
+            'peak_rss_mb': peak_rss_mb(),
+            'phases': self.phases,
+            'files_parsed': len(self.files),
+            'parse_seconds': sum(f['seconds'] for f in self.files),
+            'slowest_files': slowest,
+            'patterns': patterns,
+        }
+    
+    @staticmethod
+    def print_report(report: dict):
+        print("\nProfile")
+        print(f"  {'phase':<10} {'time':>9} {'peak RSS':>10}")
+        for p in report['phases']:
+            rss = f"{p['peak_rss_mb']:.1f} MiB" if p['peak_rss_mb'] is not None else "-"
+            print(f"  {p['phase']:<10} {p['seconds']:>8.3f}s {rss:>10}")
+        print(f"  {'total':<10} {report['total_seconds']:>8.3f}s")
+        
+        if report['slowest_files']:
+            print(f"\n  Slowest files ({report['files_parsed']:,} parsed in {report['parse_seconds']:.3f}s):")
+            for f in report['slowest_files']:
+                print(f"  {f['seconds'] * 1000:>9.1f}ms {f['bytes'] / 1024:>9.1f} KB  {f['file']}")
+        
+        if report['patterns']:
+            print(f"\n  {'pattern':<20} {'calls':>9} {'matches':>9} {'time':>9}")
+            for p in report['patterns']:
+                print(f"  {p['pattern']:<20} {p['calls']:>9,} {p['matches']:>9,} {p['seconds']:>8.3f}s")
+
+
+# =============================================================================
+# Watch Mode
+# =============================================================================
+
+class SpecWatcher:
+    """
+    Keeps a generated spec current as the project tree changes.
+    
+    With watchdog installed, file system events (inotify, FSEvents, ...)
+    name the changed paths, so an idle tree costs nothing and a save costs
+    one stat; only directory changes and added/removed files re-walk the
+    tree. Otherwise (or with poll=True) each poll re-walks the (pruned)
+    tree and stats the code files plus package.json.
+    
+    A burst of saves is debounced until the tree has been quiet for
+    `debounce` seconds; then only the touched files are re-extracted, the
+    in-memory file list and dependency graph are patched, and the output
+    file is replaced atomically.
+    """
+    
+    def __init__(
+        self,
+        root: Path,
+        ignore_patterns: set,
+        output_path: Path,
+        verbosity: Verbosity,
+        depth: int,
+        extract_options: tuple,
+        files: list[FileInfo],
+        resolver: ImportResolver,
+        internal_deps: dict[str, list[str]],
+        unresolved_imports: dict[str, list[str]],
+        stats: dict[Path, tuple[int, int]],
+        interval: float = 0.5,
+        debounce: float = 0.3,
+        json_path: Optional[Path] = None,
+        token_budget: Optional[int] = None,
+        walk: Optional[ProjectWalk] = None,
+        poll: bool = False
+    ):
+        self.root = root
+        self.ignore_patterns = ignore_patterns
+        self.output_path = output_path
+        self.verbosity = verbosity
+        self.depth = depth
+        self.extract_options = extract_options  # (include_snippets, max_snippet_lines, parser, limits)
+        self.files = {f.relative_path: f for f in files}
+        self.resolver = resolver
+        self.internal_deps = internal_deps
+        self.unresolved_imports = unresolved_imports
+        self.stats = stats
+        self.interval = interval
+        self.debounce = debounce
+        self.json_path = json_path
+        self.token_budget = token_budget
+        self.counter = TokenCounter() if token_budget else None
+        self.walk = walk
+        self.use_events = Observer is not None and not poll
+        # Filled by dispatch() on the watchdog thread, drained by run()
+        self.lock = threading.Lock()
+        self.pending: set[Path] = set()
+        self.rewalk = False
+        self.last_event = 0.0
+    
+    @staticmethod
+    def stat_files(root: Path, walk: ProjectWalk) -> dict[Path, tuple[int, int]]:
+        """(mtime_ns, size) for every walked code file and package.json."""
+        stats = {}
+        for file_path in [*walk.code_files, root / 'package.json']:
+            try:
+                stat = file_path.stat()
+            except OSError:
+                continue
+            stats[file_path] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+    
+    def poll(self) -> tuple[ProjectWalk, dict[Path, tuple[int, int]]]:
+        walk = walk_project(self.root, self.ignore_patterns)
+        return walk, self.stat_files(self.root, walk)
+    
+    def is_watched(self, path: Path) -> bool:
+        """Whether a changed path is one stat_files() tracks."""
+        if path.name == 'package.json':
+            return path.parent == self.root
+        return os.path.splitext(path.name)[1] in CODE_EXTENSIONS and path.name not in IGNORE_FILES
+    
+    def dispatch(self, event):
+        """watchdog event callback (observer thread): queue the change for run()."""
+        if event.event_type in ('opened', 'closed', 'closed_no_write'):
+            return
+        with self.lock:
+            for raw_path in (event.src_path, getattr(event, 'dest_path', '')):
+                if not raw_path:
+                    continue
+                path = Path(os.fsdecode(raw_path))
+                try:
+                    parts = path.relative_to(self.root).parts
+                except ValueError:
+                    continue
+                if any(part in self.ignore_patterns for part in parts):
+                    continue
+                if event.is_directory:
+                    # Created, removed or renamed directories change the walk
+                    if event.event_type != 'modified':
+                        self.rewalk = True
+                elif self.is_watched(path):
+                    self.pending.add(path)
+                else:
+                    continue
+                self.last_event = time.monotonic()
+    
+    def run(self):
+        if self.use_events:
+            self.run_events()
+        else:
+            self.run_polling()
+    
+    def run_events(self):
+        observer = Observer()
+        observer.schedule(self, str(self.root), recursive=True)
+        observer.start()
+        print(f"Watching {self.root} (file system events, Ctrl+C to stop)...")
+        try:
+            while True:
+                time.sleep(self.debounce)
+                with self.lock:
+                    if not (self.pending or self.rewalk) or time.monotonic() - self.last_event < self.debounce:
+                        continue
+                    pending, rewalk = self.pending, self.rewalk
+                    self.pending, self.rewalk = set(), False
+                self.apply_events(pending, rewalk)
+        except KeyboardInterrupt:
+            print("\nStopped watching")
+        finally:
+            observer.stop()
+            observer.join()
+    
+    def apply_events(self, pending: set[Path], rewalk: bool):
+        """Stat just the changed paths; re-walk only if the set of files changed."""
+        if rewalk or self.walk is None:
+            walk, stats = self.poll()
+        else:
+            stats = dict(self.stats)
+            for path in pending:
+                try:
+                    stat = path.stat()
+                except OSError:
+                    stats.pop(path, None)
+                    continue
+                stats[path] = (stat.st_mtime_ns, stat.st_size)
+            walk = self.walk
+            if stats.keys() != self.stats.keys():
+                walk = walk_project(self.root, self.ignore_patterns)
+                stats = self.stat_files(self.root, walk)
+        if stats != self.stats:
+            self.update(walk, stats)
+    
+    def run_polling(self):
+        print(f"Watching {self.root} (polling every {self.interval}s, Ctrl+C to stop)...")
+        seen = self.stats
+        last_change = None
+        try:
+            while True:
+                time.sleep(self.interval)
+                walk, stats = self.poll()
+                if stats != seen:
+                    # Still changing; wait for the burst to settle
+                    seen = stats
+                    last_change = time.monotonic()
+                elif last_change is not None and time.monotonic() - last_change >= self.debounce:
+                    self.update(walk, stats)
+                    last_change = None
+        except KeyboardInterrupt:
+            print("\nStopped watching")
+    
+    def update(self, walk: ProjectWalk, stats: dict[Path, tuple[int, int]]):
+        """Re-extract changed files and rewrite the spec."""
+        start = time.perf_counter()
+        changed = [p for p, s in stats.items() if self.stats.get(p) != s]
+        removed = [p for p in self.stats if p not in stats]
+        paths_changed = set(stats) != set(self.stats)
+        self.stats = stats
+        self.walk = walk
+        
+        touched = set()
+        for file_path in removed + changed:
+            if file_path.parent == self.root and file_path.name == 'package.json':
+                continue
+            relative = str(file_path.relative_to(self.root)).replace('\\', '/')
+            info = None
+            if file_path in stats:
+                info = extract_documented_file((file_path, self.root, *self.extract_options))
+            if info:
+                self.files[relative] = info
+            else:
+                self.files.pop(relative, None)
+            touched.add(relative)
+        
+        project = new_project_spec(self.root)
+        assign_scanned_files(project, sorted(self.files.values(), key=lambda x: x.relative_path))
+        files = project.files
+        if paths_changed:
+            # Imports may now resolve differently anywhere, so rebuild
+            self.resolver = ImportResolver.from_files(self.root, walk.code_files)
+            self.internal_deps, self.unresolved_imports = build_dependency_graph(files, self.resolver)
+        else:
+            patch_dependency_graph(self.internal_deps, self.unresolved_imports, files, touched, self.resolver)
+        
+        project.structure = generate_tree(walk.root, self.depth)
+        project.internal_deps = self.internal_deps
+        project.unresolved_imports = self.unresolved_imports
+        project.graph = analyze_dependency_graph(self.internal_deps, files)
+        collect_routes_and_todos(project)
+        write_output(self.output_path, render_spec(project, self.verbosity, self.token_budget, self.counter)[0])
+        if self.json_path:
+            write_output(self.json_path, dump_spec_json(project))
+        
+        names = sorted(Path(p).name for p in removed + changed)
+        shown = ', '.join(names[:3]) + (f" +{len(names) - 3}" if len(names) > 3 else "")
+        print(f"[{datetime.now():%H:%M:%S}] {shown} -> {self.output_path.name} "
+              f"({(time.perf_counter() - start) * 1000:.0f}ms)")
+
+
+# =============================================================================
+# Workspace Shards
+# =============================================================================
+
+@dataclass
+class Package:
+    """One shard of a --shards run: a directory with its own package.json."""
+    dir: str                # relative to the project root, '' for the root package
+    project: ProjectSpec
+    slug: str = ""          # shard file name without extension
+    depends_on: dict = field(default_factory=dict)   # package dir -> import count
+
+
+def find_package_dirs(walk: ProjectWalk) -> dict[str, DirectoryNode]:
+    """Directories holding a package.json (relative path -> tree node); the root is always included."""
+    found = {'': walk.root}
+    stack = [('', walk.root)]
+    while stack:
+        rel, node = stack.pop()
+        for child in node.dirs:
+            child_rel = f"{rel}/{child.name}" if rel else child.name
+            if 'package.json' in child.files:
+                found[child_rel] = child
+            stack.append((child_rel, child))
+    return found
+
+
+def package_of(relative_path: str, package_dirs: list[str]) -> str:
+    """Deepest package directory containing relative_path (package_dirs sorted longest first)."""
+    for package_dir in package_dirs:
+        if package_dir and relative_path.startswith(package_dir + '/'):
+            return package_dir
+    return ''
+
+
+def package_name_of(module: str) -> str:
+    """'@scope/pkg/sub/path' -> '@scope/pkg', 'pkg/sub' -> 'pkg'."""
+    parts = module.split('/')
+    return '/'.join(parts[:2]) if module.startswith('@') else parts[0]
+
+
+def prune_tree(node: DirectoryNode, rel: str, package_dirs: set[str]) -> DirectoryNode:
+    """Copy of the tree with nested package directories left unexpanded."""
+    pruned = DirectoryNode(node.name, files=node.files)
+    for child in node.dirs:
+        child_rel = f"{rel}/{child.name}" if rel else child.name
+        if child_rel in package_dirs:
+            pruned.dirs.append(DirectoryNode(child.name))
+        else:
+            pruned.dirs.append(prune_tree(child, child_rel, package_dirs))
+    return pruned
+
+
+def build_packages(project: ProjectSpec, walk: ProjectWalk, depth: int) -> list[Package]:
+    """
+    Split a scanned project into per-package ProjectSpecs.
+    
+    Each file goes to its deepest enclosing package. A shard keeps the
+    dependency-graph edges that point into it (whoever the importer is), the
+    unresolved imports of its own files, and graph metrics over the imports
+    between its own files. Cross-package dependencies are
+    counted from relative imports that resolve into another package and
+    from bare imports of another workspace package's name.
+    """
+    nodes = find_package_dirs(walk)
+    package_dirs = sorted(nodes, key=len, reverse=True)
+    packages = {}
+    slugs = set()
+    for package_dir, node in sorted(nodes.items()):
+        shard = new_project_spec(project.root / package_dir)
+        shard.root = project.root  # file paths stay relative to the project root
+        shard.generated_at = project.generated_at
+        if package_dir:
+            shard.structure = generate_tree(node, depth)
+        else:
+            shard.structure = generate_tree(prune_tree(node, '', set(nodes) - {''}), depth)
+        # Flattening can collide ('a/b' vs 'a-b', a 'root' dir); suffix repeats.
+        # Compared case-insensitively for case-insensitive filesystems.
+        base = package_dir.replace('/', '-') if package_dir else 'root'
+        slug = base
+        suffix = 2
+        while slug.lower() in slugs:
+            slug = f"{base}~{suffix}"
+            suffix += 1
+        slugs.add(slug.lower())
+        packages[package_dir] = Package(package_dir, shard, slug)
+    by_name = {p.project.name: p.dir for p in packages.values() if p.dir}
+    
+    owner = {}
+    for file in project.files:
+        owner[file.relative_path] = package_of(file.relative_path, package_dirs)
+        packages[owner[file.relative_path]].project.files.append(file)
+    for file in project.skipped_files:
+        packages[package_of(file.relative_path, package_dirs)].project.skipped_files.append(file)
+    for importer, modules in project.unresolved_imports.items():
+        packages[owner.get(importer, '')].project.unresolved_imports[importer] = modules
+    
+    def depend(importer: str, target_dir: str):
+        source = packages[owner.get(importer, '')]
+        if target_dir != source.dir:
+            source.depends_on[target_dir] = source.depends_on.get(target_dir, 0) + 1
+    
+    for target, importers in project.internal_deps.items():
+        target_dir = owner.get(target, package_of(target, package_dirs))
+        packages[target_dir].project.internal_deps[target] = importers
+        for importer in importers:
+            depend(importer, target_dir)
+    for file in project.files:
+        for imp in file.imports:
+            if not imp.is_relative and package_name_of(imp.module) in by_name:
+                depend(file.relative_path, by_name[package_name_of(imp.module)])
+    
+    for package in packages.values():
+        shard = package.project
+        own_edges = {}
+        for target, importers in shard.internal_deps.items():
+            own = [i for i in importers if owner.get(i) == package.dir]
+            if own:
+                own_edges[target] = own
+        shard.graph = analyze_dependency_graph(own_edges, shard.files)
+        collect_routes_and_todos(shard)
+    return list(packages.values())
+
+
+def format_package_links(package: Package, packages: dict[str, Package], index_name: str) -> list[str]:
+    """Workspace section appended to a shard: what it uses, what uses it."""
+    used_by = sorted(p.dir for p in packages.values() if package.dir in p.depends_on)
+    lines = ["## Workspace", "", f"Index: [{index_name}](../{index_name})", ""]
+    if package.depends_on:
+        lines.append("Uses:")
+        for dep_dir, count in sorted(package.depends_on.items()):
+            dep = packages[dep_dir]
+            lines.append(f"- [{dep.project.name}]({dep.slug}.md) ({count} imports)")
+        lines.append("")
+    if used_by:
+        lines.append("Used by:")
+        for user_dir in used_by:
+            user = packages[user_dir]
+            lines.append(f"- [{user.project.name}]({user.slug}.md) ({user.depends_on[package.dir]} imports)")
+        lines.append("")
+    return lines
+
+
+def generate_shard_index(project: ProjectSpec, packages: list[Package], shard_dir: str) -> str:
+    """Root index for --shards: one line per package and the cross-package dependencies."""
+    total_lines = sum(f.line_count for f in project.files)
+    lines = [
+        f"# {project.name} (workspace index)",
+        "",
+        f"Generated: {project.generated_at}",
+    ]
+    if project.description:
+        lines.extend(["", project.description])
+    lines.extend([
+        "",
+        "## Stats",
+        "",
+        f"Packages: {len(packages)} | Files: {len(project.files)} | Lines: {total_lines:,} | Routes: {len(project.all_routes)}",
+        "",
+        "## Packages",
+        "",
+    ])
+    for package in packages:
+        shard = package.project
+        shard_lines = sum(f.line_count for f in shard.files)
+        desc = f" - {shard.description}" if shard.description else ""
+        lines.append(
+            f"- [{shard.name}]({shard_dir}/{package.slug}.md) (`{package.dir or '.'}/`): "
+            f"{len(shard.files)} files, {shard_lines:,} lines, {len(shard.all_routes)} routes{desc}"
+        )
+    lines.append("")
+    
+    names = {p.dir: p.project.name for p in packages}
+    dependent = [p for p in packages if p.depends_on]
+    if dependent:
+        lines.extend(["## Cross-Package Dependencies", "", "Package -> packages it imports (import count):", ""])
+        for package in dependent:
+            deps = ", ".join(f"{names[d]} ({n})" for d, n in sorted(package.depends_on.items()))
+            lines.append(f"- {package.project.name} -> {deps}")
         lines.append("")
     
     return '\n'.join(lines)
 
 
+def shard_index_dict(packages: list[Package], shard_dir: str) -> dict:
+    """Machine-readable shard index (written with --json); each shard's JSON loads with load_spec_json()."""
+    return {
+        'shard_index_format': SPEC_JSON_FORMAT,
+        'packages': [
+            {
+                'name': p.project.name,
+                'dir': p.dir,
+                'spec': f"{shard_dir}/{p.slug}.md",
+                'json': f"{shard_dir}/{p.slug}.json",
+                'files': len(p.project.files),
+                'depends_on': {d: n for d, n in sorted(p.depends_on.items())},
+            }
+            for p in packages
+        ],
+    }
+
+
+def write_shards(
+    project: ProjectSpec,
+    walk: ProjectWalk,
+    output_path: Path,
+    verbosity: Verbosity,
+    depth: int,
+    json_path: Optional[Path] = None,
+    token_budget: Optional[int] = None
+) -> list[Package]:
+    """
+    Write one spec per package into <output stem>/ next to output_path, and
+    the index to output_path itself (plus JSON for each when json_path is set).
+    """
+    packages = build_packages(project, walk, depth)
+    by_dir = {p.dir: p for p in packages}
+    shard_dir = output_path.with_suffix('')
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    counter = TokenCounter() if token_budget else None
+    
+    for package in packages:
+        # The Workspace links are appended after packing, so they count against the budget
+        links = '\n' + '\n'.join(format_package_links(package, by_dir, output_path.name))
+        reserve = counter.measure(links) if counter else 0
+        content, _ = render_spec(package.project, verbosity, token_budget, counter, reserve)
+        write_output(shard_dir / f"{package.slug}.md", content + links)
+        if json_path:
+            write_output(shard_dir / f"{package.slug}.json", dump_spec_json(package.project))
+    
+    write_output(output_path, generate_shard_index(project, packages, shard_dir.name))
+    if json_path:
+        write_output(json_path, dumps_compact(shard_index_dict(packages, shard_dir.name)))
+    return packages
+
+
 # =============================================================================
 # Main
 # =============================================================================
 
-def scan_project(root: Path, ignore_patterns: set, include_snippets: bool, max_snippet_lines: int) -> list[FileInfo]:
-    """Scan project and extract info from all code files."""
-    files = []
-    
-    for file_path in root.rglob('*'):
-        if file_path.is_file():
-            # Skip ignored directories
-            if any(p in file_path.parts for p in ignore_patterns):
-                continue
-            # Skip ignored files
-            if file_path.name in IGNORE_FILES:
+def new_project_spec(root: Path) -> ProjectSpec:
+    """ProjectSpec with package.json metadata filled in."""
+    pkg = parse_package_json(root)
+    return ProjectSpec(
+        root=root,
+        name=pkg.get('name') or root.name,
+        description=pkg.get('description', ''),
+        scripts=pkg.get('scripts', {}),
+        dependencies=pkg.get('dependencies', []),
+        dev_dependencies=pkg.get('devDependencies', []),
+        generated_at=datetime.now().strftime("%Y-%m-%d %H:%M")
+    )
+
+
+def assign_scanned_files(project: ProjectSpec, scanned: list[FileInfo]):
+    """Split scan results into parsed files and the ones the guard rails skipped."""
+    project.files = [f for f in scanned if not f.skipped]
+    project.skipped_files = [f for f in scanned if f.skipped]
+
+
+def collect_routes_and_todos(project: ProjectSpec):
+    """Collect routes and TODOs from project.files (deduplicating routes)."""
+    seen_routes = set()
+    for file in project.files:
+        for route in file.routes:
+            route_key = f"{route.method} {route.path}"
+            if route_key not in seen_routes:
+                seen_routes.add(route_key)
+                project.all_routes.append(route)
+        for todo in file.todos:
+            project.all_todos.append((todo, file.relative_path))
+
+
+def write_output(output_path: Path, content: str):
+    """Replace output_path atomically so readers never see a partial spec."""
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    tmp_path.write_text(content, encoding='utf-8')
+    os.replace(tmp_path, output_path)
+
+
+def extract_documented_file(task: tuple) -> Optional[FileInfo]:
+    """
+    Extract one file, keeping it only if it has something to document.
+    
+    Runs inside worker processes for --jobs, so only documented files are
+    sent back to the parent.
+    
+    Args:
+        task: (file_path, root, include_snippet, max_snippet_lines, parser, limits)
+    """
+    info = extract_file_info(*task)
+    # Skip files with no meaningful content to document
+    # (must have functions, classes, interfaces, or routes - not just exports/imports),
+    # but keep skipped files so they can be listed
+    if info and (info.skipped or info.functions or info.classes or info.interfaces or info.routes):
+        return info
+    return None
+
+
+def scan_project(
+    root: Path,
+    ignore_patterns: set,
+    include_snippets: bool,
+    max_snippet_lines: int,
+    parser: str = DEFAULT_PARSER,
+    walk: Optional[ProjectWalk] = None,
+    jobs: int = 1,
+    cache: Optional[ParseCache] = None,
+    limits: Optional[FileLimits] = None,
+    profiler: Optional[SpecProfiler] = None
+) -> list[FileInfo]:
+    """
+    Scan project and extract info from all code files.
+    
+    With jobs > 1 (0 = CPU count) files are parsed across a process pool;
+    results are sorted by path either way, so the spec is the same. With a
+    cache, only files that changed since the cached run are parsed.
+    """
+    walk = walk or walk_project(root, ignore_patterns)
+    cached = []
+    tasks = []
+    for file_path in walk.code_files:
+        if cache:
+            hit, info = cache.lookup(file_path, root)
+            if hit:
+                cached.append(info)
                 continue
-            if file_path.suffix in CODE_EXTENSIONS:
-                info = extract_file_info(file_path, root, include_snippets, max_snippet_lines)
-                if info:
-                    # Skip files with no meaningful content to document
-                    # (must have functions, classes, interfaces, or routes - not just exports/imports)
-                    has_meaningful_content = (
-                        info.functions or 
-                        info.classes or 
-                        info.interfaces or 
-                        info.routes
-                    )
-                    if has_meaningful_content:
-                        files.append(info)
+        tasks.append((file_path, root, include_snippets, max_snippet_lines, parser, limits))
+    
+    workers = min(jobs or os.cpu_count() or 1, len(tasks))
+    if profiler:
+        results = [profiler.extract(task) for task in tasks]
+    elif workers > 1:
+        # Batch tasks so per-file IPC doesn't eat the gain on small files
+        chunksize = max(1, len(tasks) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(extract_documented_file, tasks, chunksize=chunksize))
+    else:
+        results = [extract_documented_file(task) for task in tasks]
+    
+    if cache:
+        for task, info in zip(tasks, results):
+            cache.store(task[0], root, info)
     
+    files = [info for info in cached + results if info]
     return sorted(files, key=lambda x: x.relative_path)
 
 
@@ -1190,6 +3270,101 @@ def main():
         help="Output verbosity level"
     )
     parser.add_argument("--max-snippet-lines", type=int, default=40, help="Max lines per code snippet")
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        metavar="N",
+        help="Fit the spec into N tokens, keeping the highest-value sections and files "
+             f"(counted with tiktoken {TOKEN_ENCODING} if installed; --verbosity caps the detail)"
+    )
+    parser.add_argument(
+        "--parser",
+        choices=sorted(PARSERS),
+        default=DEFAULT_PARSER,
+        help="Source scanner: single-pass lexer, or the per-pattern regex scan (default: %(default)s)"
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="Parse files across N worker processes (0 = CPU count, default: 1)"
+    )
+    parser.add_argument(
+        "--json",
+        nargs="?",
+        const="",
+        metavar="PATH",
+        help="Also write the spec as compact JSON (default: the output path with .json); "
+             "load it with load_spec_json() or query it with spec_query.py"
+    )
+    parser.add_argument(
+        "--shards",
+        action="store_true",
+        help="Monorepos: write one spec per package (directories with a package.json) into "
+             "<output stem>/, and an index of the packages and their cross-package imports to the output"
+    )
+    parser.add_argument(
+        "--max-file-size",
+        type=int,
+        default=MAX_FILE_KB,
+        metavar="KB",
+        help="Skip files larger than this (0 = no limit, default: %(default)s)"
+    )
+    parser.add_argument(
+        "--file-timeout",
+        type=float,
+        default=FILE_TIME_BUDGET,
+        metavar="SECONDS",
+        help="Give up on a file after this long (0 = no limit, default: %(default)s; Unix only)"
+    )
+    parser.add_argument(
+        "--include-minified",
+        action="store_true",
+        help="Parse files that look minified instead of skipping them"
+    )
+    parser.add_argument(
+        "--cache",
+        nargs="?",
+        const=DEFAULT_CACHE_DIR,
+        metavar="DIR",
+        help=f"Reuse per-file results from unchanged files (default dir: <path>/{DEFAULT_CACHE_DIR})"
+    )
+    parser.add_argument(
+        "--since",
+        metavar="REV",
+        help="Only re-extract files git reports changed since REV, merging into the "
+             f"previous run's <output>{SpecState.SUFFIX} (written on first use)"
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        type=int,
+        const=15,
+        metavar="N",
+        help="Report time per phase, the N slowest files (default 15), time per pattern, and peak memory"
+    )
+    parser.add_argument(
+        "--profile-json",
+        metavar="PATH",
+        help="Also write the --profile report as JSON (implies --profile)"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and regenerate the output when code files change"
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=0.5,
+        metavar="SECONDS",
+        help="Polling interval for --watch without watchdog or with --watch-poll (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--watch-poll",
+        action="store_true",
+        help="Poll in --watch even when watchdog is installed (e.g. network file systems without change events)"
+    )
     
     args = parser.parse_args()
     
@@ -1202,48 +3377,180 @@ def main():
     verbosity = Verbosity(args.verbosity)
     include_snippets = verbosity == Verbosity.FULL
     
-    print(f"Scanning {root} (verbosity: {args.verbosity})...")
+    if args.watch and args.stdout:
+        print("Error: --watch rewrites the output file; it can't be combined with --stdout")
+        return 1
+    if args.since and args.cache:
+        print("Error: --since already skips unchanged files; drop --cache")
+        return 1
+    if args.shards and (args.stdout or args.watch):
+        print("Error: --shards writes a directory of specs; it can't be combined with --stdout or --watch")
+        return 1
+    if args.token_budget is not None and args.token_budget <= 0:
+        print("Error: --token-budget must be a positive number of tokens")
+        return 1
     
-    # Parse package.json
-    pkg = parse_package_json(root)
+    print(f"Scanning {root} (verbosity: {args.verbosity})...")
     
-    # Build project spec
-    project = ProjectSpec(
-        root=root,
-        name=pkg.get('name') or root.name,
-        description=pkg.get('description', ''),
-        scripts=pkg.get('scripts', {}),
-        dependencies=pkg.get('dependencies', []),
-        dev_dependencies=pkg.get('devDependencies', []),
-        generated_at=datetime.now().strftime("%Y-%m-%d %H:%M")
+    project = new_project_spec(root)
+    
+    profiler = None
+    if args.profile or args.profile_json:
+        profiler = SpecProfiler(args.profile or 15)
+        profiler.install()
+        if args.jobs != 1:
+            print("--profile parses serially so time is attributable to files and patterns")
+    
+    def phase(name: str):
+        return profiler.phase(name) if profiler else contextlib.nullcontext()
+    
+    with phase('walk'):
+        walk = walk_project(root, ignore_patterns)
+    print(f"Walked {len(walk.code_files)} code files, skipped {walk.skipped_entries} ignored entries "
+          f"({walk.pruned_dirs} directories pruned)")
+    # Stat before parsing so edits made during the first scan are picked up
+    stats = SpecWatcher.stat_files(root, walk) if args.watch else None
+    
+    with phase('tree'):
+        project.structure = generate_tree(walk.root, args.depth)
+    limits = FileLimits(
+        max_bytes=args.max_file_size * 1024,
+        time_budget=args.file_timeout,
+        skip_minified=not args.include_minified
     )
-    
-    project.structure = generate_tree(root, ignore_patterns, args.depth)
-    project.files = scan_project(root, ignore_patterns, include_snippets, args.max_snippet_lines)
-    project.internal_deps = build_dependency_graph(project.files)
-    
-    # Collect routes and TODOs (deduplicate routes)
-    seen_routes = set()
-    for file in project.files:
-        for route in file.routes:
-            route_key = f"{route.method} {route.path}"
-            if route_key not in seen_routes:
-                seen_routes.add(route_key)
-                project.all_routes.append(route)
-        for todo in file.todos:
-            project.all_todos.append((todo, file.relative_path))
+    extract_options = {
+        'include_snippets': include_snippets,
+        'max_snippet_lines': args.max_snippet_lines,
+        'parser': args.parser,
+        'limits': asdict(limits),
+    }
+    cache = None
+    if args.cache:
+        with phase('cache'):
+            cache = ParseCache(root / args.cache / ParseCache.FILENAME, extract_options)
+    elif args.since:
+        with phase('git'):
+            cache = SpecState.load(root / args.output, extract_options, root, args.since)
+            if cache is None:
+                return 1
+            changed = cache.changed
+        if not cache.entries:
+            print(f"No usable {cache.path.name} (first run or options changed); extracting everything")
+    
+    with phase('extract'):
+        scanned = scan_project(
+            root, ignore_patterns, include_snippets, args.max_snippet_lines, args.parser, walk, args.jobs, cache,
+            limits, profiler
+        )
+    assign_scanned_files(project, scanned)
+    if cache:
+        with phase('cache'):
+            if args.since:
+                cache.save(root)
+            else:
+                cache.save()
+    if args.since:
+        print(f"Since {args.since}: {len(changed)} changed paths, {cache.hits} files reused, "
+              f"{cache.misses} parsed ({cache.path})")
+    elif cache:
+        print(f"Cache: {cache.hits} files reused, {cache.misses} parsed ({cache.path})")
+    with phase('graph'):
+        resolver = ImportResolver.from_files(root, walk.code_files)
+        project.internal_deps, project.unresolved_imports = build_dependency_graph(project.files, resolver)
+        project.graph = analyze_dependency_graph(project.internal_deps, project.files)
+        collect_routes_and_todos(project)
     
     print(f"Found {len(project.files)} files, {len(project.all_routes)} routes, {len(project.all_todos)} TODOs")
-    
-    spec_content = generate_spec(project, verbosity)
-    
-    if args.stdout:
-        print(spec_content)
-    else:
+    if project.graph.cycles:
+        print(f"Cycles: {len(project.graph.cycles)} import cycles, largest {len(project.graph.cycles[0])} files")
+    if project.unresolved_imports:
+        count = sum(len(modules) for modules in project.unresolved_imports.values())
+        print(f"Unresolved: {count} relative imports in {len(project.unresolved_imports)} files")
+    if project.skipped_files:
+        print(f"Skipped {len(project.skipped_files)} files (listed in the spec):")
+        for file in project.skipped_files[:10]:
+            print(f"  {file.relative_path}: {file.skipped}")
+        if len(project.skipped_files) > 10:
+            print(f"  ... +{len(project.skipped_files) - 10} more")
+    
+    json_path = None
+    if args.json is not None:
+        json_path = root / (args.json or Path(args.output).with_suffix('.json'))
+    
+    if args.shards:
         output_path = root / args.output
-        output_path.write_text(spec_content, encoding='utf-8')
-        print(f"Generated: {output_path}")
-        print(f"Size: {len(spec_content):,} chars (~{len(spec_content)//4:,} tokens)")
+        with phase('render'):
+            packages = write_shards(
+                project, walk, output_path, verbosity, args.depth, json_path, args.token_budget
+            )
+        print(f"Generated: {output_path} (index) and {len(packages)} shards in {output_path.with_suffix('')}")
+        for package in packages:
+            deps = f", uses {len(package.depends_on)} packages" if package.depends_on else ""
+            print(f"  {package.slug}.md: {package.project.name} ({len(package.project.files)} files{deps})")
+        if json_path:
+            print(f"Generated: {json_path} (shard index) and one .json per shard")
+    else:
+        counter = TokenCounter() if args.token_budget else None
+        with phase('render'):
+            spec_content, packed = render_spec(project, verbosity, args.token_budget, counter)
+        
+        if args.stdout:
+            print(spec_content)
+        else:
+            output_path = root / args.output
+            with phase('write'):
+                write_output(output_path, spec_content)
+            print(f"Generated: {output_path}")
+            if packed:
+                print(f"Size: {len(spec_content):,} chars ({packed.tokens:,}/{packed.budget:,} tokens, {counter.name})")
+            else:
+                print(f"Size: {len(spec_content):,} chars (~{len(spec_content)//4:,} tokens)")
+        if packed:
+            detailed = sum(1 for level in packed.levels.values() if level != Verbosity.MINIMAL)
+            print(f"Packed: {len(packed.levels)}/{len(project.files)} files ({detailed} beyond minimal)"
+                  + (f", omitted {', '.join(packed.omitted)}" if packed.omitted else ""))
+            if packed.tokens > packed.budget:
+                print(f"Warning: the header and stats alone exceed --token-budget {packed.budget:,}")
+        
+        if json_path:
+            with phase('json'):
+                write_output(json_path, dump_spec_json(project))
+            print(f"Generated: {json_path}")
+    
+    if profiler:
+        report = profiler.report()
+        SpecProfiler.print_report(report)
+        if args.profile_json:
+            report = {
+                'generated_at': datetime.now().isoformat(timespec='seconds'),
+                'python': sys.version.split()[0],
+                'root': str(root),
+                'revision': git_head(root),
+                'options': {
+                    **extract_options,
+                    'verbosity': args.verbosity,
+                    'token_budget': args.token_budget,
+                    'cache': bool(cache),
+                },
+                'files_scanned': len(walk.code_files),
+                **report,
+            }
+            with open(args.profile_json, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"\nProfile written to: {args.profile_json}")
+    
+    if args.watch:
+        watcher = SpecWatcher(
+            root, ignore_patterns, root / args.output, verbosity, args.depth,
+            (include_snippets, args.max_snippet_lines, args.parser, limits),
+            scanned, resolver, project.internal_deps, project.unresolved_imports, stats,
+            interval=args.watch_interval,
+            json_path=json_path,
+            token_budget=args.token_budget,
+            walk=walk,
+            poll=args.watch_poll
+        )
+        watcher.run()
     
     return 0
 
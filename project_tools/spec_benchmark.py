@@ -0,0 +1,642 @@
+#!/usr/bin/env python3
+"""
+SPEC Benchmark
+
+Times generate_spec on synthetic JS/TS project trees (or a real one) so
+scanner changes can be judged on data.
+
+Synthetic corpora are generated deterministically at each --sizes entry:
+routes, services, models, utils and components with JSDoc, interfaces,
+express routes and relative imports, plus adversarial files (a huge
+interface, deeply nested directories and literals, a minified bundle, a
+large generated module) and a big ignored node_modules tree.
+
+Benchmarks:
+- parsers: extract_file_info per --parser (lexer vs regex), best of N runs,
+  with per-file differences between the two
+- pipeline: walk_project, scan_project, build_dependency_graph,
+  analyze_dependency_graph and generate_spec in isolation, then the
+  generate_spec CLI end to end
+
+Usage:
+    python spec_benchmark.py
+    python spec_benchmark.py --sizes 100 1000 --repeat 5 --json spec_bench.json
+    python spec_benchmark.py --corpus-dir /tmp/spec_corpora -b pipeline
+    python spec_benchmark.py --json new.json --compare old.json
+    python spec_benchmark.py ../some-project -b parsers --show-diffs 20
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import posixpath
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+
+from generate_spec import (
+    DEFAULT_IGNORE, DEFAULT_PARSER, PARSERS, ImportResolver, Verbosity,
+    analyze_dependency_graph, assign_scanned_files, build_dependency_graph, collect_routes_and_todos,
+    extract_file_info, generate_spec, generate_tree, new_project_spec, scan_project, walk_project,
+)
+
+GENERATE_SPEC = Path(__file__).resolve().parent / "generate_spec.py"
+
+
+# =============================================================================
+# Synthetic Corpus
+# =============================================================================
+
+CORPUS_VERSION = 1
+CORPUS_MANIFEST = ".corpus.json"
+
+# (directory, share of files, extension)
+CORPUS_KINDS = [
+    ("routes", 0.15, ".ts"),
+    ("services", 0.25, ".ts"),
+    ("models", 0.20, ".ts"),
+    ("utils", 0.25, ".ts"),
+    ("components", 0.15, ".js"),
+]
+FILES_PER_DIR = 40
+
+NOUNS = ["Document", "Assembly", "Part", "User", "Session", "Thumbnail", "Export", "Table", "Record", "Token"]
+VERBS = ["fetch", "load", "sync", "build", "resolve", "render", "export", "parse", "validate", "update"]
+TYPES = ["string", "number", "boolean", "string[]", "Record<string, unknown>", "Date", "number | null"]
+
+
+def import_specifier(rng: random.Random, importer: str, target: str) -> str:
+    """Relative specifier for target, in the mix of styles real projects use."""
+    stem, ext = posixpath.splitext(target)
+    style = rng.random()
+    if style < 0.6:
+        path = stem
+    elif style < 0.9:
+        path = stem + ".js"  # ESM style, resolves to the .ts source
+    else:
+        path = target
+    spec = posixpath.relpath(path, posixpath.dirname(importer))
+    return spec if spec.startswith(".") else "./" + spec
+
+
+def make_imports(rng: random.Random, importer: str, earlier: list) -> list:
+    lines = []
+    for target, name in rng.sample(earlier, min(len(earlier), rng.randint(1, 4))):
+        lines.append(f"import {{ {name} }} from '{import_specifier(rng, importer, target)}';")
+    if rng.random() < 0.02:
+        lines.append(f"import {{ removed }} from './missing_{rng.randint(0, 99)}';")
+    if rng.random() < 0.5:
+        lines.append("import express from 'express';")
+    return lines
+
+
+def jsdoc(summary: str, params: list = (), returns: str = "", indent: str = "") -> list:
+    lines = [f"{indent}/**", f"{indent} * {summary}"]
+    for name, type_ in params:
+        lines.append(f"{indent} * @param {{{type_}}} {name} - The {name}")
+    if returns:
+        lines.append(f"{indent} * @returns {{{returns}}} Result")
+    lines.append(f"{indent} */")
+    return lines
+
+
+def make_route(rng: random.Random, i: int) -> tuple:
+    noun = rng.choice(NOUNS).lower()
+    name = f"{noun}Router{i}"
+    lines = ["", "const router = express.Router();", ""]
+    for method in rng.sample(["get", "post", "put", "delete", "patch"], rng.randint(2, 4)):
+        path = f"/api/{noun}s{i}" + ("/:id" if method != "post" else "")
+        lines += jsdoc(f"{method.upper()} {path}")
+        lines += [
+            f"router.{method}('{path}', async (req, res) => {{",
+            "  // Braces in strings shouldn't confuse the scanner: '}{'",
+            f"  res.json({{ ok: true, route: `{path}` }});",
+            "});",
+            "",
+        ]
+    lines += jsdoc(f"Mount the {noun} routes.", [("app", "Express")], "void")
+    lines += [f"export function {name}(app: Express): void {{", "  app.use('/', router);", "}"]
+    return name, lines
+
+
+def make_service(rng: random.Random, i: int) -> tuple:
+    noun = rng.choice(NOUNS)
+    name = f"{noun}Service{i}"
+    lines = [""]
+    lines += jsdoc(f"Options for {name}.")
+    lines += [f"export interface {name}Options {{", "  retries: number;", "  timeoutMs?: number;", "}", ""]
+    lines += jsdoc(f"Coordinates {noun.lower()} lookups and caching.")
+    lines += [
+        f"export class {name} {{",
+        f"  private cache: Map<string, {noun}> = new Map();",
+        "  public readonly baseUrl: string;",
+        "",
+        f"  constructor(private readonly client: ApiClient, options: {name}Options) {{",
+        "    this.baseUrl = '/api';",
+        "  }",
+    ]
+    for verb in rng.sample(VERBS, rng.randint(2, 6)):
+        ret = rng.choice(TYPES)
+        lines += [""] + jsdoc(f"{verb.capitalize()} a {noun.lower()}.", [("id", "string")], f"Promise<{ret}>", "  ")
+        lines += [
+            f"  async {verb}{noun}(id: string, force = false): Promise<{ret}> {{",
+            "    if (force) {",
+            "      this.cache.delete(id);",
+            "    }",
+        ]
+        if rng.random() < 0.1:
+            lines.append(f"    // TODO: retry {verb} on 429")
+        lines += [f"    return this.client.get(`${{this.baseUrl}}/{noun.lower()}s/${{id}}`);", "  }"]
+    lines.append("}")
+    return name, lines
+
+
+def make_model(rng: random.Random, i: int) -> tuple:
+    noun = rng.choice(NOUNS)
+    name = f"{noun}Model{i}"
+    lines = [""] + jsdoc(f"{noun} as returned by the API.")
+    lines.append(f"export interface {name} {{")
+    for k in range(rng.randint(4, 15)):
+        lines.append(f"  field{k}{'?' if k % 3 == 0 else ''}: {rng.choice(TYPES)};")
+    lines += ["}", ""]
+    lines += jsdoc(f"Lifecycle state of a {noun.lower()}.")
+    lines += [f"export type {name}State = 'draft' | 'released' | 'obsolete';", ""]
+    return name, lines
+
+
+def make_util(rng: random.Random, i: int) -> tuple:
+    verb = rng.choice(VERBS)
+    name = f"{verb}Value{i}"
+    lines = [""]
+    lines += jsdoc(f"{verb.capitalize()} a raw value.", [("value", "string"), ("limit", "number")], "string")
+    lines += [
+        f"export function {name}(value: string, limit: number = 10): string {{",
+        "  const pattern = /[{}]+/g; // regex literal with braces",
+        "  return value.replace(pattern, '').slice(0, limit);",
+        "}",
+        "",
+    ]
+    lines += jsdoc("Arrow helper.", returns="number")
+    lines += [f"export const {verb}Count{i} = (items: string[]): number => items.length;", ""]
+    lines += [f"export const DEFAULT_LIMIT_{i} = 10;", ""]
+    return name, lines
+
+
+def make_component(rng: random.Random, i: int) -> tuple:
+    noun = rng.choice(NOUNS)
+    name = f"render{noun}{i}"
+    lines = [""]
+    lines += jsdoc(f"Render the {noun.lower()} panel.", [("container", "HTMLElement"), ("data", "Object")], "void")
+    lines += [
+        f"export function {name}(container, data) {{",
+        "  container.innerHTML = `<div class=\"panel\">${data.name}</div>`;",
+        "}",
+        "",
+    ]
+    lines += jsdoc(f"Controller for the {noun.lower()} view.")
+    lines += [
+        f"export class {noun}Controller{i} {{",
+        "  constructor(router) {",
+        "    this.router = router;",
+        "  }",
+        "",
+        "  async show(id) {",
+        "    return this.router.navigate(`/items/${id}`);",
+        "  }",
+        "}",
+    ]
+    return name, lines
+
+
+MAKERS = {
+    "routes": make_route,
+    "services": make_service,
+    "models": make_model,
+    "utils": make_util,
+    "components": make_component,
+}
+
+
+def write_adversarial(root: Path, rng: random.Random):
+    """Files that stress the scanner or the guard rails."""
+    # One interface with thousands of members, plus a single-line union
+    lines = jsdoc("Generated API schema.") + ["export interface ApiSchema {"]
+    lines += [f"  field{k}?: {rng.choice(TYPES)};" for k in range(5000)] + ["}", ""]
+    lines.append("export type FieldName = " + " | ".join(f"'field{k}'" for k in range(2000)) + ";")
+    write_file(root / "src/generated/api-schema.ts", lines)
+
+    # A large but ordinary generated module
+    lines = []
+    for k in range(3000):
+        lines += jsdoc(f"Generated accessor {k}.", [("input", "string")], "string")
+        lines += [f"export function accessor{k}(input: string): string {{", "  return input;", "}", ""]
+    write_file(root / "src/generated/accessors.ts", lines)
+
+    # Deep directories and deeply nested literals/blocks
+    deep = root / "src/deep" / "/".join(f"level_{k}" for k in range(25))
+    lines = ["export const config = " + "{ a: " * 300 + "1" + " }" * 300 + ";", ""]
+    lines += jsdoc("Deeply nested control flow.", [("n", "number")], "number")
+    lines += ["export function nested(n: number): number {"]
+    lines += ["  " * k + "if (n > 0) {" for k in range(1, 60)]
+    lines += ["  " * k + "}" for k in range(59, 0, -1)]
+    lines += ["  return n;", "}"]
+    write_file(deep / "leaf.ts", lines)
+
+    # Minified bundle outside any ignored directory (guard rails should skip it)
+    parts = [f"export const m{k}=function(a){{return a+{k}}};var v{k}={{x:{k}}};" for k in range(8000)]
+    write_file(root / "public/js/bundle.min.js", ["".join(parts)])
+
+
+def write_node_modules(root: Path, rng: random.Random, files: int):
+    """A big dependency tree that walk_project should prune without reading."""
+    for k in range(files):
+        package = root / "node_modules" / f"pkg-{k // 20}" / "lib"
+        write_file(package / f"module_{k}.js", [
+            f"export function dep{k}(a, b) {{ return a + b + {rng.randint(0, 99)}; }}",
+            f"export class Dep{k} {{ run() {{ return {k}; }} }}",
+        ])
+
+
+def write_file(path: Path, lines: list):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def generate_corpus(root: Path, files: int, seed: int = 0) -> dict:
+    """
+    Write a synthetic project of roughly `files` code files under root.
+
+    Returns:
+        dict: The manifest written to root/.corpus.json
+    """
+    rng = random.Random(seed)
+    plan = []
+    for kind, share, ext in CORPUS_KINDS:
+        for i in range(max(1, round(files * share))):
+            plan.append((kind, i, f"src/{kind}/group_{i // FILES_PER_DIR}/{kind[:-1]}_{i}{ext}"))
+    rng.shuffle(plan)
+
+    exported = []  # (relative path, exported name) of files written so far
+    for kind, i, relative in plan:
+        name, body = MAKERS[kind](rng, i)
+        lines = [f"// {relative}"]
+        if exported:
+            lines += make_imports(rng, relative, exported)
+        write_file(root / relative, lines + body)
+        exported.append((relative, name))
+
+    entry = ["// Application entry point"]
+    entry += make_imports(rng, "src/index.ts", exported)
+    entry += jsdoc("Start the server.", [("port", "number")], "Promise<void>")
+    entry += ["export async function main(port: number = 3000): Promise<void> {", "  express().listen(port);", "}"]
+    write_file(root / "src/index.ts", entry)
+
+    write_adversarial(root, rng)
+    write_node_modules(root, rng, max(200, files))
+    write_file(root / "package.json", [json.dumps({
+        "name": f"synthetic-{files}",
+        "description": "Synthetic corpus for spec_benchmark.py",
+        "scripts": {"start": "node dist/index.js"},
+        "dependencies": {"express": "^4.18.0"},
+    }, indent=2)])
+
+    manifest = {"version": CORPUS_VERSION, "files": files, "seed": seed, "generated_files": len(plan) + 5}
+    (root / CORPUS_MANIFEST).write_text(json.dumps(manifest), encoding="utf-8")
+    return manifest
+
+
+def prepare_corpus(base_dir: Path, files: int, seed: int) -> Path:
+    """Generate (or reuse a matching, previously generated) corpus under base_dir."""
+    root = base_dir / f"corpus_{files}"
+    manifest_path = root / CORPUS_MANIFEST
+    expected = {"version": CORPUS_VERSION, "files": files, "seed": seed}
+
+    if root.exists():
+        if not manifest_path.exists():
+            raise ValueError(f"{root} exists and wasn't generated by spec_benchmark.py")
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if all(manifest.get(k) == v for k, v in expected.items()):
+            return root
+        shutil.rmtree(root)
+
+    start = time.perf_counter()
+    manifest = generate_corpus(root, files, seed)
+    print(f"Generated {manifest['generated_files']:,} files in {root} ({time.perf_counter() - start:.1f}s)")
+    return root
+
+
+# =============================================================================
+# Timing
+# =============================================================================
+
+def collect_files(root: Path, ignore_patterns: set) -> list:
+    """Code files scan_project would consider."""
+    return walk_project(root, ignore_patterns).code_files
+
+
+def time_call(fn, repeat: int) -> float:
+    """Return the best wall time of `repeat` calls, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def time_parser(files: list, root: Path, parser: str, repeat: int) -> tuple:
+    """Return (best wall time in seconds, extracted infos) for one parser."""
+    best = float('inf')
+    infos = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        infos = [extract_file_info(f, root, True, 40, parser) for f in files]
+        best = min(best, time.perf_counter() - start)
+    return best, infos
+
+
+def bench_parsers(root: Path, ignore_patterns: set, repeat: int) -> dict:
+    """Time every parser over the same files and diff their results per file."""
+    files = collect_files(root, ignore_patterns)
+    total_bytes = sum(f.stat().st_size for f in files)
+    # Warm the OS file cache so the first parser isn't penalized
+    for f in files:
+        f.read_bytes()
+
+    results = []
+    extracted = {}
+    for parser in PARSERS:
+        seconds, infos = time_parser(files, root, parser, repeat)
+        extracted[parser] = infos
+        results.append({
+            "benchmark": "parsers",
+            "parser": parser,
+            "files": len(files),
+            "bytes": total_bytes,
+            "seconds": seconds,
+            "files_per_sec": len(files) / seconds if seconds else None,
+            "mb_per_sec": total_bytes / 1024 / 1024 / seconds if seconds else None,
+        })
+
+    # Per-file, per-field differences between the lexer and the regex path
+    diffs = []
+    for f, lexed, matched in zip(files, extracted['lexer'], extracted['regex']):
+        a = asdict(lexed) if lexed else {}
+        b = asdict(matched) if matched else {}
+        fields = [key for key in a if a.get(key) != b.get(key)]
+        if fields:
+            diffs.append({"file": str(f.relative_to(root)), "fields": fields})
+
+    return {"results": results, "diffs": diffs}
+
+
+def bench_pipeline(root: Path, ignore_patterns: set, repeat: int) -> dict:
+    """
+    Time each generate_spec stage on one tree, then the CLI end to end.
+
+    Stages reuse the previous stage's output so each is measured alone;
+    end_to_end runs generate_spec.py in a subprocess (interpreter start-up
+    and the output write included) at full verbosity with the default parser.
+    """
+    walk = walk_project(root, ignore_patterns)
+    code_files = walk.code_files
+    total_bytes = sum(f.stat().st_size for f in code_files)
+
+    def scan():
+        return scan_project(root, ignore_patterns, True, 40, DEFAULT_PARSER, walk)
+
+    project = new_project_spec(root)
+    project.structure = generate_tree(walk.root)
+    assign_scanned_files(project, scan())
+    resolver = ImportResolver.from_files(root, code_files)
+    project.internal_deps, project.unresolved_imports = build_dependency_graph(project.files, resolver)
+    project.graph = analyze_dependency_graph(project.internal_deps, project.files)
+    collect_routes_and_todos(project)
+    spec = generate_spec(project, Verbosity.FULL)
+
+    extra_ignores = sorted(ignore_patterns - DEFAULT_IGNORE)
+    with tempfile.TemporaryDirectory() as output_dir:
+        command = [sys.executable, str(GENERATE_SPEC), str(root), "-o", os.path.join(output_dir, "SPEC.md"), "-v", "full"]
+        if extra_ignores:
+            command += ["--ignore", *extra_ignores]
+
+        def end_to_end():
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+
+        stages = [
+            ("walk", lambda: walk_project(root, ignore_patterns), len(code_files)),
+            ("extract", scan, len(code_files)),
+            ("graph", lambda: build_dependency_graph(project.files, ImportResolver.from_files(root, code_files)),
+             len(project.files)),
+            ("analyze", lambda: analyze_dependency_graph(project.internal_deps, project.files), len(project.files)),
+            ("render", lambda: generate_spec(project, Verbosity.FULL), len(project.files)),
+            ("end_to_end", end_to_end, len(code_files)),
+        ]
+
+        results = []
+        for stage, fn, items in stages:
+            seconds = time_call(fn, repeat)
+            results.append({
+                "benchmark": "pipeline",
+                "stage": stage,
+                "items": items,
+                "seconds": seconds,
+                "items_per_sec": items / seconds if seconds else None,
+            })
+
+    summary = {
+        "code_files": len(code_files),
+        "bytes": total_bytes,
+        "pruned_dirs": walk.pruned_dirs,
+        "documented": len(project.files),
+        "skipped": len(project.skipped_files),
+        "edges": sum(len(importers) for importers in project.internal_deps.values()),
+        "unresolved": sum(len(modules) for modules in project.unresolved_imports.values()),
+        "routes": len(project.all_routes),
+        "spec_chars": len(spec),
+    }
+    return {"results": results, "summary": summary}
+
+
+# =============================================================================
+# Comparison
+# =============================================================================
+
+def result_key(result: dict) -> tuple:
+    """Identify the same measurement across reports."""
+    return (result["benchmark"], result["corpus"], result.get("stage") or result.get("parser"))
+
+
+def compare_reports(baseline: dict, report: dict):
+    """Print per-measurement speedup against a baseline report."""
+    old_results = {result_key(r): r for r in baseline.get("results", [])}
+    print(f"\nComparison with baseline ({baseline.get('revision') or 'unknown revision'}, "
+          f"{baseline.get('generated_at', '?')})")
+    print(f"  {'measurement':<40} {'before':>10} {'after':>10} {'speedup':>8}")
+
+    for r in report["results"]:
+        old = old_results.get(result_key(r))
+        if old is None:
+            continue
+        before, after = old["seconds"], r["seconds"]
+        name = " ".join(result_key(r))
+        print(
+            f"  {name:<40} {before * 1000:>8.1f}ms {after * 1000:>8.1f}ms "
+            f"{before / after if after else float('inf'):>7.2f}x"
+        )
+
+
+# =============================================================================
+# Main
+# =============================================================================
+
+def git_revision() -> str:
+    """Short commit hash of the checkout, with '+' if it has local changes."""
+    try:
+        cwd = os.path.dirname(os.path.abspath(__file__))
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=cwd, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=cwd, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        return revision + ("+" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_parsers(label: str, report: dict, show_diffs: int):
+    results = report["results"]
+    print(f"\nParsers: {label} ({results[0]['files']:,} files, {results[0]['bytes'] / 1024 / 1024:.1f} MiB)")
+    print(f"  {'parser':<8} {'time':>10} {'files/s':>10} {'MiB/s':>8}")
+    for r in results:
+        print(f"  {r['parser']:<8} {r['seconds']:>9.2f}s {r['files_per_sec']:>10,.0f} {r['mb_per_sec']:>8.2f}")
+
+    by_parser = {r['parser']: r['seconds'] for r in results}
+    if by_parser.get('lexer'):
+        print(f"  lexer speedup: {by_parser['regex'] / by_parser['lexer']:.2f}x")
+
+    diffs = report["diffs"]
+    print(f"\n{len(diffs)} files extract differently (lexer skips strings and comments; regex does not)")
+    for d in diffs[:show_diffs]:
+        print(f"  {d['file']}: {', '.join(d['fields'])}")
+    if len(diffs) > show_diffs:
+        print(f"  ... +{len(diffs) - show_diffs} more")
+
+
+def print_pipeline(label: str, report: dict, show_diffs: int):
+    s = report["summary"]
+    print(f"\nPipeline: {label} ({s['code_files']:,} code files, {s['bytes'] / 1024 / 1024:.1f} MiB, "
+          f"{s['pruned_dirs']} dirs pruned)")
+    print(f"  {s['documented']:,} documented, {s['skipped']} skipped, {s['edges']:,} import edges, "
+          f"{s['unresolved']} unresolved, {s['routes']:,} routes, {s['spec_chars']:,} spec chars")
+    print(f"  {'stage':<12} {'items':>8} {'time':>10} {'items/s':>10}")
+    for r in report["results"]:
+        print(f"  {r['stage']:<12} {r['items']:>8,} {r['seconds'] * 1000:>8.1f}ms {r['items_per_sec']:>10,.0f}")
+
+
+BENCHMARKS = {
+    "parsers": (bench_parsers, print_parsers),
+    "pipeline": (bench_pipeline, print_pipeline),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark generate_spec")
+    parser.add_argument("path", nargs="?", help="Benchmark this project tree instead of synthetic corpora")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="Synthetic corpus sizes")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus random seed")
+    parser.add_argument("--corpus-dir", metavar="DIR", help="Keep generated corpora here and reuse them")
+    parser.add_argument("--ignore", nargs="*", default=[], help="Additional dirs to ignore")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument(
+        "--benchmark", "-b",
+        choices=sorted(BENCHMARKS),
+        action="append",
+        help="Benchmark to run (repeatable; default: all)"
+    )
+    parser.add_argument("--show-diffs", type=int, default=10, help="Differing files to list")
+    parser.add_argument("--json", metavar="PATH", help="Also write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="Compare against a previous --json report")
+
+    args = parser.parse_args()
+    selected = args.benchmark or sorted(BENCHMARKS)
+    ignore_patterns = DEFAULT_IGNORE | set(args.ignore)
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.compare) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot read baseline '{args.compare}': {e}")
+            return 1
+
+    report = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "corpora": {},
+        "results": [],
+        "diffs": {},
+    }
+
+    with contextlib.ExitStack() as stack:
+        if args.path:
+            root = Path(args.path).resolve()
+            if not root.exists():
+                print(f"Error: Path '{root}' does not exist")
+                return 1
+            targets = [(root.name, lambda root=root: root)]
+        else:
+            base_dir = Path(args.corpus_dir) if args.corpus_dir else Path(stack.enter_context(tempfile.TemporaryDirectory()))
+            targets = [
+                (f"synthetic-{size}", lambda size=size: prepare_corpus(base_dir, size, args.seed))
+                for size in args.sizes
+            ]
+
+        for label, get_root in targets:
+            try:
+                root = get_root()
+            except ValueError as e:
+                print(f"Error: {e}")
+                return 1
+            report["corpora"][label] = {"root": str(root)}
+
+            for name in selected:
+                bench, print_results = BENCHMARKS[name]
+                part = bench(root, ignore_patterns, args.repeat)
+                for r in part["results"]:
+                    r["corpus"] = label
+                report["results"].extend(part["results"])
+                if "diffs" in part:
+                    report["diffs"][label] = part["diffs"]
+                if "summary" in part:
+                    report["corpora"][label].update(part["summary"])
+                print_results(label, part, args.show_diffs)
+
+    if baseline is not None:
+        compare_reports(baseline, report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to: {args.json}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+SPEC Query
+
+Command-line access to the JSON spec written by `generate_spec.py --json`,
+without re-parsing the source tree.
+
+Usage:
+    python spec_query.py docs/AUTO_SPEC.json symbols fetch          # functions, classes, methods, types
+    python spec_query.py docs/AUTO_SPEC.json symbols Router --kind class --exact
+    python spec_query.py docs/AUTO_SPEC.json routes /api/documents --method GET
+    python spec_query.py docs/AUTO_SPEC.json deps src/index.ts      # imports and importers
+    python spec_query.py docs/AUTO_SPEC.json graph --sort fan-in    # fan-in/out and layer per file
+    python spec_query.py docs/AUTO_SPEC.json cycles
+    python spec_query.py docs/AUTO_SPEC.json files --role service --json
+    python spec_query.py docs/SPEC.json --package @acme/api routes  # shard index from --shards
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from generate_spec import load_spec_json, loads_json
+
+
+def load_specs(path: Path, packages: list[str]):
+    """
+    Load a spec, or for a --shards index, the shards named in `packages`
+    (package name or directory; all shards if empty) merged into one.
+    """
+    index = loads_json(path.read_bytes())
+    if 'shard_index_format' not in index:
+        return load_spec_json(path)
+    
+    entries = [e for e in index['packages'] if not packages or e['name'] in packages or e['dir'] in packages]
+    if not entries:
+        raise ValueError(f"no package named {', '.join(packages)} (have: {', '.join(e['name'] for e in index['packages'])})")
+    merged = None
+    for entry in entries:
+        shard = load_spec_json(path.parent / entry['json'])
+        if merged is None:
+            merged = shard
+            continue
+        merged.files.extend(shard.files)
+        merged.skipped_files.extend(shard.skipped_files)
+        merged.internal_deps.update(shard.internal_deps)
+        merged.unresolved_imports.update(shard.unresolved_imports)
+        for metric in ('fan_in', 'fan_out', 'layers'):
+            getattr(merged.graph, metric).update(getattr(shard.graph, metric))
+        merged.graph.cycles.extend(shard.graph.cycles)
+        merged.all_routes.extend(shard.all_routes)
+        merged.all_todos.extend(shard.all_todos)
+    return merged
+
+
+def iter_symbols(project):
+    """Yield (kind, name, file, signature) for every documented symbol."""
+    for file in project.files:
+        for fn in file.functions:
+            params = ", ".join(f"{p.name}: {p.type}" if p.type else p.name for p in fn.params)
+            yield "function", fn.name, file.relative_path, f"({params})" + (f" -> {fn.return_type}" if fn.return_type else "")
+        for cls in file.classes:
+            yield "class", cls.name, file.relative_path, f"extends {cls.extends}" if cls.extends else ""
+            for method in cls.methods:
+                params = ", ".join(p.name for p in method.params)
+                yield "method", f"{cls.name}.{method.name}", file.relative_path, f"({params})"
+        for iface in file.interfaces:
+            yield iface.kind, iface.name, file.relative_path, f"{len(iface.properties)} properties"
+
+
+def cmd_symbols(project, args) -> list:
+    query = args.name.lower()
+    matches = []
+    for kind, name, file, signature in iter_symbols(project):
+        if args.kind and kind != args.kind:
+            continue
+        short = name.rsplit(".", 1)[-1].lower()
+        if (short == query or name.lower() == query) if args.exact else query in name.lower():
+            matches.append({"kind": kind, "name": name, "file": file, "signature": signature})
+    return matches
+
+
+def cmd_routes(project, args) -> list:
+    matches = []
+    for file in project.files:
+        for route in file.routes:
+            if args.method and route.method != args.method.upper():
+                continue
+            if args.path and args.path not in route.path:
+                continue
+            matches.append({"method": route.method, "path": route.path, "file": file.relative_path})
+    return matches
+
+
+def cmd_deps(project, args) -> list:
+    target = args.file
+    imports = sorted(t for t, importers in project.internal_deps.items() if target in importers)
+    return [
+        *({"direction": "imports", "file": t} for t in imports),
+        *({"direction": "imported_by", "file": i} for i in project.internal_deps.get(target, [])),
+        *({"direction": "unresolved", "file": m} for m in project.unresolved_imports.get(target, [])),
+    ]
+
+
+def cmd_graph(project, args) -> list:
+    graph = project.graph
+    key = {"fan-in": graph.fan_in, "fan-out": graph.fan_out, "layer": graph.layers}[args.sort]
+    paths = [p for p in graph.layers if not args.prefix or p.startswith(args.prefix)]
+    paths.sort(key=lambda p: (-key[p], p))
+    return [
+        {"file": p, "fan_in": graph.fan_in[p], "fan_out": graph.fan_out[p], "layer": graph.layers[p]}
+        for p in paths[:args.top or None]
+    ]
+
+
+def cmd_cycles(project, args) -> list:
+    return [{"size": len(cycle), "files": cycle} for cycle in project.graph.cycles]
+
+
+def cmd_files(project, args) -> list:
+    return [
+        {
+            "file": f.relative_path,
+            "role": f.role,
+            "lines": f.line_count,
+            "exports": len(f.exports),
+            "description": f.description,
+        }
+        for f in project.files
+        if not args.role or f.role == args.role
+    ]
+
+
+def format_match(command: str, m: dict) -> str:
+    if command == "symbols":
+        return f"  {m['kind']:<9} {m['name']}{m['signature'] if m['kind'] in ('function', 'method') else ''}  ({m['file']})"
+    if command == "routes":
+        return f"  {m['method']:<7} {m['path']}  ({m['file']})"
+    if command == "deps":
+        return f"  {m['direction']:<12} {m['file']}"
+    if command == "graph":
+        return f"  in {m['fan_in']:>3}  out {m['fan_out']:>3}  layer {m['layer']:>2}  {m['file']}"
+    if command == "cycles":
+        return f"  {m['size']} files: {', '.join(m['files'])}"
+    return f"  {m['file']}  [{m['role']}, {m['lines']} lines, {m['exports']} exports]"
+
+
+COMMANDS = {
+    "symbols": cmd_symbols,
+    "routes": cmd_routes,
+    "deps": cmd_deps,
+    "graph": cmd_graph,
+    "cycles": cmd_cycles,
+    "files": cmd_files,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a generate_spec JSON spec")
+    parser.add_argument("spec", help="JSON spec written by generate_spec.py --json")
+    parser.add_argument("--json", action="store_true", help="Print matches as JSON")
+    parser.add_argument(
+        "--package",
+        action="append",
+        default=[],
+        help="With a --shards index, load only this package's shard (name or directory; repeatable)"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    symbols_parser = subparsers.add_parser("symbols", help="Find functions, classes, methods, interfaces and types")
+    symbols_parser.add_argument("name", help="Name substring (case-insensitive)")
+    symbols_parser.add_argument("--kind", choices=["function", "class", "method", "interface", "type"])
+    symbols_parser.add_argument("--exact", action="store_true", help="Match the whole name")
+
+    routes_parser = subparsers.add_parser("routes", help="List HTTP routes")
+    routes_parser.add_argument("path", nargs="?", help="Route path substring")
+    routes_parser.add_argument("--method", help="HTTP method (GET, POST, ...)")
+
+    deps_parser = subparsers.add_parser("deps", help="Show what a file imports and what imports it")
+    deps_parser.add_argument("file", help="File path relative to the project root")
+
+    graph_parser = subparsers.add_parser("graph", help="Fan-in, fan-out and layer of each file")
+    graph_parser.add_argument("prefix", nargs="?", help="Only files under this path (e.g. public/js/)")
+    graph_parser.add_argument("--sort", choices=["fan-in", "fan-out", "layer"], default="fan-in")
+    graph_parser.add_argument("--top", type=int, default=20, help="Show the first N files (0 = all, default: %(default)s)")
+
+    subparsers.add_parser("cycles", help="List import cycles, largest first")
+
+    files_parser = subparsers.add_parser("files", help="List documented files")
+    files_parser.add_argument("--role", help="Only files with this role (service, route, util, ...)")
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        project = load_specs(Path(args.spec), args.package)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: cannot load spec '{args.spec}': {e}")
+        return 1
+    load_ms = (time.perf_counter() - start) * 1000
+
+    matches = COMMANDS[args.command](project, args)
+
+    if args.json:
+        print(json.dumps(matches, indent=2))
+        return 0
+
+    if not matches:
+        print(f"No matches ({len(project.files):,} files loaded in {load_ms:.0f}ms)")
+        return 1
+
+    print(f"{len(matches)} matches ({len(project.files):,} files loaded in {load_ms:.0f}ms):")
+    for m in matches:
+        print(format_match(args.command, m))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,12 +3,26 @@ OnShape Thumbnail Extractor
 
 Extracts thumbnails and BOM data from OnShape assemblies.
 Refactored into modular classes for maintainability.
+
+Usage:
+    python thumbnail_extractor.py                               # prompts for the assembly link
+    python thumbnail_extractor.py "https://cad.onshape.com/documents/..."
+    python thumbnail_extractor.py URL --columnar parquet --xlsx  # typed/Excel exports next to bom_data.csv
+    python thumbnail_extractor.py URL --index-db                 # also index into thumbnail_extraction/bom_index.sqlite
+    python thumbnail_extractor.py URL --columns "Part number,Name,Quantity" --where "Part number^=PRT"
+    python thumbnail_extractor.py URL --shard-rows 50000 --partition-by "Part number" --partition-prefix 3
+    python thumbnail_extractor.py URL --pretty-json --quiet
 """
 
+import argparse
 import csv
+import hashlib
 import json
 import os
 import re
+import sqlite3
+import sys
+from collections import OrderedDict
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from datetime import datetime
@@ -17,6 +31,24 @@ from typing import Optional
 import requests
 from dotenv import load_dotenv
 
+from bom_table import (
+    ColumnarWriter,
+    RowFilter,
+    XLSXWriter,
+    extract_cell_value,
+    find_column,
+    get_column_kinds,
+    get_ordered_columns,
+    lookup_cell_value,
+    stringify_value,
+    unique_column_names,
+)
+
+try:
+    import orjson
+except ImportError:  # Optional: faster JSON backend for JSONSerializer
+    orjson = None
+
 
 # =============================================================================
 # Configuration
@@ -114,6 +146,64 @@ class ExtractionSummary:
             self.failed += 1
 
 
+# =============================================================================
+# JSON Serialization
+# =============================================================================
+
+class JSONSerializer:
+    """
+    Reads and writes JSON files, using orjson when it is installed.
+    
+    Output is compact by default; pretty=True writes 2-space indented files.
+    Falls back to the stdlib json module when orjson is missing or rejects
+    a value (e.g. integers beyond 64 bits).
+    """
+    
+    BACKENDS = ('orjson', 'json')
+    
+    def __init__(self, pretty: bool = False, backend: Optional[str] = None):
+        if backend is None:
+            backend = 'orjson' if orjson is not None else 'json'
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown JSON backend: {backend}")
+        if backend == 'orjson' and orjson is None:
+            raise ValueError("JSON backend 'orjson' requested but orjson is not installed")
+        
+        self.pretty = pretty
+        self.backend = backend
+    
+    def dumps(self, obj) -> bytes:
+        """Serialize an object to UTF-8 JSON bytes."""
+        if self.backend == 'orjson':
+            option = orjson.OPT_NON_STR_KEYS
+            if self.pretty:
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(obj, option=option)
+            except TypeError:
+                pass  # Fall through to stdlib, which handles arbitrary ints
+        
+        if self.pretty:
+            return json.dumps(obj, indent=2).encode('utf-8')
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+    
+    def loads(self, data):
+        """Parse JSON from bytes or str."""
+        if self.backend == 'orjson':
+            return orjson.loads(data)
+        return json.loads(data)
+    
+    def dump(self, obj, filepath: str):
+        """Serialize an object to a JSON file."""
+        with open(filepath, 'wb') as f:
+            f.write(self.dumps(obj))
+    
+    def load(self, filepath: str):
+        """Parse a JSON file."""
+        with open(filepath, 'rb') as f:
+            return self.loads(f.read())
+
+
 # =============================================================================
 # URL Parser
 # =============================================================================
@@ -496,7 +586,7 @@ class BOMProcessor:
     def get_part_name(cls, row: dict) -> str:
         """Extract part name from a BOM row."""
         # Try itemSource first
-        item_name = row.get('itemSource', {}).get('itemName')
+        item_name = (row.get('itemSource') or {}).get('itemName')
         if item_name:
             return item_name
         
@@ -528,7 +618,7 @@ class BOMProcessor:
                 return header_values[key]
         
         # Try itemSource description
-        item_source = row.get('itemSource', {})
+        item_source = row.get('itemSource') or {}
         if 'description' in item_source:
             return item_source['description']
         
@@ -537,7 +627,7 @@ class BOMProcessor:
     @staticmethod
     def get_thumbnail_url(row: dict, preferred_size: str = "300x300") -> Optional[str]:
         """Extract thumbnail URL from a BOM row."""
-        thumb_info = row.get('itemSource', {}).get('thumbnailInfo', {})
+        thumb_info = (row.get('itemSource') or {}).get('thumbnailInfo') or {}
         sizes = thumb_info.get('sizes', [])
         
         for size_info in sizes:
@@ -563,13 +653,24 @@ class ReportGenerator(ABC):
 class JSONReportGenerator(ReportGenerator):
     """Generates JSON reports for thumbnail extraction."""
     
+    def __init__(self, serializer: JSONSerializer = None):
+        self.serializer = serializer or JSONSerializer()
+    
     def generate(
         self,
         output_folder: str,
         summary: ExtractionSummary,
-        bom_data: dict
+        bom_data: dict,
+        enrichment: Optional[dict] = None
     ) -> Optional[str]:
-        """Generate JSON report with download statistics."""
+        """
+        Generate JSON report with download statistics.
+        
+        Args:
+            enrichment: Optional part number -> {'name', 'description'} lookup
+                (see CSVReportGenerator.part_lookup) applied before writing,
+                so the report is written once
+        """
         failure_breakdown = self._analyze_failures(summary.results)
         
         report = {
@@ -584,10 +685,14 @@ class JSONReportGenerator(ReportGenerator):
             "items": [r.to_dict() for r in summary.results]
         }
         
+        if enrichment:
+            enriched_count = self._apply_enrichment(report["items"], enrichment)
+            if enriched_count > 0:
+                print(f"Enriched {enriched_count} fields from BOM data")
+        
         filepath = os.path.join(output_folder, "thumbnail_report.json")
         try:
-            with open(filepath, 'w') as f:
-                json.dump(report, f, indent=2)
+            self.serializer.dump(report, filepath)
             print(f"Report saved to: {filepath}")
             return filepath
         except Exception as e:
@@ -596,9 +701,12 @@ class JSONReportGenerator(ReportGenerator):
     
     def enrich_from_csv(self, json_report_path: str, csv_path: str) -> bool:
         """
-        Enrich the JSON report with Name and Description from CSV.
+        Enrich an existing JSON report file with Name and Description from CSV.
         Updates items where part_name is 'unknown' or part_description is None.
         
+        ThumbnailExtractor.run enriches in memory via generate(enrichment=...);
+        this is for reports that are already on disk.
+        
         Args:
             json_report_path: Path to the thumbnail_report.json
             csv_path: Path to bom_data.csv
@@ -608,47 +716,21 @@ class JSONReportGenerator(ReportGenerator):
         """
         try:
             # Load JSON report
-            with open(json_report_path, 'r') as f:
-                report = json.load(f)
+            report = self.serializer.load(json_report_path)
             
             # Load CSV and build lookup by part number
             csv_lookup = {}
             with open(csv_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
+                reader = csv.reader(f)
+                indexes = CSVReportGenerator.enrichment_indexes(next(reader, []))
                 for row in reader:
-                    # Try to find part number column (common variations)
-                    part_num = None
-                    for key in ['Part Number', 'Part number', 'part_number', 'PartNumber']:
-                        if key in row and row[key]:
-                            part_num = row[key]
-                            break
-                    
-                    if part_num:
-                        csv_lookup[part_num] = {
-                            'name': row.get('Name') or row.get('name') or row.get('NAME'),
-                            'description': row.get('Description') or row.get('description') or row.get('DESCRIPTION')
-                        }
+                    CSVReportGenerator.record_enrichment(csv_lookup, row, indexes)
             
             # Enrich JSON items
-            enriched_count = 0
-            for item in report.get('items', []):
-                part_number = item.get('part_number')
-                if part_number and part_number in csv_lookup:
-                    csv_data = csv_lookup[part_number]
-                    
-                    # Update name if currently unknown
-                    if item.get('part_name') == 'unknown' and csv_data.get('name'):
-                        item['part_name'] = csv_data['name']
-                        enriched_count += 1
-                    
-                    # Update description if currently None/empty
-                    if not item.get('part_description') and csv_data.get('description'):
-                        item['part_description'] = csv_data['description']
-                        enriched_count += 1
+            enriched_count = self._apply_enrichment(report.get('items', []), csv_lookup)
             
             # Save updated report
-            with open(json_report_path, 'w') as f:
-                json.dump(report, f, indent=2)
+            self.serializer.dump(report, json_report_path)
             
             if enriched_count > 0:
                 print(f"Enriched {enriched_count} fields from CSV data")
@@ -659,6 +741,26 @@ class JSONReportGenerator(ReportGenerator):
             print(f"Error enriching JSON from CSV: {e}")
             return False
     
+    def _apply_enrichment(self, items: list, lookup: dict) -> int:
+        """Fill unknown names and empty descriptions; returns fields updated."""
+        enriched_count = 0
+        for item in items:
+            part_number = item.get('part_number')
+            if part_number and part_number in lookup:
+                data = lookup[part_number]
+                
+                # Update name if currently unknown
+                if item.get('part_name') == 'unknown' and data.get('name'):
+                    item['part_name'] = data['name']
+                    enriched_count += 1
+                
+                # Update description if currently None/empty
+                if not item.get('part_description') and data.get('description'):
+                    item['part_description'] = data['description']
+                    enriched_count += 1
+        
+        return enriched_count
+    
     def _analyze_failures(self, results: list) -> dict:
         """Analyze failure codes and return breakdown."""
         failed_items = [r for r in results if not r.thumbnail_downloaded]
@@ -679,8 +781,255 @@ class JSONReportGenerator(ReportGenerator):
         }
 
 
-class CSVReportGenerator(ReportGenerator):
-    """Generates CSV reports from BOM data."""
+class BOMTableReportGenerator(ReportGenerator):
+    """
+    Shared column/cell handling for generators that export BOM rows as a table.
+    
+    Optional column projection (select) and row filters (where, see
+    bom_table.RowFilter) are resolved once per BOM; filters run before any
+    output cell is formatted. Column lookup and formatting are the ones
+    json_to_csv.py uses, from bom_table.
+    """
+    
+    def __init__(self, select: Optional[list] = None, where: Optional[list] = None):
+        self.select = select
+        self.where = where
+    
+    def _get_output_columns(self, headers: list) -> tuple:
+        """
+        Resolve this generator's output columns and row filters.
+        
+        Returns:
+            tuple: (all_columns, output_columns, filters)
+        """
+        all_columns = get_ordered_columns(headers)
+        if self.select:
+            columns = [find_column(name, all_columns) for name in self.select]
+        else:
+            columns = all_columns
+        filters = [RowFilter(expression, all_columns) for expression in (self.where or [])]
+        return all_columns, columns, filters
+
+
+class ShardedCSVWriter:
+    """
+    Writes CSV rows across several shard files and records a manifest.
+    
+    Shards roll over at max_rows rows or max_bytes bytes (whichever comes
+    first), and/or rows are partitioned by a key (one shard series per key).
+    Every shard repeats the header row. Bytes and SHA-256 are tracked while
+    writing, so the manifest needs no second read. At most MAX_OPEN_SHARDS
+    files are open at once; older ones are closed and reopened for append.
+    The manifest is written with `serializer` (compact JSON by default).
+    """
+    
+    MAX_OPEN_SHARDS = 64
+    MANIFEST_NAME = "manifest.json"
+    
+    class _Shard:
+        def __init__(self, path: str, partition: Optional[str]):
+            self.path = path
+            self.partition = partition
+            self.rows = 0
+            self.bytes = 0
+            self.sha256 = hashlib.sha256()
+            self.file = None
+            self.writer = None
+        
+        def write(self, text: str):
+            data = text.encode('utf-8')
+            self.file.write(data)
+            self.sha256.update(data)
+            self.bytes += len(data)
+    
+    def __init__(
+        self,
+        folder: str,
+        base_name: str,
+        column_names: list,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        serializer: Optional[JSONSerializer] = None
+    ):
+        self.folder = folder
+        self.base_name = base_name
+        self.column_names = column_names
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.serializer = serializer or JSONSerializer()
+        self.shards = []
+        self.current = {}        # partition key -> active shard
+        self.series = {}         # partition key -> shards written so far
+        self.safe_names = {}     # partition key -> unique filename-safe name
+        self.open_shards = OrderedDict()
+        os.makedirs(folder, exist_ok=True)
+    
+    def writerow(self, csv_row: list, partition: Optional[str] = None):
+        """Write one row to the active shard of its partition."""
+        shard = self.current.get(partition)
+        if shard is None or self._is_full(shard):
+            shard = self._new_shard(partition)
+        self._ensure_open(shard)
+        shard.writer.writerow(csv_row)
+        shard.rows += 1
+    
+    def close(self, extra: dict = None) -> str:
+        """Close all shards and write the manifest; returns its path."""
+        for shard in list(self.open_shards.values()):
+            self._close_shard(shard)
+        
+        manifest = {
+            "base_name": self.base_name,
+            "columns": self.column_names,
+            "total_rows": sum(shard.rows for shard in self.shards),
+            "sharding": {"max_rows": self.max_rows, "max_bytes": self.max_bytes, **(extra or {})},
+            "shards": [
+                {
+                    "file": os.path.basename(shard.path),
+                    "partition": shard.partition,
+                    "rows": shard.rows,
+                    "bytes": shard.bytes,
+                    "sha256": shard.sha256.hexdigest()
+                }
+                for shard in self.shards
+            ]
+        }
+        manifest_path = os.path.join(self.folder, self.MANIFEST_NAME)
+        self.serializer.dump(manifest, manifest_path)
+        return manifest_path
+    
+    def _is_full(self, shard) -> bool:
+        if self.max_rows and shard.rows >= self.max_rows:
+            return True
+        return bool(self.max_bytes) and shard.rows > 0 and shard.bytes >= self.max_bytes
+    
+    def _new_shard(self, partition: Optional[str]):
+        number = self.series.get(partition, 0) + 1
+        self.series[partition] = number
+        if partition is None:
+            filename = f"{self.base_name}.{number:04d}.csv"
+        else:
+            filename = f"{self.base_name}.{self._safe_name(partition)}.{number:04d}.csv"
+        
+        shard = self._Shard(os.path.join(self.folder, filename), partition)
+        self.shards.append(shard)
+        self.current[partition] = shard
+        
+        previous = [s for s in self.open_shards.values() if s.partition == partition]
+        for old in previous:
+            self._close_shard(old)
+        
+        self._ensure_open(shard)
+        shard.writer.writerow(self.column_names)
+        return shard
+    
+    def _ensure_open(self, shard):
+        if shard.file is not None:
+            self.open_shards.move_to_end(shard.path)
+            return
+        while len(self.open_shards) >= self.MAX_OPEN_SHARDS:
+            _, oldest = self.open_shards.popitem(last=False)
+            self._close_shard(oldest)
+        shard.file = open(shard.path, 'ab' if shard.bytes else 'wb')
+        shard.writer = csv.writer(shard)
+        self.open_shards[shard.path] = shard
+    
+    def _close_shard(self, shard):
+        if shard.file is not None:
+            shard.file.close()
+            shard.file = None
+            shard.writer = None
+        self.open_shards.pop(shard.path, None)
+    
+    def _safe_name(self, partition: str) -> str:
+        """Filename-safe partition name, unique even if sanitizing collides."""
+        if partition in self.safe_names:
+            return self.safe_names[partition]
+        base = re.sub(r'[^\w.-]', '_', partition).strip('.') or '_empty'
+        name = base
+        taken = set(self.safe_names.values())
+        suffix = 2
+        while name in taken:
+            name = f"{base}~{suffix}"
+            suffix += 1
+        self.safe_names[partition] = name
+        return name
+
+
+class CSVReportGenerator(BOMTableReportGenerator):
+    """
+    Generates CSV reports from BOM data.
+    
+    While writing rows it also collects part_lookup (part number -> name and
+    description), which the JSON report uses as its name/description fallback.
+    
+    With shard_rows/shard_bytes and/or partition_by, rows are written to
+    bom_data_shards/ instead of one bom_data.csv (see ShardedCSVWriter).
+    partition_by names a column, or a dotted row path such as
+    'itemSource.documentId'; partition_prefix_length partitions on the first
+    N characters of that value (e.g. 3 for PRT/ASM part number prefixes).
+    The shard manifest is written with `serializer`.
+    """
+    
+    SHARD_FOLDER = "bom_data_shards"
+    
+    # Column name variants used for the name/description fallback
+    PART_NUMBER_COLUMNS = ('Part Number', 'Part number', 'part_number', 'PartNumber')
+    NAME_COLUMNS = ('Name', 'name', 'NAME')
+    DESCRIPTION_COLUMNS = ('Description', 'description', 'DESCRIPTION')
+    
+    def __init__(
+        self,
+        select: Optional[list] = None,
+        where: Optional[list] = None,
+        shard_rows: Optional[int] = None,
+        shard_bytes: Optional[int] = None,
+        partition_by: Optional[str] = None,
+        partition_prefix_length: Optional[int] = None,
+        serializer: Optional[JSONSerializer] = None
+    ):
+        super().__init__(select, where)
+        self.serializer = serializer
+        self.shard_rows = shard_rows
+        self.shard_bytes = shard_bytes
+        self.partition_by = partition_by
+        self.partition_prefix_length = partition_prefix_length
+        self.part_lookup = {}
+    
+    @property
+    def is_sharded(self) -> bool:
+        return bool(self.shard_rows or self.shard_bytes or self.partition_by)
+    
+    @classmethod
+    def enrichment_indexes(cls, column_names: list) -> tuple:
+        """
+        Map the fallback column variants to positions in a CSV row.
+        
+        Duplicate column names resolve to the last occurrence, as csv.DictReader does.
+        
+        Returns:
+            tuple: (part_number_indexes, name_indexes, description_indexes)
+        """
+        positions = {name: i for i, name in enumerate(column_names)}
+        return tuple(
+            [positions[name] for name in variants if name in positions]
+            for variants in (cls.PART_NUMBER_COLUMNS, cls.NAME_COLUMNS, cls.DESCRIPTION_COLUMNS)
+        )
+    
+    @staticmethod
+    def record_enrichment(lookup: dict, csv_row, indexes: tuple):
+        """
+        Add one formatted row to a part number -> name/description lookup.
+        
+        csv_row is a full row list, or a dict holding just the indexed cells.
+        """
+        part_indexes, name_indexes, description_indexes = indexes
+        part_number = next((csv_row[i] for i in part_indexes if csv_row[i]), None)
+        if part_number:
+            lookup[part_number] = {
+                'name': next((csv_row[i] for i in name_indexes if csv_row[i]), None),
+                'description': next((csv_row[i] for i in description_indexes if csv_row[i]), None)
+            }
     
     def generate(
         self,
@@ -688,102 +1037,564 @@ class CSVReportGenerator(ReportGenerator):
         summary: ExtractionSummary,
         bom_data: dict
     ) -> Optional[str]:
-        """Convert BOM data to CSV."""
+        """Convert BOM data to CSV, collecting part_lookup in the same pass."""
         filepath = os.path.join(output_folder, "bom_data.csv")
+        self.part_lookup = {}
         
         try:
             headers = bom_data.get('headers', [])
             rows = bom_data.get('rows', [])
-            columns = self._get_ordered_columns(headers)
+            all_columns, columns, filters = self._get_output_columns(headers)
+            column_names = [col[1] for col in columns]
+            partition_column = self._get_partition_column(all_columns)
             
-            with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow([col[1] for col in columns])
-                
+            # The name/description fallback always covers every row and column;
+            # with projection/filters only those few cells are formatted separately
+            indexes = self.enrichment_indexes([col[1] for col in all_columns])
+            full_rows = columns == all_columns
+            enrichment_columns = {
+                i: all_columns[i] for i in set(indexes[0] + indexes[1] + indexes[2])
+            }
+            written = 0
+            
+            if self.is_sharded:
+                sink = ShardedCSVWriter(
+                    os.path.join(output_folder, self.SHARD_FOLDER),
+                    "bom_data",
+                    column_names,
+                    max_rows=self.shard_rows,
+                    max_bytes=self.shard_bytes,
+                    serializer=self.serializer
+                )
+                f = None
+            else:
+                f = open(filepath, 'w', newline='', encoding='utf-8')
+                sink = csv.writer(f)
+                sink.writerow(column_names)
+            
+            try:
                 for row in rows:
-                    csv_row = [
-                        self._extract_cell_value(row, col[0], col[2])
-                        for col in columns
-                    ]
-                    writer.writerow(csv_row)
+                    if filters and not all(row_filter.matches(row) for row_filter in filters):
+                        csv_row = None
+                    else:
+                        csv_row = [
+                            extract_cell_value(row, col[0], col[2])
+                            for col in columns
+                        ]
+                        if f is None:
+                            sink.writerow(csv_row, self._partition_value(row, partition_column))
+                        else:
+                            sink.writerow(csv_row)
+                        written += 1
+                    
+                    if csv_row is None or not full_rows:
+                        csv_row = {
+                            i: extract_cell_value(row, col[0], col[2])
+                            for i, col in enrichment_columns.items()
+                        }
+                    self.record_enrichment(self.part_lookup, csv_row, indexes)
+            finally:
+                if f is not None:
+                    f.close()
             
-            print(f"BOM data exported to CSV: {filepath} ({len(rows)} rows)")
+            if f is None:
+                filepath = sink.close({
+                    "partition_by": self.partition_by,
+                    "partition_prefix_length": self.partition_prefix_length
+                })
+                print(f"BOM data exported to {len(sink.shards)} CSV shards: {filepath} ({written} rows)")
+                return filepath
+            
+            print(f"BOM data exported to CSV: {filepath} ({written} rows)")
             return filepath
         except Exception as e:
             print(f"Error converting BOM to CSV: {e}")
             return None
     
-    def _get_ordered_columns(self, headers: list, visible_only: bool = False) -> list:
-        """Get ordered list of columns from headers."""
-        columns = []
-        seen = set()
+    def _get_partition_column(self, all_columns: list) -> Optional[tuple]:
+        """Resolve partition_by to a column; None for no/dotted-path partitioning."""
+        if not self.partition_by:
+            return None
+        try:
+            return find_column(self.partition_by, all_columns)
+        except ValueError:
+            if '.' in self.partition_by:
+                return None
+            raise
+    
+    def _partition_value(self, row: dict, partition_column: Optional[tuple]) -> Optional[str]:
+        """Partition key for a row, or None when not partitioning."""
+        if not self.partition_by:
+            return None
+        if partition_column:
+            value = stringify_value(lookup_cell_value(row, partition_column[0], partition_column[2]))
+        else:
+            value = row
+            for key in self.partition_by.split('.'):
+                value = value.get(key) if isinstance(value, dict) else None
+            value = stringify_value(value)
+        if self.partition_prefix_length:
+            value = value[:self.partition_prefix_length]
+        return value
+
+
+class ColumnarReportGenerator(BOMTableReportGenerator):
+    """
+    Generates typed Parquet or Arrow files from BOM data.
+    
+    Column types come from each header's valueType instead of flattening
+    every value to a string. Rows are written in record batches, and string
+    columns with repeated values (material, vendor, ...) are dictionary
+    encoded. Requires pyarrow.
+    """
+    
+    FILE_EXTENSIONS = {'parquet': 'parquet', 'arrow': 'arrow'}
+    
+    def __init__(
+        self,
+        fmt: str = 'parquet',
+        batch_size: int = 5000,
+        select: Optional[list] = None,
+        where: Optional[list] = None
+    ):
+        super().__init__(select, where)
+        if fmt not in self.FILE_EXTENSIONS:
+            raise ValueError(f"Unsupported columnar format: {fmt}")
+        self.fmt = fmt
+        self.batch_size = batch_size
+    
+    def generate(
+        self,
+        output_folder: str,
+        summary: ExtractionSummary,
+        bom_data: dict
+    ) -> Optional[str]:
+        """Convert BOM data to a typed columnar file."""
+        filepath = os.path.join(output_folder, f"bom_data.{self.FILE_EXTENSIONS[self.fmt]}")
+        
+        try:
+            headers = bom_data.get('headers', [])
+            _, columns, filters = self._get_output_columns(headers)
+            writer = ColumnarWriter(
+                filepath,
+                unique_column_names(columns),
+                get_column_kinds(headers, columns),
+                fmt=self.fmt,
+                batch_size=self.batch_size
+            )
+        except ImportError:
+            print(f"Skipping {self.fmt} export: pyarrow is not installed")
+            return None
+        except ValueError as e:
+            print(f"Error converting BOM to {self.fmt}: {e}")
+            return None
+        
+        try:
+            for row in bom_data.get('rows', []):
+                if filters and not all(row_filter.matches(row) for row_filter in filters):
+                    continue
+                writer.append([lookup_cell_value(row, col[0], col[2]) for col in columns])
+            writer.close()
+            print(f"BOM data exported to {self.fmt}: {filepath} ({writer.rows_written} rows)")
+            return filepath
+        except Exception as e:
+            print(f"Error converting BOM to {self.fmt}: {e}")
+            return None
+
+
+class XLSXReportGenerator(BOMTableReportGenerator):
+    """
+    Generates an Excel workbook (bom_data.xlsx) from BOM data.
+    
+    Rows are streamed through bom_table.XLSXWriter (openpyxl's write-only
+    mode), so memory stays flat on large BOMs. Cells are typed from each header's valueType, and
+    text (part numbers in particular) is always stored as text, never
+    reinterpreted as a number, date or formula. Requires openpyxl.
+    """
+    
+    def generate(
+        self,
+        output_folder: str,
+        summary: ExtractionSummary,
+        bom_data: dict
+    ) -> Optional[str]:
+        """Convert BOM data to a typed .xlsx workbook."""
+        filepath = os.path.join(output_folder, "bom_data.xlsx")
+        
+        try:
+            headers = bom_data.get('headers', [])
+            _, columns, filters = self._get_output_columns(headers)
+            writer = XLSXWriter(
+                filepath,
+                [str(col[1] or col[2] or col[0]) for col in columns],
+                get_column_kinds(headers, columns)
+            )
+        except ImportError:
+            print("Skipping xlsx export: openpyxl is not installed")
+            return None
+        except ValueError as e:
+            print(f"Error converting BOM to xlsx: {e}")
+            return None
         
+        try:
+            for row in bom_data.get('rows', []):
+                if filters and not all(row_filter.matches(row) for row_filter in filters):
+                    continue
+                writer.append([lookup_cell_value(row, col[0], col[2]) for col in columns])
+            writer.close()
+            print(f"BOM data exported to xlsx: {filepath} ({writer.rows_written} rows)")
+            return filepath
+        except Exception as e:
+            print(f"Error converting BOM to xlsx: {e}")
+            return None
+
+
+class SQLiteReportGenerator(BOMTableReportGenerator):
+    """
+    Indexes BOM rows, headers and thumbnail results in a local SQLite database.
+    
+    One database accumulates every extraction run, so "which assemblies use
+    PRT-1234" is an indexed lookup instead of a scan over CSV files. Each
+    assembly (document + version/workspace + element) is upserted: a rerun
+    replaces that assembly's rows instead of duplicating them. All writes of
+    a run go through executemany in a single transaction.
+    """
+    
+    DEFAULT_DB_PATH = os.path.join("thumbnail_extraction", "bom_index.sqlite")
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS assemblies (
+            assembly_key TEXT PRIMARY KEY,
+            document_id TEXT,
+            document_name TEXT,
+            element_id TEXT,
+            assembly_name TEXT,
+            version_name TEXT,
+            output_folder TEXT,
+            row_count INTEGER,
+            extracted_at TEXT
+        );
+        CREATE TABLE IF NOT EXISTS bom_headers (
+            assembly_key TEXT NOT NULL,
+            header_id TEXT NOT NULL,
+            property_name TEXT,
+            name TEXT,
+            value_type TEXT,
+            position INTEGER,
+            PRIMARY KEY (assembly_key, header_id)
+        );
+        CREATE TABLE IF NOT EXISTS bom_rows (
+            assembly_key TEXT NOT NULL,
+            row_index INTEGER NOT NULL,
+            part_number TEXT,
+            part_name TEXT,
+            description TEXT,
+            document_id TEXT,
+            indent_level INTEGER,
+            cells TEXT,
+            PRIMARY KEY (assembly_key, row_index)
+        );
+        CREATE TABLE IF NOT EXISTS thumbnails (
+            assembly_key TEXT NOT NULL,
+            row_index INTEGER NOT NULL,
+            part_number TEXT,
+            part_name TEXT,
+            downloaded INTEGER,
+            size TEXT,
+            filename TEXT,
+            url TEXT,
+            error_code TEXT,
+            PRIMARY KEY (assembly_key, row_index)
+        );
+        CREATE INDEX IF NOT EXISTS idx_bom_rows_part_number ON bom_rows (part_number);
+        CREATE INDEX IF NOT EXISTS idx_bom_rows_document ON bom_rows (document_id);
+        CREATE INDEX IF NOT EXISTS idx_assemblies_document ON assemblies (document_id);
+        CREATE INDEX IF NOT EXISTS idx_thumbnails_part_number ON thumbnails (part_number);
+    """
+    
+    def __init__(self, db_path: str = None):
+        super().__init__()
+        self.db_path = db_path or self.DEFAULT_DB_PATH
+    
+    def connect(self) -> sqlite3.Connection:
+        """Open the database, creating the schema if needed."""
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate_thumbnails(conn)
+        conn.executescript(self.SCHEMA)
+        return conn
+    
+    @staticmethod
+    def _migrate_thumbnails(conn: sqlite3.Connection):
+        """
+        Re-key a thumbnails table from the part-number era on row_index.
+        
+        Old rows are matched to the first BOM row with their part number;
+        rows that overwrote each other there can't be recovered.
+        """
+        def needs_migration() -> bool:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(thumbnails)")]
+            return bool(columns) and 'row_index' not in columns
+        
+        if not needs_migration():
+            return
+        # One explicit transaction (executescript() would commit part-way),
+        # so an interrupted rebuild rolls back to the old table
+        conn.execute("BEGIN IMMEDIATE")
+        with conn:
+            # Another process may have migrated while we waited for the lock
+            if not needs_migration():
+                return
+            conn.execute("DROP INDEX IF EXISTS idx_thumbnails_part_number")
+            conn.execute("ALTER TABLE thumbnails RENAME TO thumbnails_old")
+            for statement in SQLiteReportGenerator.SCHEMA.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+            conn.execute(
+                """
+                INSERT INTO thumbnails
+                SELECT t.assembly_key, MIN(r.row_index), t.part_number, t.part_name, t.downloaded,
+                       t.size, t.filename, t.url, t.error_code
+                FROM thumbnails_old t
+                JOIN bom_rows r ON r.assembly_key = t.assembly_key AND r.part_number = t.part_number
+                GROUP BY t.assembly_key, t.part_number
+                """
+            )
+            conn.execute("DROP TABLE thumbnails_old")
+    
+    def generate(
+        self,
+        output_folder: str,
+        summary: ExtractionSummary,
+        bom_data: dict
+    ) -> Optional[str]:
+        """Upsert this run's assembly, headers, rows and thumbnail results."""
+        try:
+            conn = self.connect()
+            try:
+                row_count = self.index_bom(conn, output_folder, bom_data, summary.results)
+            finally:
+                conn.close()
+            print(f"BOM data indexed in SQLite: {self.db_path} ({row_count} rows)")
+            return self.db_path
+        except Exception as e:
+            print(f"Error indexing BOM in SQLite: {e}")
+            return None
+    
+    def index_bom(
+        self,
+        conn: sqlite3.Connection,
+        output_folder: str,
+        bom_data: dict,
+        results: list,
+        extracted_at: str = None
+    ) -> int:
+        """
+        Write one assembly's data in a single transaction.
+        
+        Args:
+            results: ThumbnailResult objects, or their to_dict() form
+                (as stored in thumbnail_report.json)
+        
+        Returns:
+            Number of BOM rows indexed
+        """
+        headers = bom_data.get('headers', [])
+        rows = bom_data.get('rows', [])
+        columns = get_ordered_columns(headers)
+        assembly = self._assembly_info(bom_data)
+        key = assembly['assembly_key']
+        
+        value_types = {}
         for header in headers:
-            if visible_only and not header.get('visible', True):
-                continue
+            value_types.setdefault(header.get('id') or header.get('propertyName'), header.get('valueType'))
+        header_records = [
+            (key, header_id, property_name, name, value_types.get(header_id), position)
+            for position, (header_id, name, property_name) in enumerate(columns)
+        ]
+        
+        row_records = []
+        for index, row in enumerate(rows):
+            cells = {}
+            for header_id, _, property_name in columns:
+                value = lookup_cell_value(row, header_id, property_name)
+                if value is not None:
+                    cells[header_id] = stringify_value(value)
+            row_records.append((
+                key,
+                index,
+                BOMProcessor.get_part_number(row),
+                stringify_value(BOMProcessor.get_part_name(row)),
+                stringify_value(BOMProcessor.get_part_description(row)) or None,
+                (row.get('itemSource') or {}).get('documentId'),
+                row.get('indentLevel'),
+                json.dumps(cells, separators=(',', ':'))
+            ))
+        
+        # One result per BOM row, in row order (see _process_rows)
+        thumbnail_records = []
+        for index, result in enumerate(results):
+            item = result.to_dict() if isinstance(result, ThumbnailResult) else result
+            thumbnail_records.append((
+                key,
+                index,
+                item.get('part_number'),
+                item.get('part_name'),
+                int(bool(item.get('thumbnail_downloaded'))),
+                item.get('thumbnail_size'),
+                item.get('thumbnail_filename'),
+                item.get('thumbnail_URL'),
+                item.get('error_code')
+            ))
+        
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO assemblies (assembly_key, document_id, document_name, element_id,
+                                        assembly_name, version_name, output_folder, row_count, extracted_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (assembly_key) DO UPDATE SET
+                    document_id = excluded.document_id,
+                    document_name = excluded.document_name,
+                    element_id = excluded.element_id,
+                    assembly_name = excluded.assembly_name,
+                    version_name = excluded.version_name,
+                    output_folder = excluded.output_folder,
+                    row_count = excluded.row_count,
+                    extracted_at = excluded.extracted_at
+                """,
+                (
+                    key, assembly['document_id'], assembly['document_name'], assembly['element_id'],
+                    assembly['assembly_name'], assembly['version_name'], output_folder, len(rows),
+                    extracted_at or datetime.now().isoformat(timespec='seconds')
+                )
+            )
             
-            header_id = header.get('id') or header.get('propertyName')
-            property_name = header.get('propertyName')
-            display_name = header.get('name', property_name)
+            # Replace the assembly's previous snapshot
+            conn.execute("DELETE FROM bom_headers WHERE assembly_key = ?", (key,))
+            conn.execute("DELETE FROM bom_rows WHERE assembly_key = ?", (key,))
+            conn.execute("DELETE FROM thumbnails WHERE assembly_key = ?", (key,))
             
-            if header_id not in seen:
-                columns.append((header_id, display_name, property_name))
-                seen.add(header_id)
-        
-        return columns
-    
-    def _extract_cell_value(self, row: dict, header_id: str, property_name: str) -> str:
-        """Extract cell value from a row."""
-        # Try direct lookups
-        for key in [header_id, property_name]:
-            if key and key in row:
-                return self._format_value(row[key])
-        
-        # Check nested structures
-        for nested_key in ['values', 'properties', 'headerIdToValue']:
-            if nested_key in row and isinstance(row[nested_key], dict):
-                nested = row[nested_key]
-                for key in [header_id, property_name]:
-                    if key and key in nested:
-                        return self._format_value(nested[key])
-        
-        return ''
-    
-    def _format_value(self, value) -> str:
-        """Format a value for CSV output."""
-        if value is None:
-            return ''
-        if isinstance(value, bool):
-            return str(value).lower()
-        if isinstance(value, dict):
-            for key in ['displayName', 'value', 'name']:
-                if key in value:
-                    formatted = str(value[key])
-                    break
-            else:
-                formatted = json.dumps(value)
-        elif isinstance(value, list):
-            formatted = '; '.join(self._format_value(v) for v in value)
+            conn.executemany(
+                "INSERT OR REPLACE INTO bom_headers VALUES (?, ?, ?, ?, ?, ?)", header_records
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO bom_rows VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row_records
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", thumbnail_records
+            )
+        
+        return len(rows)
+    
+    def index_existing(self, root: str = "thumbnail_extraction") -> int:
+        """
+        Backfill the index from earlier runs' output folders.
+        
+        Each folder under root with a bom_data.json is indexed, along with its
+        thumbnail_report.json when present.
+        
+        Returns:
+            Number of folders indexed
+        """
+        serializer = JSONSerializer()
+        indexed = 0
+        conn = self.connect()
+        try:
+            for entry in sorted(os.scandir(root), key=lambda e: e.name):
+                bom_path = os.path.join(entry.path, "bom_data.json")
+                if not entry.is_dir() or not os.path.isfile(bom_path):
+                    continue
+                try:
+                    bom_data = serializer.load(bom_path)
+                    report_path = os.path.join(entry.path, "thumbnail_report.json")
+                    items = serializer.load(report_path).get('items', []) if os.path.isfile(report_path) else []
+                    mtime = datetime.fromtimestamp(os.path.getmtime(bom_path)).isoformat(timespec='seconds')
+                    self.index_bom(conn, entry.path, bom_data, items, extracted_at=mtime)
+                    indexed += 1
+                except Exception as e:
+                    print(f"Error indexing {entry.path}: {e}")
+        finally:
+            conn.close()
+        return indexed
+    
+    def find_part(self, part_number: str, prefix: bool = False) -> list:
+        """
+        Find every indexed assembly that uses a part number.
+        
+        Args:
+            part_number: Exact part number, or a prefix if prefix=True
+        
+        Returns:
+            List of dicts with part, assembly and thumbnail details
+        """
+        if prefix:
+            # Range scan keeps the part_number index usable (LIKE would not)
+            condition = "r.part_number >= ? AND r.part_number < ?"
+            params = (part_number, part_number + '\uffff')
         else:
-            formatted = str(value)
+            condition = "r.part_number = ?"
+            params = (part_number,)
         
-        # Sanitize for CSV
-        formatted = formatted.replace(', ', ' ')
-        formatted = formatted.replace(',', '_')
-        formatted = formatted.replace('\n', '_').replace('\r', '_')
-        return formatted
+        conn = self.connect()
+        try:
+            cursor = conn.execute(
+                f"""
+                SELECT r.part_number, r.part_name, r.description, r.document_id, r.row_index,
+                       a.assembly_key, a.document_name, a.assembly_name, a.version_name,
+                       a.output_folder, a.extracted_at,
+                       t.downloaded AS thumbnail_downloaded, t.filename AS thumbnail_filename
+                FROM bom_rows r
+                JOIN assemblies a ON a.assembly_key = r.assembly_key
+                LEFT JOIN thumbnails t ON t.assembly_key = r.assembly_key AND t.row_index = r.row_index
+                WHERE {condition}
+                ORDER BY r.part_number, a.extracted_at DESC
+                """,
+                params
+            )
+            return [dict(row) for row in cursor]
+        finally:
+            conn.close()
+    
+    def _assembly_info(self, bom_data: dict) -> dict:
+        """Identify the assembly from bomSource; ids when present, else names."""
+        bom_source = bom_data.get('bomSource', {}) or {}
+        document = bom_source.get('document', {}) or {}
+        element = bom_source.get('element', {}) or {}
+        workspace = bom_source.get('workspace', {}) or {}
+        version = bom_source.get('version', {}) or {}
+        wvm = workspace if workspace.get('id') or workspace.get('name') else version
+        
+        document_id = document.get('id')
+        element_id = element.get('id')
+        version_name = wvm.get('name')
+        key_parts = [
+            document_id or document.get('name') or 'unknown',
+            wvm.get('id') or version_name or 'unknown',
+            element_id or element.get('name') or ''
+        ]
+        return {
+            'assembly_key': '/'.join(key_parts).rstrip('/'),
+            'document_id': document_id,
+            'document_name': document.get('name'),
+            'element_id': element_id,
+            'assembly_name': element.get('name') or document.get('name'),
+            'version_name': version_name,
+        }
 
 
 class BOMDataSaver:
     """Saves raw BOM data to JSON file."""
     
     @staticmethod
-    def save(output_folder: str, bom_data: dict) -> Optional[str]:
+    def save(output_folder: str, bom_data: dict, serializer: JSONSerializer = None) -> Optional[str]:
         """Save BOM data to JSON file."""
         filepath = os.path.join(output_folder, "bom_data.json")
         try:
-            with open(filepath, 'w') as f:
-                json.dump(bom_data, f, indent=2)
+            (serializer or JSONSerializer()).dump(bom_data, filepath)
             print(f"BOM data saved to: {filepath}")
             return filepath
         except Exception as e:
@@ -825,16 +1636,53 @@ class ThumbnailExtractor:
     Main application class that orchestrates the thumbnail extraction process.
     """
     
-    def __init__(self, credentials: OnShapeCredentials, config: OnShapeConfig = None, debug: bool = False):
+    def __init__(
+        self,
+        credentials: OnShapeCredentials,
+        config: OnShapeConfig = None,
+        debug: bool = False,
+        columnar_format: Optional[str] = None,
+        pretty_json: bool = False,
+        index_db: Optional[str] = None,
+        xlsx: bool = False,
+        select: Optional[list] = None,
+        where: Optional[list] = None,
+        shard_rows: Optional[int] = None,
+        shard_bytes: Optional[int] = None,
+        partition_by: Optional[str] = None,
+        partition_prefix_length: Optional[int] = None
+    ):
         self.debug = debug
         self.config = config or OnShapeConfig()
         self.api_client = OnShapeAPIClient(credentials, self.config, self.debug)
         self.downloader = ThumbnailDownloader(self.api_client, self.config)
         self.bom_processor = BOMProcessor()
+        # Compact JSON on disk unless pretty output is requested
+        self.serializer = JSONSerializer(pretty=pretty_json)
+        # select/where (--columns/--where) apply to the table exports; the
+        # JSON report and the SQLite index always keep the whole BOM
         self.report_generators = [
-            JSONReportGenerator(),
-            CSVReportGenerator()
+            JSONReportGenerator(self.serializer),
+            # Sharding options write bom_data_shards/ instead of bom_data.csv
+            CSVReportGenerator(
+                select,
+                where,
+                shard_rows=shard_rows,
+                shard_bytes=shard_bytes,
+                partition_by=partition_by,
+                partition_prefix_length=partition_prefix_length,
+                serializer=self.serializer
+            )
         ]
+        # Optional typed export ('parquet' or 'arrow') next to bom_data.csv
+        if columnar_format:
+            self.report_generators.append(ColumnarReportGenerator(columnar_format, select=select, where=where))
+        # Optional Excel workbook next to bom_data.csv
+        if xlsx:
+            self.report_generators.append(XLSXReportGenerator(select, where))
+        # Optional SQLite index shared across runs (see SQLiteReportGenerator)
+        if index_db:
+            self.report_generators.append(SQLiteReportGenerator(index_db))
     
     def run(self, onshape_url: str) -> bool:
         """
@@ -866,7 +1714,7 @@ class ThumbnailExtractor:
         print(f"\nThumbnails will be saved in: {output_folder}")
         
         # Save raw BOM data
-        BOMDataSaver.save(output_folder, bom_data)
+        BOMDataSaver.save(output_folder, bom_data, self.serializer)
         
         # Process rows
         rows = bom_data.get("rows", [])
@@ -877,25 +1725,19 @@ class ThumbnailExtractor:
         # Print summary
         self._print_summary(summary, len(rows))
         
-        # Generate reports and track paths
-        json_report_path = None
-        csv_report_path = None
-        
+        # Table exports first: the CSV pass also collects the name/description
+        # fallback, so the JSON report is enriched in memory and written once
+        enrichment = None
         for generator in self.report_generators:
+            if isinstance(generator, JSONReportGenerator):
+                continue
             report_path = generator.generate(output_folder, summary, bom_data)
+            if report_path and isinstance(generator, CSVReportGenerator):
+                enrichment = generator.part_lookup
+        
+        for generator in self.report_generators:
             if isinstance(generator, JSONReportGenerator):
-                json_report_path = report_path
-            elif isinstance(generator, CSVReportGenerator):
-                csv_report_path = report_path
-        
-        # Enrich JSON report with CSV data for any missing name/description fields
-        if json_report_path and csv_report_path:
-            json_generator = next(
-                (g for g in self.report_generators if isinstance(g, JSONReportGenerator)), 
-                None
-            )
-            if json_generator:
-                json_generator.enrich_from_csv(json_report_path, csv_report_path)
+                generator.generate(output_folder, summary, bom_data, enrichment=enrichment)
         
         return True
     
@@ -968,27 +1810,107 @@ class ThumbnailExtractor:
 
 def main():
     """Main entry point for the application."""
+    parser = argparse.ArgumentParser(description="Extract thumbnails and BOM data from an OnShape assembly")
+    parser.add_argument("url", nargs="?", help="Versioned OnShape assembly link (prompted for if omitted)")
+    parser.add_argument(
+        "--columnar",
+        choices=sorted(ColumnarReportGenerator.FILE_EXTENSIONS),
+        help="Also write a typed bom_data.parquet/.arrow file (requires pyarrow)"
+    )
+    parser.add_argument("--xlsx", action="store_true", help="Also write bom_data.xlsx (requires openpyxl)")
+    parser.add_argument(
+        "--index-db",
+        nargs="?",
+        const=SQLiteReportGenerator.DEFAULT_DB_PATH,
+        metavar="PATH",
+        help=f"Also index the BOM into a SQLite database (default: {SQLiteReportGenerator.DEFAULT_DB_PATH})"
+    )
+    parser.add_argument(
+        "--columns",
+        action="append",
+        metavar="NAMES",
+        help="Comma-separated columns for the CSV/columnar/xlsx exports, by name, propertyName or header ID (repeatable)"
+    )
+    parser.add_argument(
+        "--where",
+        action="append",
+        metavar="EXPR",
+        help="Keep rows where Column=value, Column^=prefix or Column~=regex (repeatable, all must match)"
+    )
+    parser.add_argument(
+        "--shard-rows",
+        type=int,
+        metavar="N",
+        help="Write the CSV as bom_data_shards/ with at most N rows per shard"
+    )
+    parser.add_argument(
+        "--shard-bytes",
+        type=int,
+        metavar="BYTES",
+        help="Start a new CSV shard once the current one reaches BYTES bytes"
+    )
+    parser.add_argument(
+        "--partition-by",
+        metavar="COLUMN",
+        help="One CSV shard series per value of COLUMN, or of a row path such as itemSource.documentId"
+    )
+    parser.add_argument(
+        "--partition-prefix",
+        type=int,
+        metavar="N",
+        help="Partition on the first N characters of the --partition-by value (e.g. 3 for PRT/ASM)"
+    )
+    parser.add_argument("--pretty-json", action="store_true", help="Indent the JSON reports and shard manifest")
+    parser.add_argument("--quiet", action="store_true", help="Don't print API debug output")
+    args = parser.parse_args()
+    if args.partition_prefix and not args.partition_by:
+        parser.error("--partition-prefix requires --partition-by")
+    
+    select = None
+    if args.columns:
+        select = [name.strip() for value in args.columns for name in value.split(',') if name.strip()]
+    
+    # Only pause before exiting when run interactively (e.g. double-clicked)
+    interactive = args.url is None
     try:
         # Get user input
-        link = input("Paste your versioned OnShape assembly link: ").strip()
+        link = args.url or input("Paste your versioned OnShape assembly link: ").strip()
         credentials = CredentialLoader.load()
         
         # Run extraction
-        extractor = ThumbnailExtractor(credentials, debug=True)
-        extractor.run(link)
+        extractor = ThumbnailExtractor(
+            credentials,
+            debug=not args.quiet,
+            columnar_format=args.columnar,
+            pretty_json=args.pretty_json,
+            index_db=args.index_db,
+            xlsx=args.xlsx,
+            select=select,
+            where=args.where,
+            shard_rows=args.shard_rows,
+            shard_bytes=args.shard_bytes,
+            partition_by=args.partition_by,
+            partition_prefix_length=args.partition_prefix
+        )
+        success = extractor.run(link)
         
-        input("\nPress Enter to exit...")
+        if interactive:
+            input("\nPress Enter to exit...")
+        return 0 if success else 1
         
     except KeyboardInterrupt:
         print("\n\nOperation cancelled by user.")
+        return 1
     except Exception as e:
         print(f"\nUnexpected error: {e}")
         import traceback
         traceback.print_exc()
-        input("\nPress Enter to exit...")
+        if interactive:
+            input("\nPress Enter to exit...")
+        return 1
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
     # NOTE: Strange bug found when fetching BOM, sometimes the JSON response is malformed or inconsistent. This comes from the OnShape API side.
     # At times I have 420 items, other times 361, everything is documented in `thumbnail_extraction/**/*.{json/csv}`
\ No newline at end of file